@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Multi-year crime backfill as a partitioned map-reduce
+
+The date range is split into calendar months. Each month is fetched in a
+worker process (the feed's CSV export, paged with $offset, parsed by
+utils/soda.py) and reduced there to a small count table: incidents per
+(neighborhood, category, subcategory). Tables are cached per month:
+
+    BACKFILL_DIR/<city>/<YYYY-MM>.json    {"key", "rows", "settled", "counts": [[hood, cat, sub, n], ...]}
+
+A rerun only fetches months that are missing, failed, fetched for a
+different feed, or not yet settled: incidents keep being filed for a while,
+so a month is final once it was fetched BACKFILL_SETTLE_DAYS after it
+ended. Severity weights (assign_crime_severity_weight) are applied when
+the tables are summed, so reweighting never needs a refetch.
+
+The summed table is scored exactly like the crime stage (name mapping,
+min/max safety scaling) and written to BACKFILL_DIR/<city>/scores.json.
+
+Usage:
+    python backfill.py --since 2018-01 [--until 2024-12] [--city sf] [--workers 8] [--refresh]
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+import numpy as np
+from utils import checkpoints
+
+BACKFILL_DIR = os.getenv('BACKFILL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.backfill'))
+BACKFILL_PAGE_SIZE = int(os.getenv('BACKFILL_PAGE_SIZE', '50000'))    # rows per SODA request
+BACKFILL_SETTLE_DAYS = int(os.getenv('BACKFILL_SETTLE_DAYS', '30'))   # late reports still arrive until then
+
+def month_range(since, until):
+    """
+    ['2018-01', ...] from since to until inclusive (YYYY-MM)
+    Raises ValueError for anything that isn't a real month
+    """
+    first, last = (datetime.strptime(bound, '%Y-%m') for bound in (since, until))
+    year, month = first.year, first.month
+    last = (last.year, last.month)
+    months = []
+    while (year, month) <= last:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def month_bounds(month):
+    """(first day, first day of the next month) as dates"""
+    start = date.fromisoformat(f"{month}-01")
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+class CountTable:
+    """Incidents per (neighborhood, category, subcategory); tables merge by adding"""
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def add_columns(self, columns):
+        """Count utils.soda.IncidentColumns with one np.unique over combined codes"""
+        if not len(columns):
+            return self
+        views = columns.arrays()
+        n_cat = max(len(columns.categories), 1)
+        n_sub = max(len(columns.subcategories), 1)
+        combined = (views['neighborhood'].astype(np.int64) * n_cat + views['category']) * n_sub + views['subcategory']
+        unique, counts = np.unique(combined, return_counts=True)
+        hoods, cats, subs = (columns.neighborhoods.values, columns.categories.values,
+                             columns.subcategories.values)
+        for code, count in zip(unique.tolist(), counts.tolist()):
+            rest, sub = divmod(code, n_sub)
+            hood, cat = divmod(rest, n_cat)
+            self.counts[(hoods[hood], cats[cat], subs[sub])] += count
+        return self
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        return self
+
+    def weighted(self, weigh):
+        """
+        ({neighborhood: weighted incidents}, {neighborhood: incidents}),
+        the same totals calculate_weighted_crime_score gives
+        """
+        weights = {}
+        weighted_scores = Counter()
+        incident_counts = Counter()
+        for (hood, category, subcategory), count in self.counts.items():
+            if not hood:
+                continue
+            pair = (category, subcategory)
+            if pair not in weights:
+                weights[pair] = weigh(category, subcategory)
+            weighted_scores[hood] += weights[pair] * count
+            incident_counts[hood] += count
+        return dict(weighted_scores), dict(incident_counts)
+
+    def to_rows(self):
+        return [[hood, cat, sub, n] for (hood, cat, sub), n in sorted(self.counts.items())]
+
+    @classmethod
+    def from_rows(cls, rows):
+        return cls({(hood, cat, sub): n for hood, cat, sub, n in rows})
+
+
+def feed_key(city):
+    """Identifies the feed a cached partition came from"""
+    crime = city.get('crime') or {}
+    return checkpoints.config_hash({'url': crime.get('url'), 'fields': crime.get('fields')})
+
+
+def partition_path(city_id, month):
+    return os.path.join(BACKFILL_DIR, city_id, f"{month}.json")
+
+
+def load_partition(city, month):
+    """The cached count table for a month, or None if it must be (re)fetched"""
+    path = partition_path(city['id'], month)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Ignoring unreadable partition {path}: {e}")
+        return None
+    if saved.get('key') != feed_key(city) or not saved.get('settled'):
+        return None
+    return CountTable.from_rows(saved['counts'])
+
+
+def fetch_partition(city, start, end, page_size=BACKFILL_PAGE_SIZE):
+    """
+    Count every incident in [start, end) (dates), paging through the CSV
+    export; returns (CountTable, rows)
+    """
+    from utils import http_client
+    from utils.soda import read_incident_csv, stream_text
+
+    crime = city['crime']
+    fields = crime['fields']
+    select = [fields['neighborhood'], fields['category']]
+    if fields.get('subcategory'):
+        select.append(fields['subcategory'])
+    url = crime['url'].rsplit('.', 1)[0] + '.csv'
+    params = {
+        '$select': ','.join(select),
+        '$where': (f"{fields['datetime']} >= '{start.isoformat()}T00:00:00.000' "
+                   f"AND {fields['datetime']} < '{end.isoformat()}T00:00:00.000'"),
+        '$order': ':id',  # stable paging
+        '$limit': page_size,
+    }
+
+    table = CountTable()
+    rows = offset = 0
+    while True:
+        params['$offset'] = offset
+        response = http_client.get(url, params=params, timeout=60, stream=True)
+        with response:
+            if response.status_code != 200:
+                raise RuntimeError(f"crime feed returned {response.status_code}")
+            columns = read_incident_csv(stream_text(response), fields)
+        table.add_columns(columns)
+        rows += len(columns)
+        # Page by what the feed sent, not what was kept: skipped rows still fill a page
+        served = len(columns) + columns.skipped
+        offset += served
+        if served < page_size:
+            return table, rows
+
+
+def run_partition(city_id, month):
+    """
+    Worker: fetch and count one month, cache the table, and return
+    (month, rows, seconds)
+    """
+    from city_registry import get_city
+
+    city = get_city(city_id)
+    started = time.perf_counter()
+    start, end = month_bounds(month)
+    table, rows = fetch_partition(city, start, end)
+
+    settled = date.today() >= end + timedelta(days=BACKFILL_SETTLE_DAYS)
+    path = partition_path(city_id, month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'key': feed_key(city),
+            'month': month,
+            'rows': rows,
+            'settled': settled,
+            'fetched_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'counts': table.to_rows(),
+        }, f)
+    os.replace(tmp_path, path)
+    return month, rows, time.perf_counter() - started
+
+
+def backfill(city, months, workers=None, refresh=False):
+    """
+    Map: fetch every month not cached (in a process pool). Reduce: sum the
+    month tables. Returns (CountTable, months that failed)
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    tables = {}
+    if not refresh:
+        for month in months:
+            table = load_partition(city, month)
+            if table is not None:
+                tables[month] = table
+    todo = [month for month in months if month not in tables]
+    print(f"  ♻️  {len(tables)} of {len(months)} months cached, fetching {len(todo)}")
+
+    failed = []
+    if todo:
+        started = time.perf_counter()
+        total_rows = 0
+        workers = max(1, min(workers or os.cpu_count() or 1, len(todo)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_partition, city['id'], month): month for month in todo}
+            for future in as_completed(futures):
+                month = futures[future]
+                try:
+                    _, rows, seconds = future.result()
+                except Exception as e:
+                    failed.append(month)
+                    print(f"  ❌ {month} failed: {e}")
+                    continue
+                total_rows += rows
+                print(f"  ✅ {month}: {rows:,} incidents in {seconds:.1f}s")
+        elapsed = time.perf_counter() - started
+        print(f"  ⏱️  {total_rows:,} incidents in {elapsed:.1f}s with {workers} worker(s) "
+              f"({total_rows / max(elapsed, 1e-9):,.0f}/s)")
+
+        for month in todo:
+            if month in failed:
+                continue
+            path = partition_path(city['id'], month)
+            with open(path, 'r', encoding='utf-8') as f:
+                tables[month] = CountTable.from_rows(json.load(f)['counts'])
+
+    combined = CountTable()
+    for month in months:
+        if month in tables:
+            combined.merge(tables[month])
+    return combined, sorted(failed)
+
+
+def score(table, city):
+    """Safety percentages from a summed table, as the crime stage computes them"""
+    from pipelines.crime_pipeline import (assign_crime_severity_weight, convert_crime_to_safety_percentage,
+                                          map_to_standard_neighborhood_names)
+
+    weighted_scores, incident_counts = table.weighted(assign_crime_severity_weight)
+    aliases = None if city.get('builtin') else (city.get('crime') or {}).get('aliases', {})
+    # Map (weighted, count) pairs together so names are resolved once
+    mapped = map_to_standard_neighborhood_names(
+        {hood: (weighted, incident_counts[hood]) for hood, weighted in weighted_scores.items()},
+        city['neighborhoods'], aliases)
+    safety = convert_crime_to_safety_percentage({hood: pair[0] for hood, pair in mapped.items()})
+    return {
+        hood: {'safety': safety[hood], 'weighted_crime': round(weighted, 1), 'incidents': count}
+        for hood, (weighted, count) in mapped.items()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill crime scores over a range of months")
+    parser.add_argument('--since', required=True, help="First month (YYYY-MM)")
+    parser.add_argument('--until', help="Last month (YYYY-MM, default: this month)")
+    parser.add_argument('--city', help="City id (default: the default city)")
+    parser.add_argument('--workers', type=int, help="Worker processes (default: one per core)")
+    parser.add_argument('--refresh', action='store_true', help="Refetch every month, ignoring the cache")
+    args = parser.parse_args(argv)
+
+    from city_registry import get_city
+
+    city = get_city(args.city)
+    if not (city.get('crime') or {}).get('url'):
+        print(f"❌ No crime feed configured for {city['name']}")
+        return 1
+    until = args.until or date.today().strftime('%Y-%m')
+    try:
+        months = month_range(args.since, until)
+    except ValueError:
+        parser.error(f"--since/--until must be YYYY-MM months (got {args.since}, {until})")
+    if not months:
+        parser.error(f"--since {args.since} is after --until {until}")
+    print(f"🚨 Backfilling {city['name']} crime, {months[0]} to {months[-1]} ({len(months)} months)")
+
+    table, failed = backfill(city, months, args.workers, args.refresh)
+    scores = score(table, city)
+    path = os.path.join(BACKFILL_DIR, city['id'], 'scores.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'since': months[0], 'until': months[-1], 'incidents': table.total,
+                   'missing_months': failed, 'neighborhoods': scores}, f, indent=2)
+
+    print(f"📊 {table.total:,} incidents across {len(scores)} neighborhoods → {path}")
+    for hood, values in sorted(scores.items(), key=lambda item: item[1]['safety'], reverse=True):
+        print(f"    {hood:40} {values['safety']:5.1f}%  ({values['incidents']:,} incidents)")
+    if failed:
+        print(f"⚠️  {len(failed)} month(s) failed and are not counted: {', '.join(failed)} (rerun to retry)")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
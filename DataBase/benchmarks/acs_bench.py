@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+ACS ingestion benchmark
+
+Generates a synthetic statewide tract gazetteer and ACS 5-year extract
+(California has ~9,100 tracts; a slice of them around the SF centroids),
+then times building the crosswalk, loading it from the cache and streaming
+the extract into per-neighborhood demographics, with peak traced memory.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.acs_bench [--tracts 9100]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from importlib import reload
+
+
+def write_inputs(directory, n_tracts, centroids, seed=11):
+    rng = random.Random(seed)
+    gazetteer = os.path.join(directory, 'tracts_gazetteer.txt')
+    acs = os.path.join(directory, 'acs5.csv')
+    points = list(centroids.values())
+    with open(gazetteer, 'w', encoding='utf-8') as gaz, open(acs, 'w', encoding='utf-8') as out:
+        # Real gazetteer files pad the last header with trailing spaces
+        gaz.write('USPS\tGEOID\tALAND\tAWATER\tALAND_SQMI\tAWATER_SQMI\tINTPTLAT\tINTPTLONG' + ' ' * 40 + '\n')
+        out.write('GEO_ID,NAME,B01003_001E,B01003_001M,B01002_001E,B01002_001M\n')
+        out.write('Geography,Geographic Area Name,Estimate!!Total,Margin of Error!!Total,Estimate!!Median age,Margin\n')
+        for i in range(n_tracts):
+            geoid = f"06{rng.randrange(1, 116, 2):03d}{i:06d}"
+            if i % 40 == 0:  # ~2% of tracts inside the city
+                lat, lon = rng.choice(points)
+                lat, lon = lat + rng.gauss(0, 0.006), lon + rng.gauss(0, 0.006)
+            else:
+                lat, lon = rng.uniform(32.5, 42.0), rng.uniform(-124.3, -114.2)
+            sqmi = rng.uniform(0.1, 3.0)
+            gaz.write(f"CA\t{geoid}\t{int(sqmi * 2589988)}\t0\t{sqmi:.3f}\t0\t{lat:.6f}\t{lon:.6f}\n")
+            age = f"{rng.uniform(25, 55):.1f}" if rng.random() > 0.01 else '-666666666'
+            out.write(f"1400000US{geoid},\"Census Tract {i}; California\",{rng.randint(500, 8000)},100,{age},1.2\n")
+    return gazetteer, acs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ACS ingestion benchmark")
+    parser.add_argument('--tracts', type=int, default=9100)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['CHECKPOINT_DIR'] = os.path.join(tmp, 'checkpoints')
+        import config
+        from city_registry import get_city
+        city = get_city('sf')
+        gazetteer, acs = write_inputs(tmp, args.tracts, city['centroids'])
+        os.environ.update({'TRACT_GAZETTEER_FILE': gazetteer, 'ACS_DATA_FILE': acs})
+        reload(config)
+        from utils import checkpoints
+        reload(checkpoints)
+        from utils import acs as acs_module
+        reload(acs_module)
+
+        print(f"📄 {args.tracts} tracts, ACS extract {os.path.getsize(acs) / 1e6:.1f} MB")
+        start = time.perf_counter()
+        acs_module.load_crosswalk(city)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        crosswalk = acs_module.load_crosswalk(city)
+        cached = time.perf_counter() - start
+        start = time.perf_counter()
+        ages, densities = acs_module.aggregate_acs(acs, city, crosswalk)
+        aggregate = time.perf_counter() - start
+
+        # Memory in a second pass, so tracing doesn't inflate the timings
+        tracemalloc.start()
+        acs_module.build_crosswalk(city, gazetteer)
+        _, build_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        acs_module.aggregate_acs(acs, city, crosswalk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"  crosswalk build {cold * 1000:.0f} ms, cached load {cached * 1000:.1f} ms, "
+              f"stream+aggregate {aggregate * 1000:.0f} ms")
+        print(f"  peak traced memory: build {build_peak / 1e6:.1f} MB, stream {peak / 1e6:.1f} MB")
+        print(f"  {len(densities)}/{len(city['neighborhoods'])} neighborhoods covered, "
+              f"e.g. Mission: age {ages.get('Mission', float('nan')):.1f}, "
+              f"{densities.get('Mission', float('nan')):.0f} people/sq mi")
+
+
+if __name__ == '__main__':
+    main()
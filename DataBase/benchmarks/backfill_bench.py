@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Crime backfill benchmark: monthly map-reduce vs worker count and cache
+
+Serves --months months of synthetic incidents from the fake SODA feed
+(responses pre-rendered once, so the server isn't what is measured) and:
+
+  1. runs backfill.backfill() with --refresh at each worker count
+     (incidents/s; needs as many cores as workers to scale)
+  2. reruns with the partition cache: nothing is fetched
+  3. drops a few cached months (as if they had failed) and reruns: only
+     those are fetched
+  4. checks the reduced totals against one unpartitioned fetch (one
+     process, one request)
+
+Usage (from the DataBase directory):
+    python -m benchmarks.backfill_bench [--months 24] [--per-month 40000] [--workers 1,2,4]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from benchmarks.fake_api import FakeApiServer
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crime backfill benchmark")
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--per-month', type=int, default=40000)
+    parser.add_argument('--workers', default='1,2,4', help="Comma-separated worker counts")
+    args = parser.parse_args(argv)
+
+    server = FakeApiServer(crime_per_month=args.per_month, crime_body_cache=True)
+    server.start()
+    os.environ.update(server.env())
+    os.environ.update({'RATE_LIMIT_DELAY': '0', 'BACKFILL_DIR': tempfile.mkdtemp(prefix='backfill-')})
+
+    # Imported after the environment points config at the fake API
+    import backfill
+    from city_registry import get_city
+    from pipelines.crime_pipeline import assign_crime_severity_weight
+
+    city = get_city('sf')
+    server.options['crime_neighborhoods'] = list(city['neighborhoods'])
+    months = backfill.month_range('2022-01', f"{2022 + (args.months - 1) // 12}-{(args.months - 1) % 12 + 1:02d}")
+    rows = args.per_month * len(months)
+    try:
+        print(f"🚨 {len(months)} months x {args.per_month:,} incidents ({os.cpu_count()} cores)")
+        _, seconds = timed(backfill.backfill, city, months, 1, refresh=True)
+        print(f"  first run (server rendering)  {seconds:6.2f}s")
+        for workers in (int(w) for w in args.workers.split(',')):
+            (table, failed), seconds = timed(backfill.backfill, city, months, workers, refresh=True)
+            print(f"  {workers} worker(s)                   {seconds:6.2f}s  {rows / seconds:10,.0f} incidents/s")
+
+        server.reset_stats()
+        _, seconds = timed(backfill.backfill, city, months)
+        print(f"  rerun, all cached             {seconds:6.2f}s  ({server.stats['soda']} requests)")
+        for month in months[3:6]:
+            os.remove(backfill.partition_path(city['id'], month))
+        server.reset_stats()
+        (table, failed), seconds = timed(backfill.backfill, city, months)
+        print(f"  rerun, 3 months missing       {seconds:6.2f}s  ({server.stats['soda']} requests)")
+
+        start, _ = backfill.month_bounds(months[0])
+        _, end = backfill.month_bounds(months[-1])
+        backfill.fetch_partition(city, start, end, rows + 1)  # let the server render it first
+        (single, _), seconds = timed(backfill.fetch_partition, city, start, end, rows + 1)
+        same = single.weighted(assign_crime_severity_weight) == table.weighted(assign_crime_severity_weight)
+        print(f"  one unpartitioned fetch       {seconds:6.2f}s  (totals {'match' if same else 'DIFFER'})")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
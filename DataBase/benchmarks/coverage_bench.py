@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Query coverage benchmark: one query per centroid vs a planned sweep
+
+Against the fake API's fixed venue set (dense and sparse neighborhoods),
+runs one Yelp category per mode and reports requests sent and the share
+of venues actually seen:
+
+  - centroid: the old per-neighborhood query (2 km, first 50 results)
+  - centroid, paged: the same circles paged through (up to Yelp's 1000
+    results), i.e. what complete counts cost without a plan
+  - planner (cold): a fresh plan, including the splits that discover it
+  - planner (warm): the saved plan from the cold run, leaves only
+
+and for Eventbrite, requests and events counted (summed over
+neighborhoods) against the events that exist:
+
+  - centroid: the old 3 km search per neighborhood, first page only;
+    circles overlap, so nearby events count for several neighborhoods
+  - citywide sweep: one search paged to the end, each event counted once
+
+Usage (from the DataBase directory):
+    python -m benchmarks.coverage_bench [--hoods 37,500] [--venues-per-hood 60] [--events-per-hood 10]
+"""
+import argparse
+import os
+import tempfile
+from benchmarks.fake_api import FakeApiServer
+from benchmarks.run_benchmarks import synthetic_neighborhoods
+
+CATEGORY = 'bars,nightlife'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query coverage benchmark")
+    parser.add_argument('--hoods', default='37,500', help="Comma-separated neighborhood counts")
+    parser.add_argument('--venues-per-hood', type=int, default=60)
+    parser.add_argument('--events-per-hood', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    server = FakeApiServer(venues_per_hood=args.venues_per_hood, events_per_hood=args.events_per_hood)
+    server.start()
+    plan_dir = tempfile.mkdtemp(prefix='plans-')
+    os.environ.update(server.env())
+    os.environ.update({'RATE_LIMIT_DELAY': '0', 'COVERAGE_PLAN_DIR': plan_dir, 'EVENTBRITE_MAX_PAGES': '10000',
+                       'QUOTA_DIR': tempfile.mkdtemp(prefix='quota-'), 'YELP_DAILY_QUOTA': '0'})
+
+    # Imported after the environment points config at the fake API
+    import config
+    from pipelines import events_pipeline, yelp_pipeline
+
+    seen = set()
+    searches = yelp_pipeline.search_yelp, yelp_pipeline.search_yelp_area
+
+    def recording(search, unpack):
+        def wrapper(*a, **kw):
+            response = search(*a, **kw)
+            if response is not None:
+                seen.update(b['id'] for b in unpack(response))
+            return response
+        return wrapper
+
+    yelp_pipeline.search_yelp = recording(searches[0], lambda businesses: businesses)
+    yelp_pipeline.search_yelp_area = recording(searches[1], lambda response: response[0])
+    try:
+        for n_hoods in (int(n) for n in args.hoods.split(',')):
+            hoods = synthetic_neighborhoods(n_hoods)
+            server.options['venue_centroids'] = hoods
+            city = {'id': f"bench{n_hoods}", 'neighborhoods': list(hoods), 'centroids': hoods,
+                    'default_coords': next(iter(hoods.values()))}
+            world = len(server.venues(CATEGORY)[0])
+            print(f"🗺️  {n_hoods} neighborhoods, {world:,} venues")
+            for label, planner in (('centroid', False), ('centroid, paged', None),
+                                   ('planner (cold)', True), ('planner (warm)', True)):
+                config.COVERAGE_PLANNER = planner
+                server.reset_stats()
+                seen.clear()
+                if planner is None:
+                    for lat, lon in hoods.values():
+                        yelp_pipeline.search_yelp_area(lat, lon, CATEGORY, 2000, max_pages=20)
+                else:
+                    yelp_pipeline.process_yelp_category(list(hoods), 'bars', CATEGORY, city)
+                print(f"  {label:15} {server.stats['yelp']:6,} requests, "
+                      f"{len(seen) / max(world, 1):6.1%} of venues seen")
+
+            events = len(server.venues('events')[0])
+            server.reset_stats()
+            counted, distinct = 0, set()
+            for lat, lon in hoods.values():
+                page = (events_pipeline.search_eventbrite(lat, lon) or {}).get('events', [])
+                counted += len(page)
+                distinct.update(event['id'] for event in page)
+            print(f"  {'eb centroid':15} {server.stats['eventbrite']:6,} requests, "
+                  f"{counted:,} events counted ({len(distinct):,} distinct) of {events:,}")
+            server.reset_stats()
+            found, _ = events_pipeline.sweep_eventbrite(*events_pipeline.search_area(hoods))
+            counted = sum(events_pipeline.count_events_by_neighborhood(found.values(), hoods).values())
+            print(f"  {'eb citywide':15} {server.stats['eventbrite']:6,} requests, "
+                  f"{counted:,} events counted of {events:,}")
+    finally:
+        yelp_pipeline.search_yelp, yelp_pipeline.search_yelp_area = searches
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
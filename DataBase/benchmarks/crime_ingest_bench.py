@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Crime feed ingestion benchmark: JSON body vs streamed CSV columns
+
+Serves a synthetic SODA table from the fake API and runs the crime fetch
+plus weighted aggregation once per CRIME_FEED_FORMAT, each in a fresh
+subprocess so peak RSS (ru_maxrss) belongs to that path alone. The
+baseline is the child's RSS after imports, before fetching.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.crime_ingest_bench [--rows 1000000]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def child():
+    from city_registry import get_city
+    from pipelines.crime_pipeline import calculate_weighted_crime_score, fetch_crime_data
+
+    city = get_city('sf')
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    data = fetch_crime_data(city)
+    fetched = time.perf_counter() - start
+    scores, _ = calculate_weighted_crime_score(data, city['neighborhoods'], city['crime']['fields'])
+    total = time.perf_counter() - start
+    print(json.dumps({'rows': len(data), 'fetch': fetched, 'total': total,
+                      'baseline_mb': baseline, 'peak_mb': peak_rss_mb(),
+                      'checksum': round(sum(scores.values()), 1)}))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crime feed ingestion benchmark")
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return child()
+
+    from benchmarks.fake_api import FakeApiServer
+    from city_registry import get_city
+
+    city = get_city('sf')
+    server = FakeApiServer(crime_incidents=args.rows, crime_neighborhoods=list(city['neighborhoods']),
+                           crime_centroids=city['centroids'])
+    server.start()
+    try:
+        print(f"🚨 {args.rows:,} incidents")
+        for fmt in ('json', 'csv'):
+            env = dict(os.environ, **server.env(), CRIME_FEED_FORMAT=fmt, CRIME_QUERY_LIMIT=str(args.rows))
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.crime_ingest_bench', '--child'],
+                                 cwd=BASE_DIR, env=env, check=True, capture_output=True, text=True).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"  {fmt:4}: fetch {result['fetch']:.2f}s, total {result['total']:.2f}s, "
+                  f"peak RSS {result['peak_mb']:.0f} MB ({result['peak_mb'] - result['baseline_mb']:+.0f} MB "
+                  f"over baseline), checksum {result['checksum']}")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
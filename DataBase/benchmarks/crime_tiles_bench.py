@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Crime tile benchmark
+
+Bins synthetic incidents scattered around the SF centroids into the
+hierarchical crime tiles: from coordinate arrays (CrimeTiles.add, in
+batches as incremental fetches would arrive) and from SODA-shaped incident
+dicts (build_tiles, including string parsing and severity weighting).
+Then times point lookups.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.crime_tiles_bench [--incidents 1000000 5000000]
+"""
+import argparse
+import random
+import time
+import numpy as np
+from benchmarks.fake_api import CRIME_CATEGORIES
+from city_registry import get_city
+from crime_tiles import CrimeTiles, build_tiles, city_bounds
+from pipelines.crime_pipeline import assign_crime_severity_weight
+
+BATCH = 250000
+
+
+def synthetic_points(city, count, seed=9):
+    rng = np.random.default_rng(seed)
+    centroids = np.array(list(city['centroids'].values()))
+    picks = centroids[rng.integers(0, len(centroids), count)]
+    lats = picks[:, 0] + rng.normal(0, 0.006, count)
+    lons = picks[:, 1] + rng.normal(0, 0.006, count)
+    weights = rng.choice([1.0, 1.5, 2.0, 2.5, 3.5, 5.0], count)
+    return lats, lons, weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crime tile benchmark")
+    parser.add_argument('--incidents', type=int, nargs='+', default=[1000000, 5000000])
+    parser.add_argument('--rows', type=int, default=1000000, help="Incident dicts for the build_tiles pass")
+    args = parser.parse_args(argv)
+
+    city = get_city('sf')
+    bounds = city_bounds(city)
+    for count in args.incidents:
+        lats, lons, weights = synthetic_points(city, count)
+        tiles = CrimeTiles(bounds)
+        start = time.perf_counter()
+        for i in range(0, count, BATCH):
+            tiles.add(lats[i:i + BATCH], lons[i:i + BATCH], weights[i:i + BATCH])
+        elapsed = time.perf_counter() - start
+        cells = sum(grid.size for grid in tiles.weights.values())
+        size = sum(tiles.weights[z].nbytes + tiles.counts[z].nbytes for z in tiles.zooms)
+        print(f"🗺️  {count:>9,} incidents binned at {len(tiles.zooms)} zooms in {elapsed:.2f}s "
+              f"({count / elapsed / 1e6:.1f}M/s); {cells:,} cells, {size / 1e3:.0f} KB")
+
+    # SODA rows: strings for coordinates, categories to weigh
+    rng = random.Random(4)
+    lats, lons, _ = synthetic_points(city, args.rows)
+    rows = []
+    for lat, lon in zip(lats.tolist(), lons.tolist()):
+        category, subcategory = rng.choice(CRIME_CATEGORIES)
+        rows.append({'incident_category': category, 'incident_subcategory': subcategory,
+                     'latitude': f"{lat:.6f}", 'longitude': f"{lon:.6f}"})
+    start = time.perf_counter()
+    tiles = build_tiles(rows, city, city['crime']['fields'], assign_crime_severity_weight)
+    print(f"  build_tiles from {args.rows:,} incident dicts: {time.perf_counter() - start:.2f}s")
+
+    points = [(lat, lon) for lat, lon in zip(lats[:10000].tolist(), lons[:10000].tolist())]
+    tiles.safety(max(tiles.zooms))  # percentile grids are computed on first use
+    start = time.perf_counter()
+    for lat, lon in points:
+        tiles.lookup(lat, lon)
+    elapsed = time.perf_counter() - start
+    print(f"  lookup: {elapsed / len(points) * 1e6:.1f} µs per point")
+
+
+if __name__ == '__main__':
+    main()
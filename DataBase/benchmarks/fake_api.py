@@ -0,0 +1,445 @@
+"""
+Local HTTP stand-in for SODA (SF crime), Yelp, Eventbrite and Google Places
+
+Responses are synthetic but deterministic (seeded per request), with
+configurable latency, tail latency, error rate and page sizes, so the
+pipelines can be benchmarked end to end without touching live APIs.
+
+By default Yelp, Places and Eventbrite make up results around each query.
+With venue_centroids set they instead search one fixed set of venues per
+category (dense and sparse neighborhoods; Eventbrite's are events),
+returning the ones inside the query circle nearest first, so query
+coverage and double counting can be measured.
+
+Point the pipelines at it through the URL overrides in config.py:
+    SF_CRIME_DATA_URL      {url}/resource/crime.json (CSV export at crime.csv)
+    YELP_SEARCH_URL        {url}/v3/businesses/search
+    EVENTBRITE_SEARCH_URL  {url}/v3/events/search/
+    GOOGLE_PLACES_URL      {url}/maps/api/place/nearbysearch/json
+"""
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+CRIME_CATEGORIES = [
+    ('Larceny Theft', 'Larceny - From Vehicle'),
+    ('Malicious Mischief', 'Vandalism'),
+    ('Assault', 'Simple Assault'),
+    ('Robbery', 'Robbery - Street'),
+    ('Burglary', 'Burglary - Residential'),
+    ('Motor Vehicle Theft', 'Motor Vehicle Theft'),
+    ('Drug Offense', 'Drug Violation'),
+    ('Fraud', 'Fraud'),
+    ('Weapons Offense', 'Weapons Carrying Etc'),
+    ('Other Miscellaneous', 'Other'),
+]
+
+DEFAULT_OPTIONS = {
+    'seed': 42,
+    'latency_ms': 0.0,          # base latency added to every response
+    'jitter_ms': 0.0,           # uniform extra latency in [0, jitter_ms]
+    'tail_rate': 0.0,           # fraction of requests that get tail_ms on top
+    'tail_ms': 0.0,
+    'error_rate': 0.0,          # fraction of requests answered with error_status
+    'error_status': 500,
+    'per_request_faults': False,  # draw latency/errors per request, not per URL (so retries/hedges differ)
+    'daily_quota': {},          # route ('yelp', 'places', ...) -> requests answered before 429s (until reset_stats)
+    'crime_incidents': 100000,  # size of the synthetic incident table
+    'crime_neighborhoods': [],  # analysis_neighborhood values to cycle through
+    'crime_centroids': {},      # neighborhood -> (lat, lon); incidents get coordinates near it
+    'crime_per_month': 0,       # if set, a $where month range has this many incidents per month
+    'crime_body_cache': False,  # keep rendered crime responses by URL (serving stops being the bottleneck)
+    'yelp_total': 120,          # businesses "available" per Yelp query
+    'eventbrite_per_query': 40,  # events available per Eventbrite query
+    'eventbrite_page_size': 50,
+    'places_per_query': 45,     # results available per Places query (20/page like the real API)
+    'venue_centroids': {},      # neighborhood -> (lat, lon); when set, Yelp/Places/Eventbrite search a fixed venue set
+    'venues_per_hood': 60,      # mean venues per neighborhood and category (varies 0.2x-2.6x by neighborhood)
+    'events_per_hood': 10,      # the same for Eventbrite's fixed events (a week's worth)
+    'venue_spread_m': 900,      # venues lie within this distance of their neighborhood's centroid
+}
+
+VENUE_BUCKET_DEG = 0.01  # spatial index cell for the fixed venue set
+
+def _point_near(rng, lat, lon, radius_m):
+    """Uniform random point within radius_m of (lat, lon)"""
+    r = radius_m * math.sqrt(rng.random())
+    theta = rng.random() * 2 * math.pi
+    dlat = (r * math.cos(theta)) / 111320.0
+    dlon = (r * math.sin(theta)) / (111320.0 * math.cos(math.radians(lat)))
+    return lat + dlat, lon + dlon
+
+
+class FakeApiServer:
+    """Threaded local server; start() returns the base URL"""
+
+    def __init__(self, **options):
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._venues = {}
+        self._venue_source = None
+        self._bodies = {}
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment overrides that point config.py at this server"""
+        return {
+            'SF_CRIME_DATA_URL': f"{self.url}/resource/crime.json",
+            'YELP_SEARCH_URL': f"{self.url}/v3/businesses/search",
+            'EVENTBRITE_SEARCH_URL': f"{self.url}/v3/events/search/",
+            'GOOGLE_PLACES_URL': f"{self.url}/maps/api/place/nearbysearch/json",
+            'YELP_API_KEY': 'benchmark-key',
+            'EVENTBRITE_TOKEN': 'benchmark-token',
+            'GOOGLE_PLACES_API_KEY': 'benchmark-key',
+        }
+
+    def start(self, host='127.0.0.1', port=0):
+        server = self
+
+        class Handler(_Handler):
+            fake = server
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def venues(self, kind):
+        """Fixed venues for a category: (all venues, {bucket: [venue]})"""
+        with self._lock:
+            if self._venue_source is not self.options['venue_centroids']:
+                self._venues.clear()
+                self._venue_source = self.options['venue_centroids']
+            if kind not in self._venues:
+                self._venues[kind] = self._build_venues(kind)
+            return self._venues[kind]
+
+    def _build_venues(self, kind):
+        opts = self.options
+        rng = random.Random(opts['seed'] ^ zlib.crc32(kind.encode('utf-8')))
+        venues, buckets = [], {}
+        for hood, (lat, lon) in opts['venue_centroids'].items():
+            u = random.Random(zlib.crc32(hood.encode('utf-8'))).random()
+            per_hood = opts['events_per_hood'] if kind == 'events' else opts['venues_per_hood']
+            count = int(round(per_hood * (0.2 + 2.4 * u * u)))
+            for _ in range(count):
+                v_lat, v_lon = _point_near(rng, lat, lon, opts['venue_spread_m'])
+                venue = {'id': f"{kind}-{len(venues)}", 'lat': v_lat, 'lon': v_lon,
+                         'rating': round(rng.uniform(2.5, 5.0) * 2) / 2, 'price': '$' * rng.randint(1, 4)}
+                venues.append(venue)
+                key = (math.floor(v_lat / VENUE_BUCKET_DEG), math.floor(v_lon / VENUE_BUCKET_DEG))
+                buckets.setdefault(key, []).append(venue)
+        return venues, buckets
+
+    def venues_within(self, kind, lat, lon, radius_m):
+        """Fixed venues inside the circle, nearest first"""
+        _, buckets = self.venues(kind)
+        dlat = radius_m / 111320.0
+        dlon = radius_m / (111320.0 * math.cos(math.radians(lat)))
+        hits = []
+        for i in range(math.floor((lat - dlat) / VENUE_BUCKET_DEG), math.floor((lat + dlat) / VENUE_BUCKET_DEG) + 1):
+            for j in range(math.floor((lon - dlon) / VENUE_BUCKET_DEG), math.floor((lon + dlon) / VENUE_BUCKET_DEG) + 1):
+                for venue in buckets.get((i, j), ()):
+                    y = (venue['lat'] - lat) * 111320.0
+                    x = (venue['lon'] - lon) * 111320.0 * math.cos(math.radians(lat))
+                    d2 = x * x + y * y
+                    if d2 <= radius_m * radius_m:
+                        hits.append((d2, venue))
+        hits.sort(key=lambda hit: hit[0])
+        return [venue for _, venue in hits]
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def count(self, route):
+        with self._lock:
+            self.stats[route] += 1
+            return self.stats[route]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    fake = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        opts = self.fake.options
+        rng = random.Random(opts['seed'] ^ zlib.crc32(self.path.encode('utf-8')))
+
+        routes = {
+            '/resource/crime.json': ('soda', self._crime_json),
+            '/resource/crime.csv': ('soda', self._crime_csv),
+            '/v3/businesses/search': ('yelp', self._yelp),
+            '/v3/events/search/': ('eventbrite', self._eventbrite),
+            '/maps/api/place/nearbysearch/json': ('places', self._places),
+        }
+        if parts.path == '/__stats':
+            return self._send_json(dict(self.fake.stats))
+        if parts.path not in routes:
+            return self._send_json({'error': 'not found'}, status=404)
+
+        route, handler = routes[parts.path]
+        sent = self.fake.count(route)
+        if route in opts['daily_quota'] and sent > opts['daily_quota'][route]:
+            return self._send_json({'error': {'code': 'ACCESS_LIMIT_REACHED'}}, status=429)
+
+        faults = random.Random(opts['seed'] ^ self.fake.count('_sent')) if opts['per_request_faults'] else rng
+        delay = opts['latency_ms'] + faults.random() * opts['jitter_ms']
+        if opts['tail_rate'] and faults.random() < opts['tail_rate']:
+            delay += opts['tail_ms']
+        if delay:
+            time.sleep(delay / 1000.0)
+
+        if opts['error_rate'] and faults.random() < opts['error_rate']:
+            self.fake.count(route + '_errors')
+            return self._send_json({'error': 'injected'}, status=opts['error_status'])
+
+        handler(query, rng)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # SODA ---------------------------------------------------------------
+
+    def _crime_rows(self, query):
+        opts = self.fake.options
+        hoods = opts['crime_neighborhoods'] or ['Mission']
+        total = opts['crime_incidents']
+        first = 0
+        months = re.findall(r"'(\d{4})-(\d{2})", query.get('$where', ''))
+        if opts['crime_per_month'] and len(months) == 2:
+            (y0, m0), (y1, m1) = ((int(y), int(m)) for y, m in months)
+            total = opts['crime_per_month'] * ((y1 - y0) * 12 + m1 - m0)
+            first = opts['crime_per_month'] * (y0 * 12 + m0)  # each month gets its own rows
+        offset = int(query.get('$offset', 0))
+        limit = int(query.get('$limit', 1000))
+        end = min(total, offset + limit)
+        n_hoods = len(hoods)
+        n_cats = len(CRIME_CATEGORIES)
+        for i in range(first + offset, first + end):
+            category, subcategory = CRIME_CATEGORIES[(i * 7 + i // n_hoods) % n_cats]
+            # Skew volume so some neighborhoods are clearly "less safe"
+            hood = hoods[(i * i) % n_hoods] if i % 3 else hoods[i % n_hoods]
+            yield hood, category, subcategory
+
+    def _crime_json(self, query, rng):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        # Stream in chunks: the synthetic table can be far larger than memory
+        buf = ['[']
+        first = True
+        centroids = self.fake.options['crime_centroids']
+        for hood, category, subcategory in self._crime_rows(query):
+            incident = {
+                'analysis_neighborhood': hood,
+                'incident_category': category,
+                'incident_subcategory': subcategory,
+            }
+            if hood in centroids:
+                lat, lon = _point_near(rng, *centroids[hood], 800)
+                incident['latitude'], incident['longitude'] = f"{lat:.6f}", f"{lon:.6f}"
+            row = json.dumps(incident)
+            buf.append(row if first else ',' + row)
+            first = False
+            if len(buf) >= 5000:
+                self.wfile.write(''.join(buf).encode('utf-8'))
+                buf = []
+        buf.append(']')
+        self.wfile.write(''.join(buf).encode('utf-8'))
+
+    def _crime_csv(self, query, rng):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv')
+        self.end_headers()
+        if not self.fake.options['crime_body_cache']:
+            for chunk in self._crime_csv_chunks(query, rng):
+                self.wfile.write(chunk)
+            return
+        with self.fake._lock:
+            body = self.fake._bodies.get(self.path)
+        if body is None:
+            body = b''.join(self._crime_csv_chunks(query, rng))
+            with self.fake._lock:
+                self.fake._bodies[self.path] = body
+        self.wfile.write(body)
+
+    def _crime_csv_chunks(self, query, rng):
+        # SODA's CSV export quotes every header and value
+        centroids = self.fake.options['crime_centroids']
+        columns = ['analysis_neighborhood', 'incident_category', 'incident_subcategory']
+        if centroids:
+            columns += ['latitude', 'longitude']
+        buf = [','.join(f'"{c}"' for c in columns) + '\n']
+        for hood, category, subcategory in self._crime_rows(query):
+            values = [hood, category, subcategory]
+            if centroids:
+                if hood in centroids:
+                    values += [f"{v:.6f}" for v in _point_near(rng, *centroids[hood], 800)]
+                else:
+                    values += ['', '']
+            buf.append(','.join(f'"{v}"' for v in values) + '\n')
+            if len(buf) >= 5000:
+                yield ''.join(buf).encode('utf-8')
+                buf = []
+        yield ''.join(buf).encode('utf-8')
+
+    # Yelp ---------------------------------------------------------------
+
+    def _yelp(self, query, rng):
+        opts = self.fake.options
+        lat = float(query.get('latitude', 37.7749))
+        lon = float(query.get('longitude', -122.4194))
+        radius = float(query.get('radius', 2000))
+        limit = int(query.get('limit', 20))
+        offset = int(query.get('offset', 0))
+        total = opts['yelp_total']
+
+        if opts['venue_centroids']:
+            found = self.fake.venues_within(query.get('categories', ''), lat, lon, radius)
+            return self._send_json({
+                'businesses': [
+                    {'id': v['id'], 'rating': v['rating'], 'price': v['price'],
+                     'coordinates': {'latitude': v['lat'], 'longitude': v['lon']}}
+                    for v in found[offset:offset + limit]
+                ],
+                'total': len(found),
+            })
+
+        # Seed by position + category so pages of the same query agree
+        base = random.Random(zlib.crc32(f"{lat:.5f},{lon:.5f},{query.get('categories')}".encode('utf-8')))
+        businesses = []
+        for i in range(total):
+            b_lat, b_lon = _point_near(base, lat, lon, radius)
+            businesses.append({
+                'id': f"yelp-{lat:.4f}-{lon:.4f}-{query.get('categories')}-{i}",
+                'rating': round(base.uniform(2.5, 5.0) * 2) / 2,
+                'price': '$' * base.randint(1, 4),
+                'coordinates': {'latitude': b_lat, 'longitude': b_lon},
+            })
+        self._send_json({
+            'businesses': businesses[offset:offset + limit],
+            'total': total,
+        })
+
+    # Eventbrite ---------------------------------------------------------
+
+    def _eventbrite(self, query, rng):
+        opts = self.fake.options
+        lat = float(query.get('location.latitude', 37.7749))
+        lon = float(query.get('location.longitude', -122.4194))
+        within = query.get('location.within', '3km')
+        radius_m = float(within.rstrip('km')) * 1000
+        page = int(query.get('page', 1))
+        page_size = opts['eventbrite_page_size']
+        start = (page - 1) * page_size
+
+        if opts['venue_centroids']:
+            found = self.fake.venues_within('events', lat, lon, radius_m)
+            page_count = max(1, math.ceil(len(found) / page_size))
+            return self._send_json({
+                'events': [
+                    {'id': v['id'], 'venue': {'latitude': f"{v['lat']:.6f}", 'longitude': f"{v['lon']:.6f}"}}
+                    for v in found[start:start + page_size]
+                ],
+                'pagination': {
+                    'page_number': page,
+                    'page_size': page_size,
+                    'page_count': page_count,
+                    'object_count': len(found),
+                    'has_more_items': page < page_count,
+                },
+            })
+
+        # Event supply scales with the searched area (3 km is the per-centroid default)
+        total = int(opts['eventbrite_per_query'] * (radius_m / 3000.0) ** 2)
+
+        base = random.Random(zlib.crc32(f"{lat:.5f},{lon:.5f},{within}".encode('utf-8')))
+        venues = [_point_near(base, lat, lon, radius_m) for _ in range(total)]
+        events = [
+            {
+                'id': str(zlib.crc32(f"{v_lat:.5f},{v_lon:.5f},{i}".encode('utf-8'))),
+                'venue': {'latitude': f"{v_lat:.6f}", 'longitude': f"{v_lon:.6f}"},
+            }
+            for i, (v_lat, v_lon) in enumerate(venues[start:start + page_size], start)
+        ]
+        page_count = max(1, math.ceil(total / page_size))
+        self._send_json({
+            'events': events,
+            'pagination': {
+                'page_number': page,
+                'page_size': page_size,
+                'page_count': page_count,
+                'object_count': total,
+                'has_more_items': page < page_count,
+            },
+        })
+
+    # Google Places ------------------------------------------------------
+
+    def _places(self, query, rng):
+        opts = self.fake.options
+        token = query.get('pagetoken')
+        if token:
+            location, place_type, page, radius = token.split('|')
+            page, radius = int(page), float(radius)
+        else:
+            location, place_type, page = query.get('location', '37.7749,-122.4194'), query.get('type', ''), 0
+            radius = float(query.get('radius', 1500))
+        lat, lon = (float(x) for x in location.split(','))
+        total = opts['places_per_query']
+
+        if opts['venue_centroids']:
+            found = self.fake.venues_within(place_type, lat, lon, radius)
+            start = page * 20
+            payload = {'results': [
+                {'place_id': v['id'], 'geometry': {'location': {'lat': v['lat'], 'lng': v['lon']}}}
+                for v in found[start:start + 20]
+            ], 'status': 'OK'}
+            if start + 20 < min(len(found), 60):
+                payload['next_page_token'] = f"{location}|{place_type}|{page + 1}|{radius}"
+            return self._send_json(payload)
+
+        base = random.Random(zlib.crc32(f"{location},{place_type}".encode('utf-8')))
+        results = []
+        for i in range(total):
+            p_lat, p_lon = _point_near(base, lat, lon, radius)
+            results.append({
+                'place_id': f"place-{location}-{place_type}-{i}",
+                'geometry': {'location': {'lat': p_lat, 'lng': p_lon}},
+            })
+        start = page * 20
+        payload = {'results': results[start:start + 20], 'status': 'OK'}
+        if start + 20 < total:
+            payload['next_page_token'] = f"{location}|{place_type}|{page + 1}|{radius}"
+        self._send_json(payload)
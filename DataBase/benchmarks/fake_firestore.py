@@ -0,0 +1,81 @@
+"""
+In-memory stand-in for the Firestore client used by firebase_client
+
+Implements just the surface the pipeline touches:
+db.collection(name).document(id).set(data, merge=...) / .get() and
+db.collection(name).stream(). Writes are counted and serialized sizes
+tracked so benchmarks can report bytes written.
+"""
+import copy
+import json
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self._db = db
+        self._path = path
+        self.id = path[-1]
+
+    def set(self, data, merge=False):
+        self._db.writes += 1
+        self._db.bytes_written += len(json.dumps(data, default=str))
+        current = self._db.docs.get(self._path)
+        if merge and current is not None:
+            _merge(current, data)
+        else:
+            self._db.docs[self._path] = copy.deepcopy(data)
+
+    def get(self):
+        self._db.reads += 1
+        return FakeSnapshot(self.id, self._db.docs.get(self._path))
+
+    def collection(self, name):
+        return FakeCollection(self._db, self._path + (name,))
+
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self._db = db
+        self._path = path
+
+    def document(self, doc_id):
+        return FakeDocument(self._db, self._path + (doc_id,))
+
+    def stream(self):
+        depth = len(self._path) + 1
+        for path, data in list(self._db.docs.items()):
+            if len(path) == depth and path[:-1] == self._path:
+                self._db.reads += 1
+                yield FakeSnapshot(path[-1], copy.deepcopy(data))
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {}
+        self.writes = 0
+        self.reads = 0
+        self.bytes_written = 0
+
+    def collection(self, name):
+        return FakeCollection(self, (name,))
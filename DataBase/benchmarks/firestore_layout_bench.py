@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Firestore layout benchmark: single vs split vs scores documents
+
+Against benchmarks.fake_firestore, for each FIRESTORE_LAYOUT:
+
+  1. a full write (every stage, like main.py)
+  2. --refreshes daemon-style refreshes of the frequent stages (crime,
+     happening, yelp) through one long-lived sink
+
+Reports document writes and bytes sent per refresh, the bytes a client
+listening to every neighborhood would download per refresh (each changed
+document in full), and whether get_all_neighborhoods reassembles the
+same records as the single layout.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.firestore_layout_bench [--hoods 37,500] [--refreshes 5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import random
+from benchmarks.fake_firestore import FakeFirestore
+from benchmarks.run_benchmarks import synthetic_neighborhoods
+
+CATEGORIES = ('bars', 'restaurants', 'cafes')
+
+
+def value(rng, low, high):
+    return round(rng.uniform(low, high), 1)  # the pipelines round scores to one decimal
+
+
+def hot_outputs(hoods, rng):
+    return {
+        'crime': {hood: value(rng, 0, 100) for hood in hoods},
+        'happening': {hood: value(rng, 0, 100) for hood in hoods},
+        'yelp': {category: {hood: {'avg_price': value(rng, 1, 4), 'avg_rating': value(rng, 2.5, 5),
+                                   'count': rng.randint(0, 200)} for hood in hoods}
+                 for category in CATEGORIES},
+    }
+
+
+def cold_outputs(hoods, rng):
+    return {
+        'demographics': {hood: {'population_density': value(rng, 0, 100), 'age_demographic': value(rng, 25, 50)}
+                         for hood in hoods},
+        'property': {hood: {'property_rates': value(rng, 1500, 6000), 'rent_trend': value(rng, -5, 5)}
+                     for hood in hoods},
+    }
+
+
+def serialized(db):
+    return {path: json.dumps(doc, sort_keys=True, default=str) for path, doc in db.docs.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Firestore layout benchmark")
+    parser.add_argument('--hoods', default='37,500', help="Comma-separated neighborhood counts")
+    parser.add_argument('--refreshes', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from firebase_client import FIRESTORE_LAYOUTS, get_all_neighborhoods
+    from main import save_all
+    from sinks import FirestoreSink
+
+    for n_hoods in (int(n) for n in args.hoods.split(',')):
+        centroids = synthetic_neighborhoods(n_hoods)
+        hoods = list(centroids)
+        city = {'id': f"bench{n_hoods}", 'neighborhoods': hoods, 'centroids': centroids,
+                'default_coords': next(iter(centroids.values()))}
+        print(f"🔥 {n_hoods} neighborhoods, {args.refreshes} refreshes of crime/happening/yelp")
+        reference = None
+        for layout in FIRESTORE_LAYOUTS:
+            rng = random.Random(7)
+            db = FakeFirestore()
+            sink = FirestoreSink(db, layout)
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_all(sink, city, dict(cold_outputs(hoods, rng), **hot_outputs(hoods, rng)))
+                full_writes, full_bytes = db.writes, db.bytes_written
+                writes = sent = downloaded = 0
+                for _ in range(args.refreshes):
+                    before = serialized(db)
+                    db.writes = db.bytes_written = 0
+                    save_all(sink, city, hot_outputs(hoods, rng), fill_defaults=False)
+                    writes += db.writes
+                    sent += db.bytes_written
+                    downloaded += sum(len(doc) for path, doc in serialized(db).items() if before.get(path) != doc)
+            records = get_all_neighborhoods(db, city['id'], layout)
+            reference = reference or records
+            print(f"  {layout:7} full write {full_writes:4} docs {full_bytes / 1024:8.1f} KB | per refresh "
+                  f"{writes / args.refreshes:6.1f} docs {sent / args.refreshes / 1024:7.1f} KB sent, "
+                  f"{downloaded / args.refreshes / 1024:7.1f} KB to listeners | "
+                  f"records {'match' if records == reference else 'DIFFER'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+History store benchmark
+
+Appends a year of nightly runs of synthetic combined records into a
+temporary HistoryStore, then reports storage size and the latency of a
+year-long per-neighborhood series query and a run-to-run delta query.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.history_bench [--hoods 37] [--runs 365]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from benchmarks.query_service_bench import synthetic_records
+from history import HistoryStore
+
+DAY = 24 * 60 * 60
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="History store benchmark")
+    parser.add_argument('--hoods', type=int, default=37)
+    parser.add_argument('--runs', type=int, default=365)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    base = synthetic_records(args.hoods)
+    rng = random.Random(1)
+    start_ts = time.time() - args.runs * DAY
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(tmp)
+        append_times = []
+        for run in range(args.runs):
+            for record in base:
+                record['safety'] = min(100.0, max(0.0, record['safety'] + rng.gauss(0, 1)))
+            records = [(r['neighborhood'], r, 'sf') for r in base]
+            t = time.perf_counter()
+            store.append(records, run_at=start_ts + run * DAY)
+            append_times.append(time.perf_counter() - t)
+
+        size = directory_size(tmp)
+        fields = len(store.fields('sf'))
+        print(f"🗄️  {args.runs} runs x {args.hoods} neighborhoods x {fields} fields: "
+              f"{size / 1024:.0f} KB on disk ({size / args.runs / 1024:.1f} KB per run), "
+              f"append {sum(append_times) / len(append_times) * 1000:.2f} ms per run")
+
+        t = time.perf_counter()
+        for _ in range(args.queries):
+            stamps, values = store.series(base[rng.randrange(args.hoods)]['neighborhood'], 'safety', 'sf')
+        per_series = (time.perf_counter() - t) / args.queries
+        print(f"📈 Year-long series: {len(values)} points in {per_series * 1000:.2f} ms")
+
+        t = time.perf_counter()
+        for _ in range(args.queries):
+            changes = store.deltas('safety', 'sf')
+        per_delta = (time.perf_counter() - t) / args.queries
+        print(f"🔁 Last-two-runs delta for {len(changes)} neighborhoods in {per_delta * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Neighborhood table benchmark
+
+Builds a synthetic city with thousands of neighborhoods and per-stage
+outputs shaped like the real ones, then compares assembling documents the
+old way (a list-membership filter over the centroids plus per-neighborhood
+.get(hood, default) merges) against NeighborhoodTable's array joins and
+one-pass document build.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.neighborhood_table_bench [--hoods 37 500 5000]
+"""
+import argparse
+import random
+import time
+from neighborhood_table import NeighborhoodTable, VENUE_CATEGORIES
+
+LEGACY_VENUE_STATS = {'avg_price': 2.0, 'avg_rating': 3.5, 'density': 0.0}
+
+
+def synthetic_city(count, seed=3):
+    rng = random.Random(seed)
+    hoods = [f"Hood {i}" for i in range(count)]
+    city = {
+        'id': 'bench',
+        'neighborhoods': hoods,
+        'centroids': {h: [37.7 + rng.random() * 0.1, -122.5 + rng.random() * 0.1] for h in hoods},
+        'default_coords': [37.75, -122.45],
+    }
+    covered = hoods[: int(count * 0.9)]
+    outputs = {
+        'crime': {h: round(rng.uniform(0, 100), 1) for h in covered},
+        'demographics': {h: {'population_density': rng.uniform(0, 100), 'age_demographic': rng.uniform(25, 55)}
+                         for h in hoods},
+        'property': {h: {'property_rates': rng.uniform(1500, 5000)} for h in hoods},
+        'yelp': {c: {h: {'avg_price': 2.0, 'avg_rating': 4.0, 'count': rng.randint(0, 50)} for h in covered}
+                 for c in VENUE_CATEGORIES},
+        'happening': {h: rng.uniform(0, 100) for h in hoods},
+    }
+    return city, outputs
+
+
+def legacy_records(city, outputs):
+    """The per-neighborhood dict merge main.save_all used to do"""
+    neighborhoods = city['neighborhoods']
+    located = [hood for hood in city['centroids'] if hood in neighborhoods]  # list membership
+    records = []
+    for hood in neighborhoods:
+        coords = city['centroids'].get(hood, city['default_coords'])
+        data = {'neighborhood': hood, 'coordinates': {'latitude': coords[0], 'longitude': coords[1]}}
+        data['safety'] = outputs['crime'].get(hood, 50.0)
+        demo = outputs['demographics'].get(hood, {})
+        data['population_density'] = demo.get('population_density', 50.0)
+        data['age_demographic'] = demo.get('age_demographic', 38.0)
+        data.update(outputs['property'].get(hood, {'property_rates': 3000.0}))
+        for category in VENUE_CATEGORIES:
+            data[category] = outputs['yelp'][category].get(hood, dict(LEGACY_VENUE_STATS))
+        data['happening'] = outputs['happening'].get(hood, 50.0)
+        records.append((hood, data, city['id']))
+    return located, records
+
+
+def table_records(city, outputs):
+    table = NeighborhoodTable(city)
+    located = list(table.located_items())
+    for stage, output in outputs.items():
+        table.load_stage(stage, output)
+    table.derive_densities()
+    return located, table.records()
+
+
+def best_of(func, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Neighborhood table benchmark")
+    parser.add_argument('--hoods', type=int, nargs='+', default=[37, 500, 5000])
+    args = parser.parse_args(argv)
+
+    for count in args.hoods:
+        city, outputs = synthetic_city(count)
+        legacy = best_of(lambda: legacy_records(city, outputs))
+        table = best_of(lambda: table_records(city, outputs))
+        print(f"🏘️  {count:>6} neighborhoods: dict merge {legacy * 1000:8.1f} ms, "
+              f"table {table * 1000:7.1f} ms ({legacy / table:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
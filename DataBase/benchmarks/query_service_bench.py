@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Query service benchmark
+
+Writes a synthetic JSONL snapshot, starts query_service on a free port and
+fires a mix of filtered/sorted/paginated queries from concurrent keep-alive
+clients, reporting throughput and p50/p95/p99 latency. Also compares the
+in-process index against a linear scan over the same records.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.query_service_bench [--records 5000] [--clients 16] [--seconds 5]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from query_service import NeighborhoodIndex, QueryService, make_server
+from utils.metrics import percentile
+
+QUERIES = [
+    'safety__gt=60&sort=-safety&limit=10',
+    'property_rates__lt=3000&safety__gte=50&limit=20',
+    'happening__gte=80&sort=-happening&limit=10&offset=10',
+    'bars.avg_rating__gte=4.2&population_density__lt=30000&limit=25',
+    'sort=property_rates&limit=50',
+    'safety__gte=40&safety__lt=45&limit=100',
+]
+
+
+def synthetic_records(count, seed=7, cities=('sf',)):
+    """Records shaped like main.py's combined documents"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        name = f"Neighborhood {i}"
+        records.append({
+            'neighborhood': name,
+            'doc_id': name.lower().replace(' ', '_'),
+            'city': cities[i % len(cities)],
+            'safety': round(rng.uniform(0, 100), 2),
+            'happening': round(rng.uniform(0, 100), 2),
+            'property_rates': round(rng.uniform(1500, 6000), 2),
+            'population_density': round(rng.uniform(2000, 60000), 1),
+            'age_demographic': round(rng.uniform(25, 55), 1),
+        })
+        for category in ('bars', 'restaurants', 'cafes'):
+            records[-1][category] = {
+                'avg_price': round(rng.uniform(1, 4), 1),
+                'avg_rating': round(rng.uniform(2.5, 5), 2),
+                'density': round(rng.uniform(0, 100), 1),
+            }
+    return records
+
+
+def linear_query(records, filters, limit):
+    """The baseline the index replaces: scan every record"""
+    out = []
+    for record in records:
+        ok = True
+        for field, op, value in filters:
+            actual = record
+            for part in field.split('.'):
+                actual = actual.get(part) if isinstance(actual, dict) else None
+            if actual is None or not {'gt': actual > value, 'gte': actual >= value,
+                                      'lt': actual < value, 'lte': actual <= value,
+                                      'eq': actual == value}[op]:
+                ok = False
+                break
+        if ok:
+            out.append(record)
+    return out[:limit]
+
+
+def bench_in_process(records, repeat=2000):
+    index = NeighborhoodIndex(records)
+    filters = [('safety', 'gte', 40.0), ('safety', 'lt', 45.0), ('property_rates', 'lt', 4000.0)]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        index.query(filters, limit=100)
+    indexed = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for _ in range(max(1, repeat // 20)):
+        linear_query(records, filters, 100)
+    linear = (time.perf_counter() - start) / max(1, repeat // 20)
+    return indexed, linear
+
+
+def client(port, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while time.perf_counter() < deadline:
+        path = '/neighborhoods?' + rng.choice(QUERIES)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except Exception as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query service benchmark")
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    records = synthetic_records(args.records)
+    indexed, linear = bench_in_process(records)
+    print(f"🧮 In-process range query over {args.records} records: "
+          f"index {indexed * 1e6:.1f} µs vs scan {linear * 1e6:.1f} µs ({linear / indexed:.0f}x)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'snapshot.jsonl')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(r) + '\n' for r in records)
+
+        service = QueryService(f"jsonl:{path}", 'sf')
+        server = make_server(service, '127.0.0.1', 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+
+        latencies, errors = [], []
+        deadline = time.perf_counter() + args.seconds
+        threads = [threading.Thread(target=client, args=(port, deadline, latencies, errors, i))
+                   for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server.shutdown()
+        server.server_close()
+
+    print(f"🔎 {len(latencies)} queries from {args.clients} clients in {args.seconds:.0f}s "
+          f"({len(latencies) / args.seconds:.0f} qps, {len(errors)} errors)")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}: {percentile(latencies, pct) * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
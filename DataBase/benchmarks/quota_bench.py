@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Quota benchmark: daily Yelp budget with and without the quota ledger
+
+The fake Yelp API answers 429 once --budget requests were made in a "day"
+(reset between days). The per-centroid Yelp stage needs 3 requests per
+neighborhood, more than a day's budget, and is run for --days days:
+
+  - no ledger: the stage runs until the API refuses; refused neighborhoods
+    are written with defaults (the stored values are lost)
+  - ledger: utils/quota.py knows the budget, defers what it can't cover
+    (stored values kept) and starts the next day with the oldest data
+
+Per day: requests sent and refused, neighborhood-categories fetched, kept
+and overwritten with defaults, and how many were never fetched so far.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.quota_bench [--budget 60] [--days 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+from benchmarks.fake_api import FakeApiServer
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quota ledger benchmark")
+    parser.add_argument('--budget', type=int, default=60, help="Yelp requests per day")
+    parser.add_argument('--days', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    server = FakeApiServer(daily_quota={'yelp': args.budget})
+    server.start()
+    os.environ.update(server.env())
+    os.environ.update({'RATE_LIMIT_DELAY': '0', 'COVERAGE_PLANNER': '0'})
+
+    # Imported after the environment points config at the fake API
+    import config
+    from city_registry import get_city
+    from neighborhood_table import NeighborhoodTable, VENUE_CATEGORIES
+    from pipelines.yelp_pipeline import process_all_yelp_data
+    from utils import http_client, quota
+
+    city = get_city('sf')
+    hoods = city['neighborhoods']
+    window = quota.window
+    try:
+        print(f"🎫 {len(hoods)} neighborhoods x 3 Yelp categories, {args.budget} requests/day")
+        for label, budget in (('no ledger', 0), ('ledger', args.budget)):
+            config.API_DAILY_QUOTAS['yelp'] = budget
+            quota.QUOTA_DIR = tempfile.mkdtemp(prefix='quota-')
+            fetched_on = {}
+            for day in range(1, args.days + 1):
+                quota.window = lambda day=day: f"day-{day}"
+                server.reset_stats()
+                http_client.reset_breakers()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    output = process_all_yelp_data(hoods, city)
+                table = NeighborhoodTable(city)
+                table.load_stage('yelp', output)
+                records = {hood: data for hood, data, _ in table.records()}
+
+                fresh = kept = defaulted = 0
+                for category in VENUE_CATEGORIES:
+                    for hood in hoods:
+                        stats = output[category].get(hood, 'missing')
+                        if stats is None:
+                            kept += 1
+                        elif stats == 'missing':
+                            defaulted += category in records[hood]
+                            fetched_on.pop((hood, category), None)
+                        else:
+                            fresh += 1
+                            fetched_on[(hood, category)] = day
+                never = len(hoods) * len(VENUE_CATEGORIES) - len(fetched_on)
+                refused = max(server.stats['yelp'] - args.budget, 0)
+                print(f"  {label:9} day {day}: {server.stats['yelp']:4} requests ({refused:3} refused), "
+                      f"{fresh:3} fetched, {kept:3} kept, {defaulted:3} defaulted, {never:3} without data")
+    finally:
+        quota.window = window
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+End-to-end pipeline benchmark against the local API stand-in
+
+Runs main.py's full flow (crime -> demographics -> property -> Yelp ->
+happening -> save) in a fresh subprocess per scale, with every external
+API served by benchmarks.fake_api and Firestore replaced by
+benchmarks.fake_firestore. Records wall time, peak RSS, per-API request
+counts and per-stage timings, and compares them with a JSON baseline.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.run_benchmarks                        # 37 hoods x 100k incidents
+    python -m benchmarks.run_benchmarks --scales 37x100k,500x1m,5000x10m
+    python -m benchmarks.run_benchmarks --save-baseline        # record a new baseline
+                                                               # (benchmarks/baseline.json, per machine)
+    python -m benchmarks.run_benchmarks --latency-ms 20 --error-rate 0.01
+
+Note: the JSON crime path materializes every incident, so 10M-incident
+scales need several GB of memory.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(BASE_DIR, 'benchmarks', 'baseline.json')
+
+# Rough Bay Area bounding box for synthetic neighborhoods
+LAT_RANGE = (37.20, 38.05)
+LON_RANGE = (-122.55, -121.75)
+
+
+def parse_count(text):
+    """'100k' -> 100000, '10m' -> 10000000"""
+    text = text.strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * multiplier)
+
+
+def parse_scales(text):
+    scales = []
+    for item in text.split(','):
+        hoods, incidents = item.lower().split('x')
+        scales.append((parse_count(hoods), parse_count(incidents)))
+    return scales
+
+
+def synthetic_neighborhoods(count):
+    """
+    The real San Francisco neighborhoods first, then a synthetic grid
+    spread over the Bay Area for larger scales
+    """
+    from config import NEIGHBORHOOD_COORDS
+
+    hoods = dict(list(NEIGHBORHOOD_COORDS.items())[:count])
+    remaining = count - len(hoods)
+    if remaining > 0:
+        side = int(remaining ** 0.5) + 1
+        for i in range(remaining):
+            row, col = divmod(i, side)
+            lat = LAT_RANGE[0] + (LAT_RANGE[1] - LAT_RANGE[0]) * (row + 0.5) / side
+            lon = LON_RANGE[0] + (LON_RANGE[1] - LON_RANGE[0]) * (col + 0.5) / side
+            hoods[f"Synthetic {i:05d}"] = (round(lat, 5), round(lon, 5))
+    return hoods
+
+
+def run_scale(server, n_hoods, n_incidents, workdir):
+    """Run one scale in a subprocess and return its measurements"""
+    hoods = synthetic_neighborhoods(n_hoods)
+    hoods_file = os.path.join(workdir, f"hoods_{n_hoods}.json")
+    with open(hoods_file, 'w', encoding='utf-8') as f:
+        json.dump(hoods, f)
+
+    server.options['crime_neighborhoods'] = list(hoods)
+    server.options['crime_centroids'] = hoods
+    server.options['venue_centroids'] = hoods
+    server.options['crime_incidents'] = n_incidents
+    server.reset_stats()
+
+    result_file = os.path.join(workdir, f"result_{n_hoods}_{n_incidents}.json")
+    env = dict(os.environ)
+    env.update(server.env())
+    env.update({
+        'NEIGHBORHOODS_FILE': hoods_file,
+        'CRIME_QUERY_LIMIT': str(n_incidents),
+        'RATE_LIMIT_DELAY': '0',
+        'CHECKPOINT_DIR': os.path.join(workdir, 'checkpoints'),
+        'HISTORY_DIR': os.path.join(workdir, 'history'),
+        'CRIME_TILES_DIR': os.path.join(workdir, 'tiles'),
+        'COVERAGE_PLAN_DIR': os.path.join(workdir, 'plans'),
+        'QUOTA_DIR': os.path.join(workdir, 'quota'),
+        'YELP_DAILY_QUOTA': '0',
+    })
+    subprocess.run(
+        [sys.executable, '-m', 'benchmarks.run_benchmarks', '--child', result_file,
+         '--metrics-dir', os.path.join(workdir, f"metrics_{n_hoods}_{n_incidents}")],
+        cwd=BASE_DIR, env=env, check=True,
+    )
+    with open(result_file, 'r', encoding='utf-8') as f:
+        result = json.load(f)
+    result['requests'] = dict(server.stats)
+    return result
+
+
+def child_main(result_file, metrics_dir):
+    """Inside the subprocess: run the pipeline against the fake Firestore"""
+    from benchmarks.fake_firestore import FakeFirestore
+    import main as pipeline
+
+    db = FakeFirestore()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            pipeline.main(['--no-checkpoints', '--metrics-dir', metrics_dir], db=db)
+        finally:
+            sys.stdout = stdout
+    wall = time.perf_counter() - start
+
+    with open(os.path.join(metrics_dir, 'run_report.json'), 'r', encoding='utf-8') as f:
+        report = json.load(f)
+
+    # ru_maxrss is KiB on Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'wall_seconds': wall,
+            'peak_rss_mb': peak_rss_mb,
+            'firestore_writes': db.writes,
+            'firestore_bytes': db.bytes_written,
+            'stages': report['stages'],
+        }, f)
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions against the baseline"""
+    regressions = []
+    for scale, current in results.items():
+        previous = baseline.get(scale)
+        if not previous:
+            continue
+        for key in ('wall_seconds', 'peak_rss_mb'):
+            before, after = previous[key], current[key]
+            if before and after > before * (1 + threshold):
+                regressions.append(f"{scale} {key}: {before:.2f} -> {after:.2f} (+{(after / before - 1) * 100:.0f}%)")
+        for route, count in current.get('requests', {}).items():
+            before = previous.get('requests', {}).get(route)
+            if before is not None and count > before:
+                regressions.append(f"{scale} {route} requests: {before} -> {count}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="vibeStreet end-to-end pipeline benchmark")
+    parser.add_argument('--scales', default='37x100k',
+                        help="Comma-separated NEIGHBORHOODSxINCIDENTS, e.g. 37x100k,500x1m,5000x10m")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Write results as the new baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Relative slowdown/memory growth flagged as a regression")
+    parser.add_argument('--output', help="Also write results to this JSON file")
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--child', metavar='RESULT_FILE', help=argparse.SUPPRESS)
+    parser.add_argument('--metrics-dir', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.child:
+        child_main(args.child, args.metrics_dir)
+        return 0
+
+    from benchmarks.fake_api import FakeApiServer
+
+    server = FakeApiServer(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+    )
+    server.start()
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            for n_hoods, n_incidents in parse_scales(args.scales):
+                scale = f"{n_hoods}x{n_incidents}"
+                print(f"⏱️  Benchmarking {n_hoods} neighborhoods x {n_incidents} incidents...")
+                results[scale] = run_scale(server, n_hoods, n_incidents, workdir)
+                r = results[scale]
+                print(f"  wall {r['wall_seconds']:.2f}s  peak RSS {r['peak_rss_mb']:.0f} MB  "
+                      f"requests {sum(v for k, v in r['requests'].items() if not k.endswith('_errors'))}")
+    finally:
+        server.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold)
+    unmatched = [scale for scale in results if not baseline.get(scale)]
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"💾 Baseline written to {args.baseline}")
+
+    if regressions:
+        print("\n🔴 Regressions against baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    if unmatched:
+        hint = '' if args.save_baseline else " (record one with --save-baseline)"
+        print(f"\n⚪ No baseline found for {', '.join(unmatched)} in {args.baseline}, nothing compared{hint}")
+        if len(unmatched) == len(results):
+            return 0
+    print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
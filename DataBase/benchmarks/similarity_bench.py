@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Similarity precompute/query benchmark
+
+Times the blocked k-nearest-neighbor precompute that save_all runs on a
+full write, and ad-hoc vector queries, at increasing neighborhood counts.
+A sample of rows is checked against a per-pair Python comparison over the
+record dicts (what a request handler would otherwise do).
+
+Usage (from the DataBase directory):
+    python -m benchmarks.similarity_bench [--sizes 1000,10000,30000] [--k 5]
+"""
+import argparse
+import math
+import random
+import time
+from benchmarks.query_service_bench import synthetic_records
+from benchmarks.ranking_bench import CITIES
+from similarity import SimilarityIndex, feature_matrix, nearest_neighbors
+
+
+def python_similar(records, target, k, matrix):
+    """All-pairs style baseline for one neighborhood: cosine over Python lists"""
+    rows = matrix.tolist()
+    a = rows[target]
+    norm_a = math.sqrt(sum(x * x for x in a)) or 1.0
+    scored = []
+    for j, b in enumerate(rows):
+        if j == target:
+            continue
+        norm_b = math.sqrt(sum(x * x for x in b)) or 1.0
+        scored.append((-sum(x * y for x, y in zip(a, b)) / (norm_a * norm_b), j))
+    return [j for _, j in sorted(scored)[:k]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Similarity benchmark")
+    parser.add_argument('--sizes', default='1000,10000,30000')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args(argv)
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        records = synthetic_records(size, seed=size, cities=CITIES)
+        start = time.perf_counter()
+        matrix, _, _ = feature_matrix(records)
+        features = time.perf_counter() - start
+        start = time.perf_counter()
+        indices, _ = nearest_neighbors(matrix, args.k)
+        precompute = time.perf_counter() - start
+        print(f"\n🧭 {size} neighborhoods: features {features * 1000:.0f} ms, "
+              f"kNN precompute {precompute * 1000:.0f} ms ({precompute / size * 1e6:.1f} µs/hood)")
+
+        rng = random.Random(size)
+        sample = rng.sample(range(size), 3)
+        start = time.perf_counter()
+        expected = [python_similar(records, t, args.k, matrix) for t in sample]
+        per_python = (time.perf_counter() - start) / len(sample)
+        exact = all(set(indices[t].tolist()) == set(e) for t, e in zip(sample, expected))
+        print(f"  python baseline {per_python * 1000:.1f} ms per neighborhood "
+              f"(≈{per_python * size:.0f} s for all)  {'exact' if exact else 'MISMATCH'}")
+
+        index = SimilarityIndex(records)
+        for metric in ('cosine', 'euclidean'):
+            index.similar_to(records[0]['neighborhood'], args.k, metric)  # warm the prepared matrix
+            start = time.perf_counter()
+            for _ in range(args.queries):
+                vector = index.vector({'safety': rng.uniform(0, 100), 'property_rates': rng.uniform(1500, 6000)})
+                index.query(vector, args.k, metric)
+            per_query = (time.perf_counter() - start) / args.queries
+            print(f"  ad-hoc {metric:9} query {per_query * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
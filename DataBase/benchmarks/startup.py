@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark
+
+Measures how long the entry points take before doing any real work and
+which imports dominate, using fresh interpreters and `python -X importtime`.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.startup [--repeat 5] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (label, python args)
+COMMANDS = [
+    ('import main', ['-c', 'import main']),
+    ('main.py --help', ['main.py', '--help']),
+    ('import daemon', ['-c', 'import daemon']),
+    ('import firebase_client', ['-c', 'import firebase_client']),
+]
+
+
+def time_command(args, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=BASE_DIR, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def import_times(statement):
+    """Parse -X importtime output into [(cumulative_us, self_us, module)]"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=BASE_DIR, check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup-time benchmark")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15, help="Slowest imports to list")
+    args = parser.parse_args(argv)
+
+    baseline = statistics.median(time_command(['-c', 'pass'], args.repeat))
+    print(f"⏱️  Interpreter baseline: {baseline * 1000:.0f} ms\n")
+    for label, cmd in COMMANDS:
+        samples = time_command(cmd, args.repeat)
+        print(f"  {label:28} median {statistics.median(samples) * 1000:6.0f} ms   "
+              f"min {min(samples) * 1000:6.0f} ms")
+
+    for statement in ('import main', 'import firebase_client'):
+        rows = import_times(statement)
+        total = max(rows)[0] if rows else 0
+        print(f"\n📦 {statement}: {total / 1000:.0f} ms cumulative import time")
+        for cumulative, self_us, module in sorted(rows, reverse=True)[:args.top]:
+            print(f"  {cumulative / 1000:8.1f} ms  (self {self_us / 1000:6.1f})  {module}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tail latency and failure benchmark for the external API stages
+
+Against the fake API with injected latency, tail latency and errors (drawn
+per request, so a hedged duplicate sees its own delay):
+
+  1. hedging: the Yelp stage for one category, repeated, with HEDGE_REQUESTS
+     off and on; p50/p95/p99 stage time and hedges sent
+  2. breaker: the per-centroid Google Places stage (COVERAGE_PLANNER off,
+     three requests per neighborhood) against a failing API, with the
+     circuit breaker effectively disabled and enabled; stage time, requests
+     sent and neighborhoods kept
+
+Usage (from the DataBase directory):
+    python -m benchmarks.tail_latency_bench [--runs 30] [--tail-ms 1500]
+"""
+import argparse
+import os
+import tempfile
+import time
+from benchmarks.fake_api import FakeApiServer
+
+
+def summarize(samples):
+    from utils.metrics import percentile
+    return ', '.join(f"p{p} {percentile(samples, p):.2f}s" for p in (50, 95, 99))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tail latency and failure benchmark")
+    parser.add_argument('--runs', type=int, default=30, help="Yelp stage runs per setting")
+    parser.add_argument('--latency-ms', type=float, default=10)
+    parser.add_argument('--jitter-ms', type=float, default=10)
+    parser.add_argument('--tail-rate', type=float, default=0.02)
+    parser.add_argument('--tail-ms', type=float, default=1500)
+    parser.add_argument('--error-rate', type=float, default=0.6, help="Google Places failure rate in part 2")
+    args = parser.parse_args(argv)
+
+    server = FakeApiServer(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, tail_rate=args.tail_rate,
+                           tail_ms=args.tail_ms, per_request_faults=True)
+    server.start()
+    os.environ.update(server.env())
+    os.environ.update({'RATE_LIMIT_DELAY': '0', 'QUOTA_DIR': tempfile.mkdtemp(prefix='quota-'),
+                       'YELP_DAILY_QUOTA': '0'})
+
+    # Imported after the environment points config at the fake API
+    import config
+    from city_registry import get_city
+    from pipelines.events_pipeline_google import process_happening_index
+    from pipelines.yelp_pipeline import process_yelp_category
+    from utils import http_client, metrics
+
+    city = get_city('sf')
+    hoods = city['neighborhoods']
+    metrics.enable()
+    try:
+        print(f"🐢 Yelp stage ({len(hoods)} requests), {args.tail_rate:.0%} of requests +{args.tail_ms:.0f} ms")
+        for hedge in (False, True):
+            config.HEDGE_REQUESTS = hedge
+            http_client.reset_breakers()
+            metrics.reset()
+            process_yelp_category(hoods, 'bars', 'bars,nightlife', city)  # warm up the latency window
+            times = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                process_yelp_category(hoods, 'bars', 'bars,nightlife', city)
+                times.append(time.perf_counter() - start)
+            hosts = metrics.build_report()['hosts']
+            hedges = sum(h['hedges'] for h in hosts.values())
+            requests = sum(h['requests'] for h in hosts.values())
+            print(f"  hedging {'on ' if hedge else 'off'}: {summarize(times)}  "
+                  f"({hedges} hedges, {hedges / max(requests - hedges, 1):.1%} extra requests)")
+
+        config.HEDGE_REQUESTS = False
+        config.COVERAGE_PLANNER = False
+        server.options.update(tail_rate=0.0, error_rate=args.error_rate, latency_ms=200)
+        print(f"💥 Google Places stage, {args.error_rate:.0%} of requests fail after 200 ms")
+        for failures in (10 ** 6, config.BREAKER_FAILURES):
+            config.BREAKER_FAILURES = failures
+            http_client.reset_breakers()
+            server.reset_stats()
+            start = time.perf_counter()
+            scores = process_happening_index(hoods, city)
+            elapsed = time.perf_counter() - start
+            label = 'breaker off' if failures == 10 ** 6 else f"breaker at {failures} failures"
+            print(f"  {label}: {elapsed:.2f}s, {server.stats['places']} requests sent, "
+                  f"{len(scores)} neighborhoods scored")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+ZORI ingestion benchmark
+
+Writes a synthetic ZIP-level ZORI file (every US ZIP Zillow covers, one
+column per month since 2015) and compares utils.zori's streaming reader,
+which keeps only the city's ZIPs and the last ZORI_MONTHS columns, against
+loading the whole file into a pandas DataFrame. Time and peak traced
+memory are reported for both.
+
+Usage (from the DataBase directory):
+    python -m benchmarks.zori_bench [--zips 8000] [--months 130]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from city_registry import get_city
+from utils.zori import neighborhood_rents
+
+
+def write_zori(path, zips, n_zips, n_months, seed=5):
+    rng = random.Random(seed)
+    months = [f"{2015 + m // 12}-{m % 12 + 1:02d}-28" for m in range(n_months)]
+    codes = list(zips) + [f"{rng.randrange(1000, 99999):05d}" for _ in range(n_zips - len(zips))]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('RegionID,SizeRank,RegionName,RegionType,StateName,State,City,Metro,CountyName,'
+                + ','.join(months) + '\n')
+        for rank, code in enumerate(codes):
+            rent = rng.uniform(1200, 4000)
+            values = []
+            for m in range(n_months):
+                rent *= 1 + rng.gauss(0.003, 0.01)
+                values.append('' if m < rng.randrange(0, 40) else f"{rent:.2f}")
+            f.write(f"{90000 + rank},{rank},{int(code)},zip,CA,CA,City,Metro,County,"
+                    + ','.join(values) + '\n')
+
+
+def measure(func):
+    """(result, seconds, peak traced bytes); timed in a separate untraced call"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ZORI ingestion benchmark")
+    parser.add_argument('--zips', type=int, default=8000)
+    parser.add_argument('--months', type=int, default=130)
+    parser.add_argument('--keep', type=int, default=12, help="Trailing months kept (ZORI_MONTHS)")
+    args = parser.parse_args(argv)
+
+    city = get_city('sf')
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'zori_zip.csv')
+        write_zori(path, city['zips'], args.zips, args.months)
+        print(f"📄 {args.zips} ZIPs x {args.months} months, {os.path.getsize(path) / 1e6:.1f} MB")
+
+        rents, elapsed, peak = measure(lambda: neighborhood_rents(path, city, args.keep))
+        print(f"  streaming: {elapsed * 1000:.0f} ms, peak traced memory {peak / 1e6:.2f} MB, "
+              f"{len(rents)} neighborhoods (Mission {rents.get('Mission')})")
+
+        try:
+            import pandas as pd
+        except ImportError:
+            return
+        _, elapsed, peak = measure(lambda: pd.read_csv(path))
+        print(f"  full DataFrame: {elapsed * 1000:.0f} ms, peak traced memory {peak / 1e6:.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
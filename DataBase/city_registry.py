@@ -0,0 +1,113 @@
+"""
+City registry
+
+Each city is a data file, cities/<id>.json:
+
+    {
+      "name": "San Francisco",
+      "neighborhoods": [...],              # optional, defaults to the centroid names
+      "centroids": {"Mission": [37.7599, -122.4148], ...},
+      "default_coords": [37.7749, -122.4194],
+      "crime": {                           # null when the city has no open crime feed
+        "url": "https://.../resource/xxxx-xxxx.json",
+        "fields": {"neighborhood": ..., "category": ..., "subcategory": ..., "datetime": ...,
+                   "latitude": ..., "longitude": ...},  # coordinates optional, for crime tiles
+        "aliases": {"Our Name": ["Feed Name", ...]}
+      },
+      "zips": {"94110": ["Mission", "Bernal Heights"], ...},   # ZIP -> neighborhoods, for ZORI rents
+      "fallbacks": {"crime": {...}, "happening": {...}, "rent": {...}, "age": {...}, "density": {...}}
+    }
+
+"builtin": true marks the city whose curated fallbacks and name aliases
+live in the pipeline modules themselves (San Francisco). Files are read
+on first use and cached for the life of the process.
+"""
+import json
+import os
+from functools import lru_cache
+
+import config
+
+CITIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cities')
+DEFAULT_CITY = os.getenv('DEFAULT_CITY', 'sf')
+
+# SODA field names used by the SF incident reports feed
+DEFAULT_CRIME_FIELDS = {
+    'neighborhood': 'analysis_neighborhood',
+    'category': 'incident_category',
+    'subcategory': 'incident_subcategory',
+    'datetime': 'incident_datetime',
+}
+
+def available_cities():
+    """Ids of every city with a data file"""
+    return sorted(
+        name[:-len('.json')]
+        for name in os.listdir(CITIES_DIR)
+        if name.endswith('.json')
+    )
+
+@lru_cache(maxsize=None)
+def get_city(city_id=None):
+    """
+    Load and normalize a city entry
+    Treat the returned dict as read-only: it is shared by every caller
+    """
+    city_id = city_id or DEFAULT_CITY
+    path = os.path.join(CITIES_DIR, f"{city_id}.json")
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown city '{city_id}' (available: {', '.join(available_cities())})")
+
+    with open(path, 'r', encoding='utf-8') as f:
+        city = json.load(f)
+
+    city['id'] = city_id
+    centroids = {name: tuple(coords) for name, coords in city.get('centroids', {}).items()}
+    neighborhoods = city.get('neighborhoods') or list(centroids)
+
+    # NEIGHBORHOODS_FILE replaces the default city's neighborhoods (benchmarks, experiments)
+    if city_id == DEFAULT_CITY and config.NEIGHBORHOODS_FILE:
+        with open(config.NEIGHBORHOODS_FILE, 'r', encoding='utf-8') as f:
+            centroids = {name: tuple(coords) for name, coords in json.load(f).items()}
+        neighborhoods = list(centroids)
+
+    city['centroids'] = centroids
+    city['neighborhoods'] = neighborhoods
+    city['default_coords'] = tuple(city.get('default_coords') or next(iter(centroids.values())))
+    city['zips'] = city.get('zips') or {}
+
+    crime = city.get('crime')
+    if crime:
+        crime = dict(crime)
+        crime['fields'] = dict(DEFAULT_CRIME_FIELDS, **crime.get('fields', {}))
+        # e.g. SF_CRIME_DATA_URL points the SF feed at a local stand-in
+        crime['url'] = os.getenv(f"{city_id.upper()}_CRIME_DATA_URL", crime.get('url'))
+        city['crime'] = crime
+    return city
+
+# Our SF neighborhood names -> the composite areas the builtin curated dicts use
+CURATED_AREAS = {
+    "Castro": "Castro/Upper Market",
+    "Sunset": "Sunset/Parkside",
+    "Parkside": "Sunset/Parkside",
+    "Financial District": "Financial District/South Beach",
+    "South Beach": "Financial District/South Beach",
+    "Bayview": "Bayview Hunters Point",
+}
+
+def get_fallbacks(city, kind, builtin=None):
+    """
+    Curated fallback values of one kind ('crime', 'happening', 'rent', 'age', 'density')
+    Builtin cities fall back to the dicts curated in the pipeline modules,
+    re-keyed so every neighborhood inside a composite area gets its value
+    """
+    fallbacks = city.get('fallbacks') or {}
+    if kind in fallbacks:
+        return dict(fallbacks[kind])
+    if city.get('builtin') and builtin is not None:
+        data = dict(builtin())
+        for hood, area in CURATED_AREAS.items():
+            if area in data:
+                data.setdefault(hood, data[area])
+        return data
+    return {}
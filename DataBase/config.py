@@ -7,114 +7,72 @@ load_dotenv()
 YELP_API_KEY = os.getenv('YELP_API_KEY')
 EVENTBRITE_TOKEN = os.getenv('EVENTBRITE_TOKEN')
 FIREBASE_CRED_PATH = os.getenv('FIREBASE_CRED_PATH', 'firebase-credentials.json')
+FIRESTORE_LAYOUT = os.getenv('FIRESTORE_LAYOUT', 'single')  # single | split | scores (see firebase_client.py)
 
-# San Francisco Neighborhoods (Expanded)
-NEIGHBORHOODS = [
-    # Central/Downtown
-    "Financial District",
-    "SoMa",
-    "South Beach",
-    
-    # Northern Waterfront
-    "North Beach",
-    "Russian Hill",
-    "Nob Hill",
-    "Chinatown",
-    
-    # Western
-    "Marina",
-    "Cow Hollow",
-    "Pacific Heights",
-    "Presidio Heights",
-    "Inner Richmond",
-    "Outer Richmond",
-    "Sunset",
-    "Parkside",
-    "Lake Merced",
-    
-    # Central
-    "Hayes Valley",
-    "Western Addition",
-    "Japantown",
-    "Haight Ashbury",
-    "Twin Peaks",
-    "Forest Hill",
-    
-    # Eastern
-    "Mission",
-    "Mission Bay",
-    "Potrero Hill",
-    
-    # Castro/Noe Valley Area
-    "Castro",
-    "Noe Valley",
-    "Glen Park",
-    
-    # Southern
-    "Bernal Heights",
-    "Outer Mission",
-    "Excelsior",
-    "Visitacion Valley",
-    "Bayview",
-    "Ingleside",
-    "Oceanview",
-    "Portola",
-]
+# Neighborhoods, centroids and crime feeds live per city in cities/<id>.json
+# (see city_registry.py). NEIGHBORHOODS, NEIGHBORHOOD_COORDS and
+# SF_CRIME_DATA_URL still resolve here, lazily, for the default city.
 
-# Neighborhood approximate centers (lat, lon) for API queries
-NEIGHBORHOOD_COORDS = {
-    # Central/Downtown
-    "Financial District": (37.7946, -122.3999),
-    "SoMa": (37.7749, -122.4194),
-    "South Beach": (37.7844, -122.3892),
-    
-    # Northern Waterfront
-    "North Beach": (37.8006, -122.4103),
-    "Russian Hill": (37.8014, -122.4205),
-    "Nob Hill": (37.7919, -122.4147),
-    "Chinatown": (37.7941, -122.4078),
-    
-    # Western
-    "Marina": (37.8021, -122.4363),
-    "Pacific Heights": (37.7919, -122.4364),
-    "Presidio Heights": (37.7872, -122.4539),
-    "Inner Richmond": (37.7805, -122.4647),
-    "Outer Richmond": (37.7758, -122.4922),
-    "Sunset": (37.7436, -122.4947),
-    "Parkside": (37.7366, -122.4959),
-    "Lake Merced": (37.7183, -122.4850),
-    
-    # Central
-    "Hayes Valley": (37.7753, -122.4256),
-    "Western Addition": (37.7836, -122.4317),
-    "Japantown": (37.7853, -122.4309),
-    "Haight Ashbury": (37.7693, -122.4482),
-    "Cole Valley": (37.7644, -122.4506),
-    "Twin Peaks": (37.7544, -122.4477),
-    "Forest Hill": (37.7449, -122.4592),
-    
-    # Eastern
-    "Mission": (37.7599, -122.4148),
-    "Mission Bay": (37.7706, -122.3922),
-    "Potrero Hill": (37.7587, -122.3988),
-    
-    # Castro/Noe Valley Area
-    "Castro": (37.7609, -122.4350),
-    "Noe Valley": (37.7487, -122.4308),
-    "Glen Park": (37.7332, -122.4339),
-    
-    # Southern
-    "Bernal Heights": (37.7419, -122.4200),
-    "Outer Mission": (37.7247, -122.4467),
-    "Excelsior": (37.7247, -122.4261),
-    "Visitacion Valley": (37.7133, -122.4039),
-    "Bayview": (37.7295, -122.3814),
-    "Ingleside": (37.7244, -122.4453),
-    "Oceanview": (37.7236, -122.4539),
-    "Portola": (37.7264, -122.4181),
+# Optional override: JSON file of {"Neighborhood": [lat, lon]} used instead of
+# the default city's neighborhoods (benchmarks and local experiments)
+NEIGHBORHOODS_FILE = os.getenv('NEIGHBORHOODS_FILE')
+
+def __getattr__(name):
+    if name in ('NEIGHBORHOODS', 'NEIGHBORHOOD_COORDS', 'SF_CRIME_DATA_URL'):
+        from city_registry import get_city
+        city = get_city('sf') if name == 'SF_CRIME_DATA_URL' else get_city()
+        return {
+            'NEIGHBORHOODS': city['neighborhoods'],
+            'NEIGHBORHOOD_COORDS': city['centroids'],
+            'SF_CRIME_DATA_URL': (city['crime'] or {}).get('url'),
+        }[name]
+    raise AttributeError(f"module 'config' has no attribute '{name}'")
+
+# API Endpoints (overridable so the pipelines can be pointed at a local stand-in)
+YELP_SEARCH_URL = os.getenv('YELP_SEARCH_URL', "https://api.yelp.com/v3/businesses/search")
+EVENTBRITE_SEARCH_URL = os.getenv('EVENTBRITE_SEARCH_URL', "https://www.eventbriteapi.com/v3/events/search/")
+GOOGLE_PLACES_URL = os.getenv('GOOGLE_PLACES_URL', "https://maps.googleapis.com/maps/api/place/nearbysearch/json")
+
+# Request tuning
+CRIME_QUERY_LIMIT = int(os.getenv('CRIME_QUERY_LIMIT', '100000'))
+CRIME_FEED_FORMAT = os.getenv('CRIME_FEED_FORMAT', 'json')  # 'json' loads the whole body, 'csv' (opt-in) streams typed columns
+RATE_LIMIT_DELAY = float(os.getenv('RATE_LIMIT_DELAY', '0.5'))  # seconds between Yelp/Places calls
+CITY_WORKERS = int(os.getenv('CITY_WORKERS', '4'))  # process pool size for multi-city runs
+COVERAGE_PLANNER = os.getenv('COVERAGE_PLANNER', '0') == '1'  # opt-in Yelp/Places query_planner cells; a cold plan costs more calls than per-centroid
+COVERAGE_FOOTPRINT_KM = float(os.getenv('COVERAGE_FOOTPRINT_KM', '1.5'))  # neighborhood radius around its centroid
+EVENTBRITE_MAX_PAGES = int(os.getenv('EVENTBRITE_MAX_PAGES', '200'))  # safety stop for the citywide Eventbrite sweep
+
+# Daily request budgets per API, counted across runs in utils/quota.py (0 = unlimited);
+# set them to the plan's quota (e.g. YELP_DAILY_QUOTA=5000 on Yelp's free tier,
+# Places: the per-day cap set in the Cloud console)
+API_DAILY_QUOTAS = {
+    'yelp': int(os.getenv('YELP_DAILY_QUOTA', '0')),
+    'places': int(os.getenv('PLACES_DAILY_QUOTA', '0')),
+    'eventbrite': int(os.getenv('EVENTBRITE_DAILY_QUOTA', '0')),
 }
 
-# API Endpoints
-SF_CRIME_DATA_URL = "https://data.sfgov.org/resource/wg3w-h783.json"
-YELP_SEARCH_URL = "https://api.yelp.com/v3/businesses/search"
-EVENTBRITE_SEARCH_URL = "https://www.eventbriteapi.com/v3/events/search/"
\ No newline at end of file
+# Tail latency and failing APIs (see utils/http_client.py)
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', '5'))      # consecutive failures that open a host's circuit
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', '30'))   # seconds before a probe request is let through
+HEDGE_REQUESTS = os.getenv('HEDGE_REQUESTS', '0') == '1'        # duplicate slow idempotent GETs (costs API quota)
+HEDGE_PERCENTILE = float(os.getenv('HEDGE_PERCENTILE', '95'))   # hedge after this percentile of recent latency
+
+# Local bulk files for demographics (optional; see utils/acs.py)
+ACS_DATA_FILE = os.getenv('ACS_DATA_FILE')                  # ACS 5-year extract, one row per tract
+TRACT_GAZETTEER_FILE = os.getenv('TRACT_GAZETTEER_FILE')    # Census tract gazetteer (land area, internal point)
+TRACT_CROSSWALK_FILE = os.getenv('TRACT_CROSSWALK_FILE')    # optional tract,neighborhood,weight CSV
+CROSSWALK_MAX_KM = float(os.getenv('CROSSWALK_MAX_KM', '2.0'))  # nearest-centroid cutoff without a crosswalk
+
+# Local Zillow Observed Rent Index file for property rates (optional; see utils/zori.py)
+ZORI_DATA_FILE = os.getenv('ZORI_DATA_FILE')   # ZIP-level wide CSV, one column per month
+ZORI_MONTHS = int(os.getenv('ZORI_MONTHS', '12'))  # trailing months kept for the latest value and trend
+
+# Refresh daemon: seconds between refreshes per stage, +/- REFRESH_JITTER (fraction)
+REFRESH_INTERVALS = {
+    'crime': int(os.getenv('REFRESH_INTERVAL_CRIME', 60 * 60)),                      # hourly
+    'happening': int(os.getenv('REFRESH_INTERVAL_HAPPENING', 4 * 60 * 60)),          # several times a day
+    'yelp': int(os.getenv('REFRESH_INTERVAL_YELP', 24 * 60 * 60)),                   # daily
+    'demographics': int(os.getenv('REFRESH_INTERVAL_DEMOGRAPHICS', 90 * 24 * 60 * 60)),  # quarterly
+    'property': int(os.getenv('REFRESH_INTERVAL_PROPERTY', 90 * 24 * 60 * 60)),
+}
+REFRESH_JITTER = float(os.getenv('REFRESH_JITTER', '0.1'))
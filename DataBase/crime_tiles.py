@@ -0,0 +1,262 @@
+"""
+Hierarchical crime density tiles
+
+Incidents with coordinates are binned into Web Mercator (slippy map) tiles
+at several zoom levels, weighted by assign_crime_severity_weight. Each
+level is a dense float32 grid over the city's bounds, so finding a point's
+tile is two floor()s and an array index, and a "z/x/y" cell id maps
+straight to its slot.
+
+A tile's safety is its percentile among the city's non-empty tiles at the
+same zoom: 100 for the least weighted crime, 0 for the most. Lookups use
+the finest zoom whose tile has at least MIN_TILE_INCIDENTS and fall back
+to coarser ones, so sparse blocks borrow their parent's score.
+
+Tiles accumulate with add() (batches from any number of fetches) and two
+tile sets over the same bounds combine with merge(). Saved per city as
+CRIME_TILES_DIR/<city>.npz.
+
+    python crime_tiles.py lookup 37.7599 -122.4148 [--city sf]
+"""
+import argparse
+import math
+import os
+import numpy as np
+
+CRIME_TILES_DIR = os.getenv('CRIME_TILES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.tiles'))
+TILE_ZOOMS = (14, 15, 16, 17)       # ~1.9 km down to ~240 m tiles at SF's latitude
+MIN_TILE_INCIDENTS = 20
+BOUNDS_MARGIN_DEG = 0.03            # padding around the city's centroids
+
+def tile_xy(lat, lon, zoom):
+    """Slippy map tile x, y (arrays or scalars) for lat/lon in degrees"""
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lat, -85.0511, 85.0511))
+    x = np.floor((np.asarray(lon) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return x.astype(np.int64), y.astype(np.int64)
+
+
+def city_bounds(city, margin=BOUNDS_MARGIN_DEG):
+    """(lat_min, lat_max, lon_min, lon_max) around the city's centroids"""
+    points = np.array(list(city['centroids'].values()) or [city['default_coords']], dtype=float)
+    return (float(points[:, 0].min() - margin), float(points[:, 0].max() + margin),
+            float(points[:, 1].min() - margin), float(points[:, 1].max() + margin))
+
+
+class CrimeTiles:
+    """Severity-weighted incident grids at several zooms over fixed bounds"""
+
+    def __init__(self, bounds, zooms=TILE_ZOOMS):
+        self.bounds = tuple(float(b) for b in bounds)
+        self.zooms = tuple(zooms)
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        self.origin = {}
+        self.weights = {}
+        self.counts = {}
+        for zoom in self.zooms:
+            # y grows southwards
+            x0, y0 = tile_xy(lat_max, lon_min, zoom)
+            x1, y1 = tile_xy(lat_min, lon_max, zoom)
+            self.origin[zoom] = (int(x0), int(y0))
+            self.weights[zoom] = np.zeros((int(y1 - y0) + 1, int(x1 - x0) + 1), dtype=np.float32)
+            self.counts[zoom] = np.zeros(self.weights[zoom].shape, dtype=np.uint32)
+        self.dropped = 0
+        self._safety = {}
+
+    def add(self, lats, lons, weights):
+        """Bin a batch of incidents; ones without usable coordinates or outside the bounds are dropped"""
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        weights = np.asarray(weights, dtype=float)
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        inside = (lats >= lat_min) & (lats <= lat_max) & (lons >= lon_min) & (lons <= lon_max)
+        self.dropped += int(len(lats) - inside.sum())
+        lats, lons, weights = lats[inside], lons[inside], weights[inside]
+
+        for zoom in self.zooms:
+            grid = self.weights[zoom]
+            x, y = tile_xy(lats, lons, zoom)
+            x0, y0 = self.origin[zoom]
+            flat = (y - y0) * grid.shape[1] + (x - x0)
+            grid += np.bincount(flat, weights, minlength=grid.size).reshape(grid.shape).astype(np.float32)
+            self.counts[zoom] += np.bincount(flat, minlength=grid.size).reshape(grid.shape).astype(np.uint32)
+        self._safety = {}
+        return int(inside.sum())
+
+    def merge(self, other):
+        """Add another tile set built over the same bounds and zooms"""
+        if other.bounds != self.bounds or other.zooms != self.zooms:
+            raise ValueError("Tiles cover different bounds or zooms")
+        for zoom in self.zooms:
+            self.weights[zoom] += other.weights[zoom]
+            self.counts[zoom] += other.counts[zoom]
+        self.dropped += other.dropped
+        self._safety = {}
+
+    def safety(self, zoom):
+        """Safety grid for one zoom (NaN for empty tiles)"""
+        if zoom not in self._safety:
+            weights = self.weights[zoom]
+            occupied = self.counts[zoom] > 0
+            ranked = np.sort(weights[occupied])
+            grid = np.full(weights.shape, np.nan, dtype=np.float32)
+            if len(ranked):
+                below = np.searchsorted(ranked, weights[occupied], side='left')
+                grid[occupied] = 100.0 * (1.0 - below / max(len(ranked) - 1, 1))
+            self._safety[zoom] = grid
+        return self._safety[zoom]
+
+    def _slot(self, zoom, x, y):
+        x0, y0 = self.origin[zoom]
+        row, col = y - y0, x - x0
+        shape = self.weights[zoom].shape
+        if 0 <= row < shape[0] and 0 <= col < shape[1]:
+            return row, col
+        return None
+
+    def _describe(self, zoom, x, y, slot):
+        return {
+            'cell': f"{zoom}/{x}/{y}",
+            'zoom': zoom,
+            'safety': round(float(self.safety(zoom)[slot]), 1),
+            'incidents': int(self.counts[zoom][slot]),
+            'weight': round(float(self.weights[zoom][slot]), 1),
+        }
+
+    def cell(self, cell_id):
+        """Tile summary for a "z/x/y" cell id, or None if it is empty or outside the grid"""
+        try:
+            zoom, x, y = (int(part) for part in cell_id.split('/'))
+        except ValueError:
+            raise ValueError(f"Cell ids look like 16/10483/25332, not {cell_id!r}")
+        if zoom not in self.weights:
+            raise ValueError(f"Zoom {zoom} not built (zooms: {', '.join(map(str, self.zooms))})")
+        slot = self._slot(zoom, x, y)
+        if slot is None or not self.counts[zoom][slot]:
+            return None
+        return self._describe(zoom, x, y, slot)
+
+    def lookup(self, lat, lon, min_incidents=MIN_TILE_INCIDENTS):
+        """
+        Safety at a point from the finest tile with at least min_incidents,
+        else the coarsest non-empty one; None outside the bounds or with no data
+        """
+        # Tiles nest, so coarser x/y are the finest ones shifted right
+        finest = max(self.zooms)
+        n = 2 ** finest
+        lat_rad = math.radians(max(-85.0511, min(85.0511, lat)))
+        fx = int((lon + 180.0) / 360.0 * n)
+        fy = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+        fallback = None
+        for zoom in sorted(self.zooms, reverse=True):
+            x, y = fx >> (finest - zoom), fy >> (finest - zoom)
+            slot = self._slot(zoom, x, y)
+            if slot is None or not self.counts[zoom][slot]:
+                continue
+            if self.counts[zoom][slot] >= min_incidents:
+                return self._describe(zoom, x, y, slot)
+            fallback = (zoom, x, y, slot)
+        return self._describe(*fallback) if fallback else None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {'bounds': np.array(self.bounds), 'zooms': np.array(self.zooms),
+                  'dropped': np.array(self.dropped)}
+        for zoom in self.zooms:
+            arrays[f"weights_{zoom}"] = self.weights[zoom]
+            arrays[f"counts_{zoom}"] = self.counts[zoom]
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            tiles = cls(data['bounds'].tolist(), data['zooms'].tolist())
+            for zoom in tiles.zooms:
+                tiles.weights[zoom] = data[f"weights_{zoom}"]
+                tiles.counts[zoom] = data[f"counts_{zoom}"]
+            tiles.dropped = int(data['dropped'])
+        return tiles
+
+
+def tiles_path(city_id):
+    return os.path.join(CRIME_TILES_DIR, f"{city_id}.npz")
+
+
+def load_tiles(city_id):
+    """The city's saved tiles, or None if none were built"""
+    path = tiles_path(city_id)
+    return CrimeTiles.load(path) if os.path.exists(path) else None
+
+
+def _coordinate(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def build_tiles(incidents, city, fields, weigh, tiles=None):
+    """
+    Bin incidents (SODA row dicts or utils.soda.IncidentColumns) into tiles;
+    weigh(category, subcategory) gives the severity. Returns the tiles, or
+    None if no incident has coordinates
+    """
+    if hasattr(incidents, 'severity'):  # utils.soda.IncidentColumns
+        if not incidents.has_coordinates:
+            return None
+        views = incidents.arrays()
+        tiles = tiles or CrimeTiles(city_bounds(city))
+        tiles.add(views['latitude'], views['longitude'], incidents.severity(weigh))
+        return tiles
+
+    lat_field, lon_field = fields.get('latitude'), fields.get('longitude')
+    if not lat_field or not lon_field:
+        return None
+    count = len(incidents)
+    lats = np.fromiter((_coordinate(i.get(lat_field)) for i in incidents), dtype=float, count=count)
+    lons = np.fromiter((_coordinate(i.get(lon_field)) for i in incidents), dtype=float, count=count)
+    if np.isnan(lats).all():
+        return None
+
+    # Few distinct categories, so weigh each once
+    subcategory = fields.get('subcategory') or ''
+    cache = {}
+    def weight(incident):
+        key = (incident.get(fields['category'], ''), incident.get(subcategory, ''))
+        if key not in cache:
+            cache[key] = weigh(*key)
+        return cache[key]
+    weights = np.fromiter((weight(i) for i in incidents), dtype=float, count=count)
+
+    tiles = tiles or CrimeTiles(city_bounds(city))
+    tiles.add(lats, lons, weights)
+    return tiles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crime density tiles")
+    parser.add_argument('--city', default=None, help="City id (default: CITY or sf)")
+    sub = parser.add_subparsers(dest='command', required=True)
+    lookup = sub.add_parser('lookup', help="Safety at a point")
+    lookup.add_argument('lat', type=float)
+    lookup.add_argument('lon', type=float)
+    cell = sub.add_parser('cell', help="Summary of one z/x/y tile")
+    cell.add_argument('cell_id')
+    args = parser.parse_args(argv)
+
+    from city_registry import get_city
+    city_id = get_city(args.city)['id']
+    tiles = load_tiles(city_id)
+    if tiles is None:
+        print(f"❌ No crime tiles for {city_id} yet (run the crime stage)")
+        return 1
+    result = tiles.lookup(args.lat, args.lon) if args.command == 'lookup' else tiles.cell(args.cell_id)
+    print(result if result else "∅ No incidents there")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
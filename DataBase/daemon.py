@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Long-running refresh daemon
+
+Instead of cron-launching main.py for everything at once, each stage is
+refreshed on its own interval (config.REFRESH_INTERVALS, with jitter so
+stages and daemons don't align). The process keeps one Firestore client
+and warm HTTP sessions, and each refresh writes only the fields of the
+stages that just ran (merge=True). Every refresh is also appended to the
+history store.
+
+A small HTTP endpoint reports health:
+    GET /healthz  200 when no stage or write is failing repeatedly, else 503
+    GET /status   per-stage last run, duration, next run, errors; write failures
+                  and the stages whose outputs are waiting to be written
+
+Usage:
+    python daemon.py [--city sf] [--port 8080] [--stages crime,yelp]
+"""
+import argparse
+import json
+import random
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from config import REFRESH_INTERVALS, REFRESH_JITTER
+from city_registry import get_city
+from main import STAGES, load_stage, run_stage, save_all
+from sinks import FirestoreSink
+from utils import metrics
+
+MAX_CONSECUTIVE_FAILURES = 3
+RETRY_DELAY = 5 * 60  # seconds before retrying a failed stage
+WRITE_RETRY_DELAY = 60  # seconds before retrying a failed write of fetched outputs
+
+class RefreshDaemon:
+    def __init__(self, city, stages, sink=None, intervals=None, jitter=REFRESH_JITTER):
+        self.city = city
+        self.stages = [(stage, load_stage(target)) for stage, target, _ in STAGES if stage in stages]
+        if not self.stages:
+            raise ValueError(f"No known stages in {', '.join(stages) or 'an empty list'}")
+        self.sink = sink
+        self.intervals = dict(REFRESH_INTERVALS, **(intervals or {}))
+        self.jitter = jitter
+        self.started_at = time.time()
+        self.written_full = False
+        self.history = None
+        self.unwritten = {}  # stage outputs fetched but not yet saved (the write failed)
+        self.write_state = {
+            'next_retry': None,
+            'last_success': None,
+            'last_error': None,
+            'consecutive_failures': 0,
+        }
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        now = time.time()
+        self.state = {
+            stage: {
+                'next_run': now,
+                'last_run': None,
+                'last_success': None,
+                'last_duration': None,
+                'last_error': None,
+                'runs': 0,
+                'consecutive_failures': 0,
+            }
+            for stage, _ in self.stages
+        }
+
+    def _next_delay(self, stage):
+        interval = self.intervals[stage]
+        return interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def refresh(self, due):
+        """Run the due stages, then write only the fields they produced"""
+        outputs = {}
+        for stage, func in self.stages:
+            if stage not in due:
+                continue
+            print(f"🔄 Refreshing {stage} for {self.city['name']}...")
+            start = time.time()
+            try:
+                outputs[stage] = run_stage(stage, func, self.city, refresh=True)
+                error = None
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                print(f"  ⚠️  {stage} refresh failed: {error}")
+
+            finished = time.time()
+            with self._lock:
+                st = self.state[stage]
+                st['runs'] += 1
+                st['last_run'] = start
+                st['last_duration'] = finished - start
+                st['last_error'] = error
+                if error:
+                    st['consecutive_failures'] += 1
+                    st['next_run'] = finished + min(RETRY_DELAY, self.intervals[stage])
+                else:
+                    st['consecutive_failures'] = 0
+                    st['last_success'] = finished
+                    st['next_run'] = finished + self._next_delay(stage)
+
+        # Outputs a failed write left behind go out with this run's (newer ones win)
+        outputs = dict(self.unwritten, **outputs)
+        if outputs:
+            self.write(outputs)
+
+    def write(self, outputs):
+        """Save outputs; on failure keep them for the next loop instead of dying"""
+        try:
+            # The first write fills defaults for stages that have never run; later
+            # ones re-derive densities and 'similar' from the merged documents
+            with metrics.stage('firebase_save'):
+                save_all(self.sink, self.city, outputs, fill_defaults=not self.written_full,
+                         history=self.history)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"  ⚠️  Write of {', '.join(outputs)} failed, retrying in {WRITE_RETRY_DELAY}s: {error}")
+            with self._lock:
+                self.unwritten = outputs
+                self.write_state['last_error'] = error
+                self.write_state['consecutive_failures'] += 1
+                self.write_state['next_retry'] = time.time() + WRITE_RETRY_DELAY
+            return False
+        self.written_full = True
+        with self._lock:
+            self.unwritten = {}
+            self.write_state.update(next_retry=None, last_success=time.time(), last_error=None,
+                                    consecutive_failures=0)
+        return True
+
+    def run(self):
+        if self.sink is None:
+            self.sink = FirestoreSink()
+        if self.history is None:
+            from history import HistoryStore
+            self.history = HistoryStore()
+
+        print(f"🛰️  Refresh daemon running for {self.city['name']}: "
+              + ', '.join(f"{stage} every {self.intervals[stage]}s" for stage, _ in self.stages))
+        while not self._stop.is_set():
+            now = time.time()
+            due = {stage for stage, st in self.state.items() if st['next_run'] <= now}
+            retry = self.unwritten and self.write_state['next_retry'] <= now
+            if due or retry:
+                self.refresh(due)
+            next_run = min(st['next_run'] for st in self.state.values())
+            if self.unwritten:
+                next_run = min(next_run, self.write_state['next_retry'])
+            self._stop.wait(max(1.0, min(60.0, next_run - time.time())))
+        print("👋 Refresh daemon stopped")
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        with self._lock:
+            return {
+                'city': self.city['id'],
+                'uptime_seconds': time.time() - self.started_at,
+                'healthy': self.healthy(),
+                'stages': {stage: dict(st) for stage, st in self.state.items()},
+                'write': dict(self.write_state, unwritten=sorted(self.unwritten)),
+            }
+
+    def healthy(self):
+        return (self.write_state['consecutive_failures'] < MAX_CONSECUTIVE_FAILURES
+                and all(st['consecutive_failures'] < MAX_CONSECUTIVE_FAILURES for st in self.state.values()))
+
+
+def serve_status(daemon, host='0.0.0.0', port=8080):
+    """Start the health/status endpoint in a background thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == '/healthz':
+                healthy = daemon.healthy()
+                self._send(200 if healthy else 503, {'status': 'ok' if healthy else 'failing'})
+            elif self.path == '/status':
+                self._send(200, daemon.status())
+            else:
+                self._send(404, {'error': 'not found'})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🩺 Status endpoint on http://{host}:{server.server_address[1]}/status")
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="vibeStreet refresh daemon")
+    parser.add_argument('--city', help="City id from cities/*.json (default: the default city)")
+    parser.add_argument('--stages', help="Comma-separated stages to keep fresh (default: all)")
+    parser.add_argument('--host', default='0.0.0.0', help="Status endpoint bind address")
+    parser.add_argument('--port', type=int, default=8080, help="Status endpoint port (0 to disable)")
+    args = parser.parse_args(argv)
+
+    known = [stage for stage, _, _ in STAGES]
+    args.stage_list = known
+    if args.stages is not None:
+        args.stage_list = [s.strip() for s in args.stages.split(',') if s.strip()]
+        unknown = [s for s in args.stage_list if s not in known]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+        if not args.stage_list:
+            parser.error("--stages needs at least one stage")
+    return args
+
+
+def main(argv=None, db=None):
+    args = parse_args(argv)
+    sink = FirestoreSink(db) if db is not None else None
+    daemon = RefreshDaemon(get_city(args.city), args.stage_list, sink=sink)
+    server = serve_status(daemon, args.host, args.port) if args.port else None
+
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+    signal.signal(signal.SIGINT, lambda *_: daemon.stop())
+    try:
+        daemon.run()
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
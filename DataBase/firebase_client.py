@@ -1,10 +1,43 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+"""
+Firestore reads and writes for the combined neighborhood records
+
+FIRESTORE_LAYOUT picks how a record is stored:
+
+    single   one document per neighborhood with every field (the original layout)
+    split    cold fields (coordinates, demographics, property) in the
+             neighborhood document, the fields refreshed several times a day
+             (HOT_FIELDS, with 'similar', which every refresh recomputes) in a
+             small per-neighborhood document beside it (neighborhood_scores/<doc_id>)
+    scores   cold documents as in split, the hot fields of the whole city in
+             one document (scores/<city>: {doc_id: hot fields}), so a refresh
+             is a single write and a client needs a single listener
+
+With split and scores, cold documents are only written when a record
+carries cold fields (a full run or a demographics/property refresh), and a
+sink skips rewriting cold content it already wrote unchanged. The readers
+below reassemble records by overlaying the hot fields on the cold document.
+"""
+import config
 from config import FIREBASE_CRED_PATH
+from city_registry import DEFAULT_CITY
+from utils import metrics
+import json
 import re
+import time
+
+FIRESTORE_LAYOUTS = ('single', 'split', 'scores')
+HOT_FIELDS = ('safety', 'happening', 'bars', 'restaurants', 'cafes', 'similar')  # crime, happening, yelp stages
+IDENTITY_FIELDS = ('neighborhood', 'doc_id', 'city', 'coordinates')  # in every record, not worth a write alone
+FIRESTORE_MAX_DOCUMENT_BYTES = 1_000_000  # Firestore's limit is 1 MiB per document
 
 def initialize_firebase():
-    """Initialize Firebase Admin SDK"""
+    """
+    Initialize Firebase Admin SDK
+    The SDK is imported here so runs that never touch Firestore don't pay for it
+    """
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     if not firebase_admin._apps:
         cred = credentials.Certificate(FIREBASE_CRED_PATH)
         firebase_admin.initialize_app(cred)
@@ -23,28 +56,137 @@ def sanitize_document_id(neighborhood):
     sanitized = sanitized.replace(' ', '_')
     return sanitized
 
-def save_neighborhood_data(db, neighborhood, data):
+def neighborhoods_collection(db, city_id=None):
+    """
+    Collection holding a city's neighborhood documents
+    The default city keeps the top-level 'neighborhoods' collection existing
+    clients read; other cities live under cities/{city_id}/neighborhoods
+    """
+    if city_id is None or city_id == DEFAULT_CITY:
+        return db.collection('neighborhoods')
+    return db.collection('cities').document(city_id).collection('neighborhoods')
+
+def hot_collection(db, city_id=None):
+    """Per-neighborhood hot documents of the 'split' layout, beside neighborhoods_collection"""
+    if city_id is None or city_id == DEFAULT_CITY:
+        return db.collection('neighborhood_scores')
+    return db.collection('cities').document(city_id).collection('neighborhood_scores')
+
+def scores_document(db, city_id=None):
+    """The city's hot fields in the 'scores' layout: {doc_id: hot fields}"""
+    return db.collection('scores').document(city_id or DEFAULT_CITY)
+
+def merge_fields(target, data):
+    """Recursive dict merge with Firestore merge=True semantics"""
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge_fields(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+def _set(doc_ref, data):
+    write_start = time.perf_counter()
+    doc_ref.set(data, merge=True)
+    metrics.record_latency('firestore_write', time.perf_counter() - write_start)
+
+def save_neighborhood_data(db, neighborhood, data, city_id=None, layout=None):
     """Save neighborhood data to Firebase"""
+    if (layout or config.FIRESTORE_LAYOUT) != 'single':
+        return save_neighborhoods(db, [(neighborhood, data, city_id)], layout)
     doc_id = sanitize_document_id(neighborhood)
-    doc_ref = db.collection('neighborhoods').document(doc_id)
+    doc_ref = neighborhoods_collection(db, city_id).document(doc_id)
     
     # Ensure the original neighborhood name is in the data
     data['neighborhood'] = neighborhood
     data['doc_id'] = doc_id
+    data['city'] = city_id or DEFAULT_CITY
     
-    doc_ref.set(data, merge=True)
+    _set(doc_ref, data)
     print(f"✅ Saved data for {neighborhood} (ID: {doc_id})")
 
-def get_all_neighborhoods(db):
-    """Retrieve all neighborhood data"""
-    docs = db.collection('neighborhoods').stream()
-    return {doc.id: doc.to_dict() for doc in docs}
+def save_neighborhoods(db, records, layout=None, cold_written=None):
+    """
+    Save (neighborhood, data, city_id) records in the configured layout
+    cold_written ({(city, doc_id): cold content}) lets a long-lived caller
+    skip cold documents it already wrote unchanged
+    """
+    layout = layout or config.FIRESTORE_LAYOUT
+    if layout not in FIRESTORE_LAYOUTS:
+        raise ValueError(f"FIRESTORE_LAYOUT must be one of {', '.join(FIRESTORE_LAYOUTS)}")
+    if layout == 'single':
+        for neighborhood, data, city_id in records:
+            save_neighborhood_data(db, neighborhood, data, city_id, layout)
+        return
+
+    scores = {}
+    cold_docs = hot_docs = 0
+    for neighborhood, data, city_id in records:
+        doc_id = sanitize_document_id(neighborhood)
+        identity = {'neighborhood': neighborhood, 'doc_id': doc_id, 'city': city_id or DEFAULT_CITY}
+        cold = {key: value for key, value in data.items() if key not in HOT_FIELDS}
+        hot = {key: value for key, value in data.items() if key in HOT_FIELDS}
 
-def get_neighborhood_by_name(db, neighborhood):
-    """Get a specific neighborhood by its original name"""
+        if any(key not in IDENTITY_FIELDS for key in cold):
+            cold.update(identity)
+            content = json.dumps(cold, sort_keys=True, default=str)
+            key = (identity['city'], doc_id)
+            if cold_written is None or cold_written.get(key) != content:
+                _set(neighborhoods_collection(db, city_id).document(doc_id), cold)
+                cold_docs += 1
+                if cold_written is not None:
+                    cold_written[key] = content
+        if hot:
+            hot['neighborhood'] = neighborhood  # hot-only records still reassemble with a name
+            if layout == 'split':
+                _set(hot_collection(db, city_id).document(doc_id), hot)
+                hot_docs += 1
+            else:
+                scores.setdefault(city_id, {})[doc_id] = hot
+
+    for city_id, entries in scores.items():
+        size = len(json.dumps(entries, default=str))
+        if size > FIRESTORE_MAX_DOCUMENT_BYTES:
+            raise ValueError(f"{city_id or DEFAULT_CITY} scores document would be {size:,} bytes, "
+                             f"over Firestore's limit; use FIRESTORE_LAYOUT=split")
+        _set(scores_document(db, city_id), entries)
+        hot_docs += 1
+    print(f"✅ Saved {len(records)} neighborhoods ({cold_docs} cold, {hot_docs} hot documents, {layout} layout)")
+
+def _hot_entries(db, city_id, layout):
+    """{doc_id: hot fields} stored apart from the neighborhood documents"""
+    if layout == 'split':
+        return {doc.id: doc.to_dict() for doc in hot_collection(db, city_id).stream()}
+    if layout == 'scores':
+        doc = scores_document(db, city_id).get()
+        return doc.to_dict() if doc.exists else {}
+    return {}
+
+def get_all_neighborhoods(db, city_id=None, layout=None):
+    """Retrieve all neighborhood data (hot fields overlaid on cold documents)"""
+    docs = neighborhoods_collection(db, city_id).stream()
+    records = {doc.id: doc.to_dict() for doc in docs}
+    for doc_id, hot in _hot_entries(db, city_id, layout or config.FIRESTORE_LAYOUT).items():
+        merge_fields(records.setdefault(doc_id, {}), hot)
+    return records
+
+def get_neighborhood_by_name(db, neighborhood, city_id=None, layout=None):
+    """
+    Get a specific neighborhood by its original name
+    (with the 'scores' layout this reads the city's whole scores document)
+    """
+    layout = layout or config.FIRESTORE_LAYOUT
     doc_id = sanitize_document_id(neighborhood)
-    doc_ref = db.collection('neighborhoods').document(doc_id)
+    doc_ref = neighborhoods_collection(db, city_id).document(doc_id)
     doc = doc_ref.get()
-    if doc.exists:
-        return doc.to_dict()
-    return None
\ No newline at end of file
+    record = doc.to_dict() if doc.exists else None
+    if layout == 'split':
+        hot = hot_collection(db, city_id).document(doc_id).get()
+        hot = hot.to_dict() if hot.exists else None
+    elif layout == 'scores':
+        hot = _hot_entries(db, city_id, layout).get(doc_id)
+    else:
+        hot = None
+    if hot is not None:
+        record = merge_fields(record or {}, hot)
+    return record
\ No newline at end of file
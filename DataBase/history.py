@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Append-only history of per-run neighborhood metrics
+
+Firestore/SQLite keep only the latest merged values, so every save also
+appends the run's combined records here, which keeps trend questions
+("is the Mission getting safer?") answerable.
+
+Layout (columnar, one partition per city and month):
+    HISTORY_DIR/<city>/hoods.json              neighborhood name per id
+    HISTORY_DIR/<city>/<YYYY-MM>/meta.json     {"fields": [...], "rows": N}
+    HISTORY_DIR/<city>/<YYYY-MM>/runs.f64      run timestamp per row
+    HISTORY_DIR/<city>/<YYYY-MM>/hoods.u32     neighborhood id per row
+    HISTORY_DIR/<city>/<YYYY-MM>/<field>.f32   value per row (NaN = not written)
+
+Each run appends one row per neighborhood to the column files and then
+replaces meta.json, which is what makes the rows visible; a torn append
+is cut back to meta's row count on the next write. Numeric fields are
+stored as float32 (4 bytes per neighborhood per field per run).
+
+Usage:
+    python history.py series --hood Mission --field safety [--city sf] [--since 2025-01]
+    python history.py deltas --field safety [--city sf]
+    python history.py runs [--city sf]
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from utils.normalizers import numeric_fields
+
+HISTORY_DIR = os.getenv('HISTORY_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.history'))
+
+def _month(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m')
+
+
+def _write_json(path, payload):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+def _append(path, array, committed_bytes):
+    """Append array's bytes after the last committed row (dropping any torn tail)"""
+    with open(path, 'ab') as f:
+        if f.tell() != committed_bytes:
+            f.truncate(committed_bytes)
+            f.seek(committed_bytes)
+        f.write(array.tobytes())
+
+
+class HistoryStore:
+    def __init__(self, root=None):
+        self.root = root or HISTORY_DIR
+
+    # Writing ------------------------------------------------------------
+
+    def _hood_ids(self, city_id, names):
+        path = os.path.join(self.root, city_id, 'hoods.json')
+        hoods = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                hoods = json.load(f)
+        ids = {name: i for i, name in enumerate(hoods)}
+        added = [name for name in dict.fromkeys(names) if name not in ids]
+        if added:
+            for name in added:
+                ids[name] = len(hoods)
+                hoods.append(name)
+            _write_json(path, hoods)
+        return np.array([ids[name] for name in names], dtype=np.uint32)
+
+    def append(self, records, run_at=None):
+        """Append one run of (neighborhood, data, city_id) records"""
+        from city_registry import DEFAULT_CITY
+
+        run_at = run_at or time.time()
+        by_city = {}
+        for neighborhood, data, city_id in records:
+            by_city.setdefault(city_id or DEFAULT_CITY, []).append((neighborhood, dict(numeric_fields(data))))
+
+        for city_id, rows in by_city.items():
+            part = os.path.join(self.root, city_id, _month(run_at))
+            os.makedirs(part, exist_ok=True)
+            meta_path = os.path.join(part, 'meta.json')
+            meta = {'fields': [], 'rows': 0}
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+
+            committed, count = meta['rows'], len(rows)
+            fields = list(meta['fields'])
+            for _, values in rows:
+                fields.extend(f for f in values if f not in fields)
+
+            _append(os.path.join(part, 'runs.f64'), np.full(count, run_at, dtype=np.float64), committed * 8)
+            _append(os.path.join(part, 'hoods.u32'), self._hood_ids(city_id, [h for h, _ in rows]), committed * 4)
+            for field in fields:
+                column = np.array([values.get(field, np.nan) for _, values in rows], dtype=np.float32)
+                if field not in meta['fields'] and committed:
+                    # A field new to this partition reads as NaN for earlier rows
+                    column = np.concatenate([np.full(committed, np.nan, dtype=np.float32), column])
+                    _append(os.path.join(part, f"{field}.f32"), column, 0)
+                else:
+                    _append(os.path.join(part, f"{field}.f32"), column, committed * 4)
+
+            _write_json(meta_path, {'fields': fields, 'rows': committed + count})
+
+    # Reading ------------------------------------------------------------
+
+    def _partitions(self, city_id, since=None, until=None):
+        city_dir = os.path.join(self.root, city_id)
+        if not os.path.isdir(city_dir):
+            return []
+        months = sorted(d for d in os.listdir(city_dir) if os.path.isdir(os.path.join(city_dir, d)))
+        return [os.path.join(city_dir, m) for m in months
+                if (since is None or m >= since[:7]) and (until is None or m <= until[:7])]
+
+    def _read(self, part, field):
+        """(runs, hood ids, values) of one committed partition; values None if the field is absent"""
+        with open(os.path.join(part, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        rows = meta['rows']
+        runs = np.fromfile(os.path.join(part, 'runs.f64'), dtype=np.float64, count=rows)
+        hoods = np.fromfile(os.path.join(part, 'hoods.u32'), dtype=np.uint32, count=rows)
+        if field is None or field not in meta['fields']:
+            return runs, hoods, None
+        values = np.fromfile(os.path.join(part, f"{field}.f32"), dtype=np.float32, count=rows)
+        return runs, hoods, values
+
+    def hoods(self, city_id):
+        path = os.path.join(self.root, city_id, 'hoods.json')
+        if not os.path.exists(path):
+            return []
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def fields(self, city_id=None):
+        """Every field recorded for a city"""
+        from city_registry import DEFAULT_CITY
+
+        fields = {}
+        for part in self._partitions(city_id or DEFAULT_CITY):
+            with open(os.path.join(part, 'meta.json'), 'r', encoding='utf-8') as f:
+                fields.update(dict.fromkeys(json.load(f)['fields']))
+        return list(fields)
+
+    def runs(self, city_id=None, since=None, until=None):
+        """Sorted run timestamps"""
+        from city_registry import DEFAULT_CITY
+
+        stamps = [self._read(part, None)[0] for part in self._partitions(city_id or DEFAULT_CITY, since, until)]
+        return np.unique(np.concatenate(stamps)) if stamps else np.empty(0)
+
+    def series(self, neighborhood, field, city_id=None, since=None, until=None):
+        """(timestamps, values) of one neighborhood's field across runs, oldest first"""
+        from city_registry import DEFAULT_CITY
+
+        city_id = city_id or DEFAULT_CITY
+        hoods = self.hoods(city_id)
+        if neighborhood not in hoods:
+            return np.empty(0), np.empty(0, dtype=np.float32)
+        hood_id = hoods.index(neighborhood)
+        stamps, values = [], []
+        for part in self._partitions(city_id, since, until):
+            runs, ids, column = self._read(part, field)
+            if column is None:
+                continue
+            keep = (ids == hood_id) & ~np.isnan(column)
+            stamps.append(runs[keep])
+            values.append(column[keep])
+        if not stamps:
+            return np.empty(0), np.empty(0, dtype=np.float32)
+        return np.concatenate(stamps), np.concatenate(values)
+
+    def snapshot(self, field, run_at, city_id=None):
+        """
+        {neighborhood: value} of a field as written by one run
+        Raises ValueError when no run was recorded in run_at's month
+        """
+        from city_registry import DEFAULT_CITY
+
+        city_id = city_id or DEFAULT_CITY
+        hoods = self.hoods(city_id)
+        month = _month(run_at)
+        part = os.path.join(self.root, city_id, month)
+        if not os.path.exists(os.path.join(part, 'meta.json')):
+            raise ValueError(f"No {city_id} history for {month}")
+        runs, ids, column = self._read(part, field)
+        if column is None:
+            return {}
+        keep = (runs == run_at) & ~np.isnan(column)
+        return {hoods[i]: float(v) for i, v in zip(ids[keep], column[keep])}
+
+    def deltas(self, field, city_id=None, before=None, after=None):
+        """
+        {neighborhood: (before, after, change)} of a field between two runs
+        Defaults to the last two runs that wrote the field
+        """
+        from city_registry import DEFAULT_CITY
+
+        city_id = city_id or DEFAULT_CITY
+        if before is None or after is None:
+            written = []
+            for part in reversed(self._partitions(city_id)):
+                runs, _, column = self._read(part, field)
+                if column is not None:
+                    written = sorted(set(runs[~np.isnan(column)].tolist()) | set(written))
+                if len(written) >= 2:
+                    break
+            if len(written) < 2:
+                return {}
+            before, after = written[-2], written[-1]
+        old, new = self.snapshot(field, before, city_id), self.snapshot(field, after, city_id)
+        return {hood: (old[hood], new[hood], new[hood] - old[hood]) for hood in new if hood in old}
+
+
+def _stamp(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the neighborhood history store")
+    parser.add_argument('command', choices=['series', 'deltas', 'runs'])
+    parser.add_argument('--city', help="City id (default: the default city)")
+    parser.add_argument('--hood', help="Neighborhood for 'series'")
+    parser.add_argument('--field', default='safety', help="Field, e.g. safety or bars.avg_rating")
+    parser.add_argument('--since', help="First month (YYYY-MM)")
+    parser.add_argument('--until', help="Last month (YYYY-MM)")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore()
+    if args.command == 'runs':
+        for ts in store.runs(args.city, args.since, args.until):
+            print(_stamp(ts))
+    elif args.command == 'series':
+        if not args.hood:
+            parser.error("series needs --hood")
+        for ts, value in zip(*store.series(args.hood, args.field, args.city, args.since, args.until)):
+            print(f"{_stamp(ts)}  {value:.2f}")
+    else:
+        changes = store.deltas(args.field, args.city)
+        for hood, (old, new, change) in sorted(changes.items(), key=lambda item: item[1][2]):
+            print(f"{hood:28} {old:10.2f} → {new:10.2f}  ({change:+.2f})")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,69 +1,369 @@
 #!/usr/bin/env python3
+import argparse
+import importlib
+import os
 import time
-from config import NEIGHBORHOODS, NEIGHBORHOOD_COORDS
-from firebase_client import initialize_firebase, save_neighborhood_data
-from pipelines.crime_pipeline import process_crime_data
-from pipelines.demographics_pipeline import process_demographics
-from pipelines.property_pipeline import process_property_rates
-from pipelines.yelp_pipeline import process_all_yelp_data
-from pipelines.events_pipeline import process_happening_index
-
-def main():
+import config
+from city_registry import available_cities, get_city
+from sinks import SINK_NAMES, FirestoreSink, get_sink
+from utils import checkpoints, metrics, profiling
+
+# Pipeline modules, requests and the Firebase SDK are imported only when a
+# stage or sink actually needs them, so --help, --dry-run and partial runs
+# start fast (see benchmarks/startup.py)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Stage name -> source files its output depends on (relative to BASE_DIR)
+STAGE_SOURCES = {
+    'crime': ['pipelines/crime_pipeline.py', 'crime_tiles.py', 'utils/soda.py'],
+    'demographics': ['pipelines/demographics_pipeline.py', 'utils/acs.py'],
+    'property': ['pipelines/property_pipeline.py', 'utils/zori.py'],
+    'yelp': ['pipelines/yelp_pipeline.py', 'query_planner.py'],
+    'happening': ['pipelines/events_pipeline.py', 'utils/geocoding.py'],
+}
+
+# Source files every stage depends on
+COMMON_SOURCES = ['utils/normalizers.py', 'neighborhood_table.py', 'city_registry.py', 'utils/http_client.py']
+
+# Stages whose scores are scaled across the whole city (min/max), so a
+# partial refresh still computes every neighborhood and keeps the ones asked for
+CITYWIDE_STAGES = {'crime', 'demographics', 'happening'}
+
+# Pipeline order: (stage, "module:function", banner)
+STAGES = [
+    ('crime', 'pipelines.crime_pipeline:process_crime_data', "🚨 Processing crime data and calculating safety scores..."),
+    ('demographics', 'pipelines.demographics_pipeline:process_demographics', "👥 Processing demographics..."),
+    ('property', 'pipelines.property_pipeline:process_property_rates', "🏠 Processing property rates..."),
+    ('yelp', 'pipelines.yelp_pipeline:process_all_yelp_data', "🍽️  Processing Yelp data..."),
+    ('happening', 'pipelines.events_pipeline:process_happening_index', "🎉 Processing happening index..."),
+]
+
+def load_stage(target):
+    """Import a stage function from its "module:function" path"""
+    module_name, func_name = target.split(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+def pipeline_config_hash(city):
+    """Hash of the config that affects stage outputs (keys only by presence)"""
+    return checkpoints.config_hash({
+        'city': city,
+        'yelp_url': config.YELP_SEARCH_URL,
+        'eventbrite_url': config.EVENTBRITE_SEARCH_URL,
+        'crime_limit': config.CRIME_QUERY_LIMIT,
+        'coverage': [config.COVERAGE_PLANNER, config.COVERAGE_FOOTPRINT_KM],
+        'yelp_key': bool(config.YELP_API_KEY),
+        'eventbrite_token': bool(config.EVENTBRITE_TOKEN),
+        'acs_files': [checkpoints.file_signature(path) for path in (
+            config.ACS_DATA_FILE, config.TRACT_GAZETTEER_FILE, config.TRACT_CROSSWALK_FILE)],
+        'zori': [checkpoints.file_signature(config.ZORI_DATA_FILE), config.ZORI_MONTHS],
+    })
+
+def run_stage(stage, func, city, use_checkpoints=True, neighborhoods=None, refresh=False):
+    """
+    Run a pipeline stage, reusing a valid checkpoint when one exists
+    Fresh outputs are checkpointed as soon as the stage finishes, unless the
+    stage marked them checkpoints.Degraded (fallbacks, partial fetches)
+
+    neighborhoods restricts the stage to a subset (never checkpointed);
+    refresh skips reading the checkpoint but still writes a fresh one
+    """
+    with metrics.stage(stage), profiling.stage(stage):
+        if neighborhoods is not None and stage not in CITYWIDE_STAGES:
+            return func(neighborhoods, city=city)
+        return _run_stage(stage, func, city, use_checkpoints, refresh)
+
+def _run_stage(stage, func, city, use_checkpoints, refresh=False):
+    if not use_checkpoints:
+        return func(city['neighborhoods'], city=city)
+
+    sources = [os.path.join(BASE_DIR, path) for path in STAGE_SOURCES[stage] + COMMON_SOURCES]
+    checkpoint_stage = os.path.join(city['id'], stage)
+    key = checkpoints.checkpoint_key(
+        stage,
+        checkpoints.code_version(*sources),
+        pipeline_config_hash(city),
+    )
+
+    data = None if refresh else checkpoints.load_checkpoint(checkpoint_stage, key)
+    if data is not None:
+        print(f"  ♻️  Reusing {city['id']} {stage} checkpoint ({key})")
+        return data
+
+    data = func(city['neighborhoods'], city=city)
+    if isinstance(data, checkpoints.Degraded):
+        print(f"  ⚠️  Not checkpointing degraded {city['id']} {stage} output")
+    else:
+        checkpoints.save_checkpoint(checkpoint_stage, key, data)
+    return data
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="vibeStreet data pipeline")
+    parser.add_argument(
+        '--cities', metavar='IDS',
+        help="Comma-separated city ids from cities/*.json, or 'all' (default: the default city)",
+    )
+    parser.add_argument(
+        '--stages', metavar='STAGES',
+        help=f"Comma-separated stages to refresh ({','.join(STAGE_SOURCES)}); "
+             "only their fields are written, other fields are left as stored",
+    )
+    parser.add_argument(
+        '--hoods', metavar='NAMES',
+        help='Comma-separated neighborhoods to refresh, e.g. "Mission,Castro"',
+    )
+    parser.add_argument(
+        '--force', action='append', default=[], metavar='STAGE',
+        choices=list(STAGE_SOURCES) + ['all'],
+        help="Ignore the checkpoint for a stage (repeatable, or 'all')",
+    )
+    parser.add_argument(
+        '--no-checkpoints', action='store_true',
+        help="Neither read nor write stage checkpoints",
+    )
+    parser.add_argument(
+        '--metrics-dir', metavar='DIR',
+        help="Record stage/HTTP metrics and write run_report.json + vibestreet.prom to DIR",
+    )
+    parser.add_argument(
+        '--profile', metavar='DIR',
+        help="Profile each stage (cProfile, tracemalloc, network vs CPU) into DIR; "
+             "compare runs with: python -m utils.profiling diff DIR1 DIR2",
+    )
+    parser.add_argument(
+        '--sink', choices=SINK_NAMES, default='firestore',
+        help="Where to write combined records (stdout/jsonl never load the Firebase SDK)",
+    )
+    parser.add_argument(
+        '--sink-path', metavar='PATH',
+        help="Output file for --sink sqlite/jsonl (default: neighborhoods.db / neighborhoods.jsonl)",
+    )
+    parser.add_argument(
+        '--no-history', action='store_true',
+        help="Don't append this run to the local history store (history.py)",
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help="Shorthand for --sink stdout: compute scores without touching Firebase",
+    )
+    args = parser.parse_args(argv)
+    if args.dry_run:
+        args.sink = 'stdout'
+
+    args.stage_list = list(STAGE_SOURCES)
+    if args.stages:
+        args.stage_list = [s.strip() for s in args.stages.split(',') if s.strip()]
+        unknown = [s for s in args.stage_list if s not in STAGE_SOURCES]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    args.hood_list = None
+    if args.hoods:
+        args.hood_list = [h.strip() for h in args.hoods.split(',') if h.strip()]
+    return args
+
+def run_city(city_id, args, sink=None):
+    """
+    Run the selected stages for one city and save its neighborhoods
+    Returns the number of neighborhoods written
+    """
+    city = get_city(city_id)
+    use_checkpoints = not args.no_checkpoints
+    if args.metrics_dir:
+        metrics.reset()  # each city's report covers that city only
+        metrics.enable()
+    profile_dir = None
+    if args.profile:
+        profile_dir = os.path.join(args.profile, city['id']) if args.cities else args.profile
+        profiling.enable(profile_dir)
+
+    forced = list(STAGE_SOURCES) if 'all' in args.force else args.force
+    for stage in forced:
+        print(f"🧹 Invalidating {city['id']} {stage} checkpoint")
+        checkpoints.invalidate(os.path.join(city['id'], stage))
+
+    # Selective refresh: a subset of stages and/or neighborhoods
+    hoods = city['neighborhoods']
+    partial = args.hood_list is not None or set(args.stage_list) != set(STAGE_SOURCES)
+    if args.hood_list is not None:
+        known = set(city['neighborhoods'])
+        hoods = [h for h in args.hood_list if h in known]
+        unknown = [h for h in args.hood_list if h not in known]
+        if unknown and not args.cities:
+            print(f"⚠️  Unknown neighborhood(s) for {city['name']}: {', '.join(unknown)}")
+        if not hoods:
+            print(f"⏭️  No requested neighborhoods in {city['name']}, skipping")
+            return 0
+
+    # Initialize the output sink (Firebase only when writing to Firestore)
+    own_sink = sink is None
+    if own_sink:
+        sink = get_sink(args.sink, args.sink_path)
+
+    print(f"\n🏙️  {city['name']} ({len(hoods)} neighborhoods)")
+
+    outputs = {}
+    for stage, target, banner in STAGES:
+        if stage not in args.stage_list:
+            continue
+        print(f"\n{banner}")
+        outputs[stage] = run_stage(
+            stage, load_stage(target), city, use_checkpoints,
+            neighborhoods=hoods if args.hood_list is not None else None,
+            refresh=partial,
+        )
+
+    # Combine and Save (dry runs leave no history behind)
+    history = None
+    if not args.no_history and args.sink != 'stdout':
+        from history import HistoryStore
+        history = HistoryStore()
+    print(f"\n💾 Saving to {args.sink}...")
+    with metrics.stage('firebase_save'), profiling.stage('firebase_save'):
+        save_all(sink, city, outputs, hoods, fill_defaults=not partial, history=history)
+    if own_sink:
+        sink.close()
+
+    if args.metrics_dir:
+        metrics_dir = args.metrics_dir
+        if args.cities:
+            metrics_dir = os.path.join(metrics_dir, city['id'])
+        metrics.write_report(metrics_dir)
+        print(f"\n📈 Metrics written to {metrics_dir}")
+    if profile_dir:
+        profiling.write_report({'city': city['id'], 'stages': args.stage_list, 'hoods': len(hoods),
+                                'sink': args.sink, 'finished_at': time.time()})
+        print(f"\n🔬 Profiles written to {profile_dir}")
+    return len(hoods)
+
+def save_all(sink, city, outputs, neighborhoods=None, fill_defaults=True, history=None):
+    """
+    Combine stage outputs per neighborhood and save them in one batch
+    Only fields from stages present in outputs are written (merge=True),
+    so a partial refresh leaves every other stored field as it is
+    With a history store, the run is also appended to it
+    """
+    from neighborhood_table import NeighborhoodTable, VENUE_CATEGORIES
+
+    table = NeighborhoodTable(city, neighborhoods)
+    for stage, output in outputs.items():
+        table.load_stage(stage, output)
+    # Venue density is relative to the busiest neighborhood, so it is only
+    # recomputed when every neighborhood's counts are being written
+    if 'yelp' in outputs and (fill_defaults or table.complete(
+            [f"{category}.count" for category in VENUE_CATEGORIES])):
+        table.derive_densities()
+    records = table.records(fill_defaults)
+
+    # A full write has every field of every neighborhood, so the "similar
+    # neighborhoods" lists come from the records; a partial one recomputes
+    # them from the stored documents with this run merged in
+    extra = []
+    if fill_defaults:
+        if len(records) > 1:
+            from similarity import attach_similar
+            attach_similar([data for _, data, _ in records])
+    else:
+        extra = refresh_similar(sink, city, records)
+
+    sink.write_many(records + extra)
+    if history is not None:
+        history.append(records)
+
+def refresh_similar(sink, city, records):
+    """
+    Set 'similar' on records from the stored documents merged with them;
+    returns extra {'similar'} records for stored neighborhoods outside
+    records whose lists changed (nothing when the sink can't read back)
+    """
+    import copy
+    from firebase_client import merge_fields, sanitize_document_id
+    from similarity import attach_similar
+
+    stored = sink.get_all_neighborhoods(city['id'])
+    if stored is None:
+        return []
+    written = {hood: data for hood, data, _ in records}
+    docs, before = [], {}
+    for hood in city['neighborhoods']:
+        doc = stored.get(sanitize_document_id(hood))
+        if doc is None and hood not in written:
+            continue
+        doc = merge_fields(doc or {}, copy.deepcopy(written.get(hood, {})))
+        doc['neighborhood'] = hood
+        before[hood] = doc.get('similar')
+        docs.append(doc)
+    if len(docs) < 2:
+        return []
+    attach_similar(docs)
+
+    extra = []
+    for doc in docs:
+        hood = doc['neighborhood']
+        if hood in written:
+            written[hood]['similar'] = doc['similar']
+        elif doc['similar'] != before[hood]:
+            extra.append((hood, {'similar': doc['similar']}, city['id']))
+    return extra
+
+def _init_city_worker(limiter_state, limiter_lock):
+    """Process pool initializer: share one rate limiter per external host across cities"""
+    from utils import http_client
+    from utils.rate_limit import HostRateLimiter
+
+    http_client.set_rate_limiter(
+        HostRateLimiter(http_client.default_host_intervals(), limiter_state, limiter_lock)
+    )
+
+def run_cities(city_ids, args):
+    """Run several cities in a process pool; returns {city_id: neighborhood count}"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = {}
+    with multiprocessing.Manager() as manager:
+        limiter_state = manager.dict()
+        limiter_lock = manager.Lock()
+        workers = min(config.CITY_WORKERS, len(city_ids))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_city_worker,
+            initargs=(limiter_state, limiter_lock),
+        ) as pool:
+            futures = {pool.submit(run_city, city_id, args): city_id for city_id in city_ids}
+            for future in as_completed(futures):
+                city_id = futures[future]
+                try:
+                    results[city_id] = future.result()
+                    print(f"✅ {city_id} finished")
+                except Exception as e:
+                    print(f"❌ {city_id} failed: {e}")
+    return results
+
+def main(argv=None, db=None):
+    """Run the full pipeline; pass db to write somewhere other than the live Firestore"""
+    args = parse_args(argv)
+
     print("🚀 vibeStreet Data Pipeline Starting...\n")
     start_time = time.time()
-    
-    # Initialize Firebase
-    print("🔥 Connecting to Firebase...")
-    db = initialize_firebase()
-    
-    # Step 1: Crime Data -> Safety Percentages
-    print("\n🚨 Processing crime data and calculating safety scores...")
-    safety_data = process_crime_data(NEIGHBORHOODS)  # Now returns safety percentages!
-    
-    # Step 2: Demographics
-    print("\n👥 Processing demographics...")
-    demographics = process_demographics(NEIGHBORHOODS)
-    
-    # Step 3: Property Rates
-    print("\n🏠 Processing property rates...")
-    property_rates = process_property_rates(NEIGHBORHOODS)
-    
-    # Step 4: Yelp Data (bars, restaurants, cafes)
-    print("\n🍽️  Processing Yelp data...")
-    yelp_data = process_all_yelp_data(NEIGHBORHOODS)
-    
-    # Step 5: Happening Index
-    print("\n🎉 Processing happening index...")
-    happening_data = process_happening_index(NEIGHBORHOODS)
-    
-    # Step 6: Combine and Save to Firebase
-    print("\n💾 Saving to Firebase...")
-    for hood in NEIGHBORHOODS:
-        coords = NEIGHBORHOOD_COORDS.get(hood, (37.7749, -122.4194))
-        
-        neighborhood_data = {
-            "neighborhood": hood,
-            "coordinates": {
-                "latitude": coords[0],
-                "longitude": coords[1]
-            },
-            "safety": safety_data.get(hood, 50.0),  # Updated: now called "safety" instead of "crime_rate"
-            "population_density": demographics.get(hood, {}).get('population_density', 50.0),
-            "happening": happening_data.get(hood, 50.0),
-            "age_demographic": demographics.get(hood, {}).get('age_demographic', 38.0),
-            "property_rates": property_rates.get(hood, 3000.0),
-            "bars": yelp_data['bars'].get(hood, {'avg_price': 2.0, 'avg_rating': 3.5, 'density': 0.0}),
-            "restaurants": yelp_data['restaurants'].get(hood, {'avg_price': 2.0, 'avg_rating': 3.5, 'density': 0.0}),
-            "cafes": yelp_data['cafes'].get(hood, {'avg_price': 2.0, 'avg_rating': 3.5, 'density': 0.0}),
-        }
-        
-        save_neighborhood_data(db, hood, neighborhood_data)
-    
+
+    if args.cities == 'all':
+        city_ids = available_cities()
+    elif args.cities:
+        city_ids = [c.strip() for c in args.cities.split(',') if c.strip()]
+    else:
+        city_ids = [None]
+
+    if len(city_ids) == 1:
+        sink = FirestoreSink(db) if db is not None else None
+        processed = {city_ids[0]: run_city(city_ids[0], args, sink)}
+    else:
+        processed = run_cities(city_ids, args)
+
     elapsed = time.time() - start_time
     print(f"\n✅ Pipeline completed in {elapsed:.1f} seconds!")
-    print(f"📊 Processed {len(NEIGHBORHOODS)} neighborhoods")
+    print(f"📊 Processed {sum(processed.values())} neighborhoods across {len(processed)} city(ies)")
     print(f"\n💡 Note: 'safety' values are now percentages (0-100%)")
     print(f"   Higher percentage = Safer neighborhood")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
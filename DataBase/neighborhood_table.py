@@ -0,0 +1,192 @@
+"""
+Integer-id neighborhood table with struct-of-arrays field storage
+
+Each neighborhood gets a dense id (its position in the city's list).
+Centroids and every document field are aligned NumPy arrays indexed by
+that id, NaN where no stage supplied a value. Stage outputs stay
+name-keyed dicts (they are JSON checkpoints) and are joined in with one
+dict lookup per name; selection and membership are boolean masks,
+min/max scaling is a vector op, and documents are built in one pass.
+
+A None value in a stage output means "no new value, keep what's stored"
+(e.g. a neighborhood deferred by utils/quota.py): its fields are left out
+of the document even when defaults are filled in.
+"""
+import numpy as np
+
+VENUE_CATEGORIES = ('bars', 'restaurants', 'cafes')
+DEFAULT_VENUE_STATS = {'avg_price': 2.0, 'avg_rating': 3.5, 'count': 0, 'density': 0.0}
+
+# Stage -> [(document field, default)]; dotted fields are nested, and a
+# None default means the field is left out when the stage has no value
+STAGE_FIELDS = {
+    'crime': [('safety', 50.0)],
+    'demographics': [('population_density', 50.0), ('age_demographic', 38.0)],
+    'property': [('property_rates', 3000.0), ('rent_trend', None)],
+    'yelp': [(f"{category}.{key}", default)
+             for category in VENUE_CATEGORIES for key, default in DEFAULT_VENUE_STATS.items()],
+    'happening': [('happening', 50.0)],
+}
+INTEGER_FIELDS = {f"{category}.count" for category in VENUE_CATEGORIES}
+
+def scale(values, inverse=False, bounds=None):
+    """
+    Vectorized normalize_to_percentage / inverse_normalize; NaN stays NaN
+    bounds (min, max) default to the range of the values present
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    if bounds is None:
+        if not present.any():
+            return values.copy()
+        bounds = values[present].min(), values[present].max()
+    low, high = bounds
+    if high == low:
+        return np.where(present, 50.0, np.nan)
+    scaled = ((high - values) if inverse else (values - low)) / (high - low) * 100
+    return np.round(np.clip(scaled, 0, 100), 1)
+
+
+class NeighborhoodTable:
+    """Dense-id neighborhoods of one city with aligned centroid and field arrays"""
+
+    def __init__(self, city, names=None):
+        self.city_id = city['id']
+        self.names = list(names or city['neighborhoods'])
+        self.whole_city = set(self.names) >= set(city['neighborhoods'])
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        centroids = city['centroids']
+        default = city['default_coords']
+        self.located = np.array([name in centroids for name in self.names], dtype=bool)
+        self.centroids = np.array([centroids.get(name, default) for name in self.names],
+                                  dtype=float).reshape(-1, 2)
+        self.columns = {}
+        self.kept = {}
+        self.stages = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def id_of(self, names):
+        """Ids for names, -1 for names not in the table"""
+        ids = self.ids
+        return np.fromiter((ids.get(name, -1) for name in names), dtype=np.int64)
+
+    def mask(self, names):
+        """Boolean mask over ids selecting names"""
+        ids = self.id_of(names)
+        selected = np.zeros(len(self.names), dtype=bool)
+        selected[ids[ids >= 0]] = True
+        return selected
+
+    def located_items(self):
+        """(name, lat, lon) for neighborhoods with a real centroid, in id order"""
+        for i in np.flatnonzero(self.located).tolist():
+            lat, lon = self.centroids[i]
+            yield self.names[i], float(lat), float(lon)
+
+    def column(self, field):
+        if field not in self.columns:
+            self.columns[field] = np.full(len(self.names), np.nan)
+        return self.columns[field]
+
+    def set(self, field, values):
+        """Join {name: value} into a field; unknown names and None values are skipped"""
+        self.set_many({field: list(values.values())}, self.id_of(values))
+
+    def set_many(self, fields, ids):
+        """Write {field: [value per id]} for one id array (-1 entries and None values skipped)"""
+        known = ids >= 0
+        for field, values in fields.items():
+            array = np.array([np.nan if v is None else v for v in values], dtype=float)
+            self.column(field)[ids[known]] = array[known]
+
+    def keep(self, fields, names):
+        """Leave fields of names out of the documents so stored values survive"""
+        selected = self.mask(names)
+        if selected.any():
+            for field in fields:
+                self.kept[field] = self.kept.get(field, np.zeros(len(self.names), dtype=bool)) | selected
+
+    def load_stage(self, stage, output):
+        """Write one stage's name-keyed output into the field arrays"""
+        if stage in ('crime', 'happening'):
+            self.set(STAGE_FIELDS[stage][0][0], output)
+            self.keep([STAGE_FIELDS[stage][0][0]], [name for name, value in output.items() if value is None])
+        elif stage in ('demographics', 'property'):
+            rows = list(output.values())
+            self.set_many({field: [row.get(field) for row in rows] for field, _ in STAGE_FIELDS[stage]},
+                          self.id_of(output))
+        elif stage == 'yelp':
+            for category in VENUE_CATEGORIES:
+                stats = output.get(category, {})
+                self.keep([f"{category}.{key}" for key in DEFAULT_VENUE_STATS],
+                          [name for name, row in stats.items() if row is None])
+                stats = {name: row for name, row in stats.items() if row is not None}
+                rows = list(stats.values())
+                self.set_many({f"{category}.{key}": [row.get(key) for row in rows]
+                               for key in ('avg_price', 'avg_rating', 'count')}, self.id_of(stats))
+        self.stages.append(stage)
+
+    def complete(self, fields):
+        """True when every neighborhood of the city has a fresh value for each field"""
+        return self.whole_city and all(
+            field not in self.kept and field in self.columns and not np.isnan(self.columns[field]).any()
+            for field in fields)
+
+    def derive_densities(self):
+        """Venue density: count as a percentage of the busiest neighborhood (calculate_density_score)"""
+        for category in VENUE_CATEGORIES:
+            counts = self.columns.get(f"{category}.count")
+            if counts is None:
+                continue
+            peak = np.nanmax(counts) if (~np.isnan(counts)).any() else 0.0
+            density = self.column(f"{category}.density")
+            density[:] = np.round(counts / peak * 100, 1) if peak > 0 else np.where(np.isnan(counts), np.nan, 0.0)
+
+    def records(self, fill_defaults=True):
+        """
+        [(hood, document, city_id)] for every neighborhood, built in one pass
+        Only fields of loaded stages are included; without fill_defaults (or
+        for kept names), fields with no value are left out so a merge write
+        keeps what's stored
+        """
+        # Defaults and integer casts are applied per column; only columns that
+        # can still hold NaN need a per-row check
+        groups = {}
+        for stage in self.stages:
+            for field, default in STAGE_FIELDS[stage]:
+                column = self.column(field)
+                missing = np.isnan(column)
+                if fill_defaults and default is not None:
+                    column = np.where(missing, default, column)
+                    missing = missing & self.kept[field] if field in self.kept else None
+                if missing is not None and not missing.any():
+                    missing = None
+                values = column.astype(np.int64) if field in INTEGER_FIELDS and missing is None else column
+                parent, _, key = field.rpartition('.')
+                groups.setdefault(parent, []).append(
+                    (key, values.tolist(), None if missing is None else missing.tolist(), field in INTEGER_FIELDS))
+
+        centroids = self.centroids.tolist()
+        records = []
+        for i, hood in enumerate(self.names):
+            lat, lon = centroids[i]
+            data = {
+                "neighborhood": hood,
+                "coordinates": {"latitude": lat, "longitude": lon},
+            }
+            for parent, columns in groups.items():
+                target = data.setdefault(parent, {}) if parent else data
+                for key, values, missing, integer in columns:
+                    if missing is None:
+                        target[key] = values[i]
+                    elif not missing[i]:
+                        target[key] = int(values[i]) if integer else values[i]
+                if parent and not target:
+                    del data[parent]
+            records.append((hood, data, self.city_id))
+        return records
@@ -1,23 +1,39 @@
-import requests
+import time
+from utils import checkpoints, http_client, metrics
 from collections import defaultdict
-from config import SF_CRIME_DATA_URL, NEIGHBORHOOD_COORDS
+from config import CRIME_QUERY_LIMIT, CRIME_FEED_FORMAT
+from city_registry import get_city, get_fallbacks, DEFAULT_CRIME_FIELDS
 
-def fetch_crime_data():
+def fetch_crime_data(city=None):
     """
-    Fetch crime data from SF Open Data Portal
+    Fetch crime data from the city's open data portal (SODA API)
     Using 2023-2024 incident reports
     
-    API Documentation: https://data.sfgov.org/Public-Safety/Police-Department-Incident-Reports-2018-to-Present/wg3w-h783
+    SF API Documentation: https://data.sfgov.org/Public-Safety/Police-Department-Incident-Reports-2018-to-Present/wg3w-h783
     """
+    city = city or get_city()
+    crime = city.get('crime')
+    if not crime or not crime.get('url'):
+        print(f"  ⚠️  No crime feed configured for {city['name']}, using fallback data")
+        return None
+    
+    fields = crime['fields']
+    select = [fields['neighborhood'], fields['category']]
+    if fields.get('subcategory'):
+        select.append(fields['subcategory'])
+    if fields.get('latitude') and fields.get('longitude'):
+        select += [fields['latitude'], fields['longitude']]
     params = {
-        '$limit': 100000,
-        '$where': "incident_datetime >= '2023-01-01T00:00:00.000'",
-        '$select': 'analysis_neighborhood,incident_category,incident_subcategory'
+        '$limit': CRIME_QUERY_LIMIT,
+        '$where': f"{fields['datetime']} >= '2023-01-01T00:00:00.000'",
+        '$select': ','.join(select)
     }
     
     try:
-        print("  Fetching from SF Open Data API...")
-        response = requests.get(SF_CRIME_DATA_URL, params=params, timeout=30)
+        print(f"  Fetching from {city['name']} Open Data API...")
+        if CRIME_FEED_FORMAT == 'csv':
+            return fetch_crime_csv(crime, params)
+        response = http_client.get(crime['url'], params=params, timeout=30)
         
         if response.status_code != 200:
             print(f"  ⚠️  Crime API returned {response.status_code}, using fallback data")
@@ -32,6 +48,25 @@ def fetch_crime_data():
         return None
 
 
+def fetch_crime_csv(crime, params):
+    """
+    Stream the feed's CSV export into IncidentColumns (see utils/soda.py)
+    instead of materializing one dict per incident
+    """
+    from utils.soda import read_incident_csv, stream_text
+    
+    url = crime['url'].rsplit('.', 1)[0] + '.csv'
+    response = http_client.get(url, params=params, timeout=30, stream=True)
+    with response:
+        if response.status_code != 200:
+            print(f"  ⚠️  Crime API returned {response.status_code}, using fallback data")
+            return None
+        data = read_incident_csv(stream_text(response), crime['fields'])
+    print(f"  ✅ Streamed {len(data)} crime incidents "
+          f"({len(data.neighborhoods)} neighborhoods, {len(data.categories)} categories)")
+    return data
+
+
 def get_fallback_crime_data():
     """
     Fallback crime estimates based on SFPD 2023 reports
@@ -150,18 +185,28 @@ def assign_crime_severity_weight(category, subcategory=None):
     return 1.5
 
 
-def calculate_weighted_crime_score(crime_data, neighborhoods):
+def calculate_weighted_crime_score(crime_data, neighborhoods, fields=None):
     """
     Calculate weighted crime scores based on incident severity
     Returns total weighted crime incidents per neighborhood
+    
+    fields maps 'neighborhood'/'category'/'subcategory' to the feed's column names
     """
+    fields = fields or DEFAULT_CRIME_FIELDS
+    loop_start = time.perf_counter()
+    if hasattr(crime_data, 'severity'):
+        weighted_scores, incident_counts = _weighted_crime_columns(crime_data)
+        metrics.record_rows('crime', len(crime_data), time.perf_counter() - loop_start)
+        print(f"  📊 Processed {sum(incident_counts.values())} incidents across {len(weighted_scores)} neighborhoods")
+        return weighted_scores, incident_counts
+    
     weighted_scores = defaultdict(float)
     incident_counts = defaultdict(int)
     
     for incident in crime_data:
-        neighborhood = incident.get('analysis_neighborhood', '')
-        category = incident.get('incident_category', '')
-        subcategory = incident.get('incident_subcategory', '')
+        neighborhood = incident.get(fields['neighborhood'], '')
+        category = incident.get(fields['category'], '')
+        subcategory = incident.get(fields.get('subcategory') or '', '')
         
         if not neighborhood:
             continue
@@ -170,17 +215,34 @@ def calculate_weighted_crime_score(crime_data, neighborhoods):
         weighted_scores[neighborhood] += weight
         incident_counts[neighborhood] += 1
     
+    metrics.record_rows('crime', len(crime_data), time.perf_counter() - loop_start)
     print(f"  📊 Processed {sum(incident_counts.values())} incidents across {len(weighted_scores)} neighborhoods")
     
     return dict(weighted_scores), dict(incident_counts)
 
 
-def map_to_standard_neighborhood_names(crime_scores, neighborhoods):
+def _weighted_crime_columns(columns):
+    """calculate_weighted_crime_score over IncidentColumns: one bincount per total"""
+    import numpy as np
+    
+    codes = columns.arrays()['neighborhood']
+    weights = columns.severity(assign_crime_severity_weight)
+    n = len(columns.neighborhoods)
+    totals = np.bincount(codes, weights, minlength=n).tolist()
+    counts = np.bincount(codes, minlength=n).tolist()
+    names = columns.neighborhoods.values
+    weighted_scores = {names[i]: totals[i] for i in range(n) if names[i] and counts[i]}
+    incident_counts = {names[i]: counts[i] for i in range(n) if names[i] and counts[i]}
+    return weighted_scores, incident_counts
+
+
+def map_to_standard_neighborhood_names(crime_scores, neighborhoods, aliases=None):
     """
     Map SF Open Data neighborhood names to our standardized names
     
     SF Open Data uses specific naming conventions that differ from common usage.
     This function handles all variations and aliases.
+    Other cities pass their own aliases ({"Our Name": ["Feed Name", ...]}).
     """
     results = {}
     
@@ -365,6 +427,9 @@ def map_to_standard_neighborhood_names(crime_scores, neighborhoods):
         ],
     }
     
+    if aliases is not None:
+        name_mapping = aliases
+    
     # Reverse mapping for quick lookup
     reverse_mapping = {}
     for standard_name, variations in name_mapping.items():
@@ -386,12 +451,13 @@ def map_to_standard_neighborhood_names(crime_scores, neighborhoods):
                     break
     
     # Step 2: Reverse mapping (SF name -> our name)
+    wanted = set(neighborhoods)
     for sf_name, crime_score in crime_scores.items():
         sf_name_lower = sf_name.lower()
         
         if sf_name_lower in reverse_mapping:
             our_name = reverse_mapping[sf_name_lower]
-            if our_name in neighborhoods and our_name not in results:
+            if our_name in wanted and our_name not in results:
                 results[our_name] = crime_score
                 print(f"  ✓ Mapped '{sf_name}' -> '{our_name}'")
     
@@ -463,7 +529,23 @@ def convert_crime_to_safety_percentage(crime_scores):
     return safety_percentages
 
 
-def process_crime_data(neighborhoods):
+def save_crime_tiles(data, city):
+    """Bin incidents with coordinates into the city's crime tiles and save them"""
+    from crime_tiles import build_tiles, tiles_path
+    
+    start = time.perf_counter()
+    tiles = build_tiles(data, city, city['crime']['fields'], assign_crime_severity_weight)
+    if tiles is None:
+        return None
+    tiles.save(tiles_path(city['id']))
+    finest = max(tiles.zooms)
+    print(f"  🗺️  Crime tiles: {int(tiles.counts[finest].sum())} incidents in "
+          f"{int((tiles.counts[finest] > 0).sum())} zoom-{finest} tiles "
+          f"({tiles.dropped} without usable coordinates) in {time.perf_counter() - start:.2f}s")
+    return tiles
+
+
+def process_crime_data(neighborhoods, city=None):
     """
     Main function to process crime data and return safety percentages
     Uses MIN/MAX SCALING for consistent relative comparisons
@@ -473,19 +555,23 @@ def process_crime_data(neighborhoods):
         Where safety_percentage is 0-100% (scaled between min and max)
     """
     
+    city = city or get_city()
+    crime = city.get('crime') or {}
+    
     # Step 1: Fetch crime data from API
-    data = fetch_crime_data()
+    data = fetch_crime_data(city)
     
     # Step 2: Process based on whether API worked
     if data and len(data) > 0:
         print("  📊 Processing API crime data...")
         
         # Calculate weighted crime scores
-        crime_scores, incident_counts = calculate_weighted_crime_score(data, neighborhoods)
+        crime_scores, incident_counts = calculate_weighted_crime_score(data, neighborhoods, crime.get('fields'))
         
         print(f"\n  🗺️  Mapping neighborhood names...")
-        # Map to our neighborhood names
-        crime_scores = map_to_standard_neighborhood_names(crime_scores, neighborhoods)
+        # Map to our neighborhood names (builtin cities use the curated SF aliases)
+        aliases = None if city.get('builtin') else crime.get('aliases', {})
+        crime_scores = map_to_standard_neighborhood_names(crime_scores, neighborhoods, aliases)
         
         # For missing neighborhoods, use average
         if len(crime_scores) < len(neighborhoods):
@@ -498,18 +584,22 @@ def process_crime_data(neighborhoods):
         # Convert to safety percentages with min/max scaling
         safety_percentages = convert_crime_to_safety_percentage(crime_scores)
         
+        # Block-level safety from incident coordinates (see crime_tiles.py)
+        save_crime_tiles(data, city)
+        
     else:
         # Use fallback data
         print("  📊 Using fallback crime data...")
-        crime_rates = get_fallback_crime_data()
+        crime_rates = get_fallbacks(city, 'crime', get_fallback_crime_data)
         
         # Ensure all neighborhoods have values
         for hood in neighborhoods:
             if hood not in crime_rates:
                 crime_rates[hood] = 60  # Default moderate crime rate
         
-        # Convert to safety percentages with min/max scaling
-        safety_percentages = convert_crime_to_safety_percentage(crime_rates)
+        # Convert to safety percentages with min/max scaling (not checkpointed,
+        # the next run tries the feed again)
+        safety_percentages = checkpoints.Degraded(convert_crime_to_safety_percentage(crime_rates))
     
     # Step 3: Print summary
     print("\n  " + "="*76)
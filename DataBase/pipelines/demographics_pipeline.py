@@ -1,11 +1,14 @@
-import requests
-from config import NEIGHBORHOODS
+import os
+import numpy as np
+import config
+from city_registry import get_city, get_fallbacks
+from neighborhood_table import NeighborhoodTable, scale
 from utils.normalizers import normalize_to_percentage
 
 def get_demographic_data():
     """
-    Fetch demographic data from SF Open Data or use census estimates
-    Using American Community Survey 5-Year Data
+    Curated census estimates (2020-2022 ACS 5-year)
+    Used when no local ACS extract is configured (see utils/acs.py)
     """
     # Fallback: curated data from 2020-2022 ACS estimates
     age_data = {
@@ -67,23 +70,35 @@ def get_demographic_data():
     
     return age_data, density_data
 
-def process_demographics(neighborhoods):
+def process_demographics(neighborhoods, city=None):
     """Process age and population density"""
-    age_data, density_data = get_demographic_data()
-    
-    # Normalize density to percentage
-    min_density = min(density_data.values())
-    max_density = max(density_data.values())
-    
+    city = city or get_city()
+    age_data = get_fallbacks(city, 'age', lambda: get_demographic_data()[0])
+    density_data = get_fallbacks(city, 'density', lambda: get_demographic_data()[1])
+
+    # A local ACS extract takes precedence; curated values fill any gaps
+    if config.ACS_DATA_FILE and os.path.exists(config.ACS_DATA_FILE):
+        from utils.acs import aggregate_acs
+        acs_age, acs_density = aggregate_acs(config.ACS_DATA_FILE, city)
+        print(f"  ✅ ACS data for {len(acs_density)}/{len(city['neighborhoods'])} neighborhoods")
+        age_data.update(acs_age)
+        density_data.update(acs_density)
+
+    # Scale density across this city's neighborhoods only; neighborhoods
+    # without a value sit at 20000 people/sq mi within that range
+    table = NeighborhoodTable(city)
+    table.set('density', density_data)
+    density = table.column('density')
+    known = density[~np.isnan(density)]
+    bounds = (known.min(), known.max()) if len(known) else (20000, 20000)
+    scaled = scale(np.where(np.isnan(density), 20000, density), bounds=bounds).tolist()
+    missing = normalize_to_percentage(20000, *bounds)
+
     results = {}
-    for hood in neighborhoods:
+    for hood, i in zip(neighborhoods, table.id_of(neighborhoods).tolist()):
         results[hood] = {
             'age_demographic': round(age_data.get(hood, 38.0), 1),
-            'population_density': normalize_to_percentage(
-                density_data.get(hood, 20000),
-                min_density,
-                max_density
-            )
+            'population_density': scaled[i] if i >= 0 else missing,
         }
     
-    return results
\ No newline at end of file
+    return results
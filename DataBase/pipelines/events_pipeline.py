@@ -1,20 +1,30 @@
-import requests
+import math
+import config
+from utils import checkpoints, http_client, quota
 from datetime import datetime, timedelta
-from config import EVENTBRITE_TOKEN, EVENTBRITE_SEARCH_URL, NEIGHBORHOOD_COORDS
+from config import EVENTBRITE_TOKEN, EVENTBRITE_SEARCH_URL
+from city_registry import get_city, get_fallbacks
+from neighborhood_table import NeighborhoodTable
+from utils.geocoding import nearest_centroids
 from utils.normalizers import normalize_to_percentage
 
-def search_eventbrite(latitude, longitude, radius_km=3):
+def eventbrite_enabled():
+    return bool(EVENTBRITE_TOKEN) and EVENTBRITE_TOKEN != 'your_eventbrite_token_here'
+
+def search_eventbrite(latitude, longitude, radius_km=3, page=None, continuation=None, start=None):
     """
-    Search Eventbrite for events near coordinates
-    Returns event count as proxy for "happening" score
+    One page of Eventbrite events in the 7 days from start (default now)
+    within radius_km
+    Returns the response JSON ('events' and 'pagination'), or None on
+    failure; QuotaExceededError (the day's budget is spent) propagates
     """
-    if not EVENTBRITE_TOKEN or EVENTBRITE_TOKEN == 'your_eventbrite_token_here':
+    if not eventbrite_enabled():
         return None  # Signal to use fallback
     
     headers = {'Authorization': f'Bearer {EVENTBRITE_TOKEN}'}
     
     # Search for events in next 7 days
-    now = datetime.utcnow()
+    now = start or datetime.utcnow()
     end_date = now + timedelta(days=7)
     
     params = {
@@ -25,19 +35,83 @@ def search_eventbrite(latitude, longitude, radius_km=3):
         'start_date.range_end': end_date.isoformat() + 'Z',
         'expand': 'venue',
     }
+    if continuation:
+        params['continuation'] = continuation
+    elif page:
+        params['page'] = page
     
     try:
-        response = requests.get(EVENTBRITE_SEARCH_URL, headers=headers, params=params, timeout=10)
+        response = http_client.get(EVENTBRITE_SEARCH_URL, headers=headers, params=params, timeout=10, hedge=True)
         if response.status_code == 200:
-            data = response.json()
-            return data.get('events', [])
+            return response.json()
         else:
             print(f"⚠️  Eventbrite API returned status {response.status_code}")
             return None
+    except quota.QuotaExceededError:
+        raise  # not an outage: the caller defers the sweep
     except Exception as e:
         print(f"⚠️  Eventbrite error: {e}")
         return None
 
+def search_area(centroids):
+    """
+    (lat, lon, radius_km) of one circle covering every centroid plus its
+    footprint (config.COVERAGE_FOOTPRINT_KM)
+    """
+    points = list(centroids.values())
+    lat = sum(p[0] for p in points) / len(points)
+    lon = sum(p[1] for p in points) / len(points)
+    _, distances = nearest_centroids(points, [(lat, lon)])
+    return lat, lon, math.ceil(float(distances.max()) + config.COVERAGE_FOOTPRINT_KM)
+
+def sweep_eventbrite(latitude, longitude, radius_km):
+    """
+    Every event in the window within radius_km, paging until has_more_items
+    is false (continuation token if the API hands one out, page number
+    otherwise). Returns ({event id: event}, complete), or None if the first
+    page failed; complete is False when a later page failed or the page
+    limit was hit. QuotaExceededError from search_eventbrite propagates
+    """
+    events = {}
+    page, continuation = 1, None
+    start = datetime.utcnow()  # every page asks for the same window
+    while page <= config.EVENTBRITE_MAX_PAGES:
+        data = search_eventbrite(latitude, longitude, radius_km, page, continuation, start)
+        if data is None:
+            if page == 1:
+                return None
+            print(f"  ⚠️  Eventbrite sweep stopped at page {page}")
+            return events, False
+        for event in data.get('events', []):
+            events.setdefault(event.get('id') or id(event), event)
+        pagination = data.get('pagination') or {}
+        if not pagination.get('has_more_items'):
+            return events, True
+        page, continuation = page + 1, pagination.get('continuation')
+    print(f"  ⚠️  Eventbrite sweep hit the {config.EVENTBRITE_MAX_PAGES}-page limit")
+    return events, False
+
+def _venue_coordinates(event):
+    venue = event.get('venue') or {}
+    try:
+        return float(venue['latitude']), float(venue['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None  # online events and venues without coordinates
+
+def count_events_by_neighborhood(events, centroids):
+    """
+    {neighborhood: events} with each event counted once, for the centroid
+    nearest its venue (within config.COVERAGE_FOOTPRINT_KM)
+    """
+    points = [point for point in map(_venue_coordinates, events) if point is not None]
+    names = list(centroids)
+    indices, _ = nearest_centroids(points, list(centroids.values()), max_km=config.COVERAGE_FOOTPRINT_KM)
+    counts = dict.fromkeys(names, 0)
+    for index in indices.tolist():
+        if index >= 0:
+            counts[names[index]] += 1
+    return counts
+
 def get_fallback_happening_scores():
     """Curated happening scores based on nightlife/events reputation"""
     return {
@@ -68,29 +142,58 @@ def get_fallback_happening_scores():
         "Lake Merced": 15,
     }
 
-def process_happening_index(neighborhoods):
+def fill_missing_scores(scores, neighborhoods, fallback):
+    """Curated scores (fallback) for neighborhoods the API left out after failed requests"""
+    missing = [hood for hood in neighborhoods if hood not in scores]
+    if missing:
+        print(f"  ⚠️  No API data for {len(missing)} neighborhoods, using curated scores for them")
+        scores.update((hood, fallback[hood]) for hood in missing if hood in fallback)
+    return scores
+
+def process_happening_index(neighborhoods, city=None):
     """
     Calculate 'happening' score based on events density
-    Falls back to curated data if API unavailable or returns no events
+    One citywide search paged through to the end, each event counted for
+    the neighborhood nearest its venue
+    Falls back to curated data if API unavailable or returns no events;
+    maps every neighborhood to None (stored scores kept) when the day's
+    Eventbrite quota can't cover the sweep or the sweep is cut short
     """
+    city = city or get_city()
     event_counts = {}
     api_working = False
+    deferred = checkpoints.Degraded(dict.fromkeys(neighborhoods))
+    centroids = {hood: (lat, lon) for hood, lat, lon in NeighborhoodTable(city, neighborhoods).located_items()}
     
-    if EVENTBRITE_TOKEN and EVENTBRITE_TOKEN != 'your_eventbrite_token_here':
+    if eventbrite_enabled() and centroids:
         print("  Attempting to fetch Eventbrite data...")
+        # The sweep is one unit: run it whole or keep the stored scores until the
+        # next window. Until one has finished, assume it takes the page limit
+        # (or the whole budget, when that is smaller)
+        first_sweep = min(config.EVENTBRITE_MAX_PAGES, quota.budget('eventbrite') or config.EVENTBRITE_MAX_PAGES)
+        if quota.exhausted('eventbrite') or not quota.schedule(
+                'eventbrite', city['id'], ['events'], cost=first_sweep)[0]:
+            return deferred
+        spent = quota.calls('eventbrite')
+        lat, lon, radius_km = search_area(centroids)
+        try:
+            swept = sweep_eventbrite(lat, lon, radius_km)
+        except quota.QuotaExceededError:
+            print("  ⏳ Eventbrite quota spent mid-sweep, keeping stored happening scores")
+            return deferred
         
-        for hood, coords in NEIGHBORHOOD_COORDS.items():
-            if hood not in neighborhoods:
-                continue
-            
-            events = search_eventbrite(coords[0], coords[1])
-            
-            if events is None:  # API error
-                break
-            
-            event_counts[hood] = len(events)
-            if len(events) > 0:
-                api_working = True
+        if swept is None:
+            print("  🔌 Eventbrite unavailable")
+        else:
+            events, complete = swept
+            event_counts = count_events_by_neighborhood(events.values(), centroids)
+            located = sum(event_counts.values())
+            print(f"  🎟️  {len(events)} events within {radius_km} km, {located} in a neighborhood")
+            if not complete:  # a partial sweep undercounts by page, not by neighborhood
+                print("  ⚠️  Eventbrite sweep incomplete, keeping stored happening scores")
+                return deferred
+            quota.done('eventbrite', city['id'], ['events'], quota.calls('eventbrite') - spent)
+            api_working = located > 0
         
         # Only use API data if we got meaningful results
         if api_working and event_counts:
@@ -99,11 +202,13 @@ def process_happening_index(neighborhoods):
             max_events = max(event_counts.values())
             
             if max_events > 0:
-                return {
+                scores = {
                     hood: normalize_to_percentage(count, min_events, max_events)
                     for hood, count in event_counts.items()
                 }
+                return fill_missing_scores(
+                    scores, neighborhoods, get_fallbacks(city, 'happening', get_fallback_happening_scores))
     
     # Fallback to curated data
     print("  ⚠️  Using fallback happening scores (curated data)")
-    return get_fallback_happening_scores()
\ No newline at end of file
+    return checkpoints.Degraded(get_fallbacks(city, 'happening', get_fallback_happening_scores))
\ No newline at end of file
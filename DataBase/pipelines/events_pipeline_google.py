@@ -1,47 +1,156 @@
-import requests
-import time
-from config import NEIGHBORHOOD_COORDS
+import config
+import query_planner
+from utils import checkpoints, http_client, quota
+from config import GOOGLE_PLACES_URL
+from city_registry import get_city, get_fallbacks
+from neighborhood_table import NeighborhoodTable
+from pipelines.events_pipeline import fill_missing_scores
 from utils.normalizers import normalize_to_percentage
 import os
+import time
 
 GOOGLE_PLACES_API_KEY = os.getenv('GOOGLE_PLACES_API_KEY')
 
+NIGHTLIFE_TYPES = ['night_club', 'bar', 'restaurant']
+PLACES_PAGE_SIZE = 20       # results per page; further pages cost a request each
+PLACES_CELL_PAGES = 3
+PLACES_MAX_RESULTS = 60     # the API stops handing out page tokens here
+PLACES_MAX_RADIUS_M = 50000
+PLACES_TOKEN_DELAY = float(os.getenv('PLACES_TOKEN_DELAY', '2'))  # seconds before a next_page_token is valid
+
+def places_enabled():
+    return bool(GOOGLE_PLACES_API_KEY) and GOOGLE_PLACES_API_KEY != 'your_google_key'
+
+def search_places(latitude, longitude, place_type, radius=1500, max_pages=1):
+    """
+    Nearby Search results for one type, following next_page_token up to
+    max_pages (a token only works after a short delay, PLACES_TOKEN_DELAY)
+    Returns (results, complete), or None on failure; complete is False when
+    more pages exist or the API's 60-result limit was reached
+    """
+    params = {
+        'location': f'{latitude},{longitude}',
+        'radius': int(radius),
+        'type': place_type,
+        'key': GOOGLE_PLACES_API_KEY
+    }
+    
+    results = []
+    for page in range(max_pages):
+        try:
+            response = http_client.get(GOOGLE_PLACES_URL, params=params, timeout=10, hedge=True)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+        except Exception as e:
+            print(f"⚠️  Google Places error: {e}")
+            return None
+        results.extend(data.get('results', []))
+        token = data.get('next_page_token')
+        if not token:
+            return results, len(results) < PLACES_MAX_RESULTS
+        if page + 1 < max_pages:
+            time.sleep(PLACES_TOKEN_DELAY)
+            params = {'pagetoken': token, 'key': GOOGLE_PLACES_API_KEY}
+    return results, False
+
 def count_nightlife_venues(latitude, longitude, radius=1500):
     """
     Count nightlife venues (bars, clubs, music venues) as proxy for "happening"
     Using Google Places API
     """
-    if not GOOGLE_PLACES_API_KEY or GOOGLE_PLACES_API_KEY == 'your_google_key':
+    if not places_enabled():
         return None
     
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    
-    types = ['night_club', 'bar', 'restaurant']
     total_count = 0
-    
-    for place_type in types:
-        params = {
-            'location': f'{latitude},{longitude}',
-            'radius': radius,
-            'type': place_type,
-            'key': GOOGLE_PLACES_API_KEY
-        }
-        
-        try:
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get('results', [])
-                total_count += len(results)
-                time.sleep(0.5)  # Rate limiting
-            else:
-                return None
-        except Exception as e:
-            print(f"⚠️  Google Places error: {e}")
+    for place_type in NIGHTLIFE_TYPES:
+        response = search_places(latitude, longitude, place_type, radius)
+        if response is None:
             return None
+        total_count += len(response[0])
     
     return total_count
 
+def count_nightlife_venues_by_centroid(neighborhoods, city):
+    """
+    {neighborhood: venues} from one set of queries around each centroid,
+    oldest data first; neighborhoods whose request failed, or that the
+    circuit breaker or the day's quota left unfetched, map to None
+    """
+    scope = f"{city['id']}/nightlife"
+    centroids = {hood: (lat, lon) for hood, lat, lon in NeighborhoodTable(city, neighborhoods).located_items()}
+    granted, deferred = quota.schedule('places', scope, centroids, cost=len(NIGHTLIFE_TYPES))
+    venue_counts = dict.fromkeys(deferred)
+    for i, hood in enumerate(granted):
+        count = count_nightlife_venues(*centroids[hood])
+        
+        if count is None:  # API error: keep the stored value, stop once the circuit opens
+            venue_counts[hood] = None
+            if http_client.circuit_open(GOOGLE_PLACES_URL):
+                fetched = sum(value is not None for value in venue_counts.values())
+                print(f"  🔌 Google Places unavailable, keeping {fetched} neighborhoods fetched so far")
+                venue_counts.update(dict.fromkeys(granted[i:]))
+                break
+            if quota.exhausted('places'):
+                print(f"  ⏳ Google Places quota spent, deferring {len(granted) - i} neighborhoods to the next window")
+                venue_counts.update(dict.fromkeys(granted[i:]))
+                break
+            continue
+        
+        venue_counts[hood] = count
+        print(f"  {hood}: {count} venues")
+    quota.done('places', scope, [hood for hood, count in venue_counts.items() if count is not None])
+    if None in venue_counts.values():
+        return checkpoints.Degraded(venue_counts)
+    return venue_counts
+
+def _place_coordinates(place):
+    location = (place.get('geometry') or {}).get('location') or {}
+    if location.get('lat') is None or location.get('lng') is None:
+        return None
+    return location['lat'], location['lng']
+
+def count_nightlife_venues_planned(neighborhoods, city):
+    """
+    {neighborhood: venues} from query_planner cells per place type; places
+    are deduplicated by place_id (a bar that is also a restaurant counts
+    once) and counted for their nearest neighborhood. Neighborhoods without
+    venues so far map to None if the sweep was cut short, and every
+    neighborhood does if the day's quota can't cover it
+    """
+    centroids = {hood: (lat, lon) for hood, lat, lon in NeighborhoodTable(city, neighborhoods).located_items()}
+    # All types are one unit (counts mix them): run whole or defer whole
+    granted, _ = quota.schedule('places', city['id'], ['nightlife'], cost=len(centroids) * len(NIGHTLIFE_TYPES))
+    if not granted:
+        return checkpoints.Degraded(dict.fromkeys(centroids))
+    spent = quota.calls('places')
+    places = {}
+    complete = True
+    for place_type in NIGHTLIFE_TYPES:
+        plan = query_planner.load_plan(city['id'], f"places-{place_type}", centroids,
+                                       PLACES_PAGE_SIZE * PLACES_CELL_PAGES, PLACES_MAX_RADIUS_M)
+        found, stats = query_planner.sweep(
+            plan,
+            lambda lat, lon, radius: search_places(lat, lon, place_type, radius, PLACES_CELL_PAGES),
+            key=lambda place: place.get('place_id') or (place.get('name'), _place_coordinates(place)),
+            stop=lambda: http_client.circuit_open(GOOGLE_PLACES_URL),
+        )
+        plan.save()
+        print(f"  🗺️  {place_type}: {len(found)} places from {query_planner.describe(stats, plan)}")
+        places.update(found)
+        if not stats['complete']:
+            complete = False
+            if http_client.circuit_open(GOOGLE_PLACES_URL):
+                break
+
+    by_hood = query_planner.assign(places.values(), plan, _place_coordinates)
+    if not complete:
+        print(f"  ⚠️  Google Places sweep incomplete, keeping {len(by_hood)} neighborhoods fetched so far")
+        venue_counts = {hood: len(by_hood[hood]) if hood in by_hood else None for hood in centroids}
+        return checkpoints.Degraded(venue_counts)
+    quota.done('places', city['id'], ['nightlife'], quota.calls('places') - spent)
+    return {hood: len(by_hood.get(hood, ())) for hood in centroids}
+
 def get_fallback_happening_scores():
     """Curated happening scores based on nightlife/events reputation"""
     return {
@@ -72,43 +181,40 @@ def get_fallback_happening_scores():
         "Lake Merced": 15,
     }
 
-def process_happening_index(neighborhoods):
+def process_happening_index(neighborhoods, city=None):
     """
     Calculate 'happening' score based on nightlife venue density
+    Requests are spaced by the shared per-host rate limiter in http_client
     """
-    venue_counts = {}
-    api_working = False
+    city = city or get_city()
     
-    if GOOGLE_PLACES_API_KEY and GOOGLE_PLACES_API_KEY != 'your_google_key':
+    if places_enabled():
         print("  Attempting to fetch Google Places data...")
-        
-        for hood, coords in NEIGHBORHOOD_COORDS.items():
-            if hood not in neighborhoods:
-                continue
-            
-            count = count_nightlife_venues(coords[0], coords[1])
-            
-            if count is None:
-                break
-            
-            venue_counts[hood] = count
-            if count > 0:
-                api_working = True
-            
-            print(f"  {hood}: {count} venues")
+        if config.COVERAGE_PLANNER:
+            venue_counts = count_nightlife_venues_planned(neighborhoods, city)
+        else:
+            venue_counts = count_nightlife_venues_by_centroid(neighborhoods, city)
+        fetched = [count for count in venue_counts.values() if count is not None]
+        if venue_counts and not fetched:
+            print("  ⏳ Google Places deferred, keeping stored happening scores")
+            return checkpoints.Degraded(venue_counts)
+        api_working = any(fetched)
         
         # Use API data if meaningful
-        if api_working and venue_counts:
+        if api_working:
             print("  ✅ Using Google Places data")
-            min_count = min(venue_counts.values())
-            max_count = max(venue_counts.values())
+            min_count = min(fetched)
+            max_count = max(fetched)
             
             if max_count > 0:
-                return {
-                    hood: normalize_to_percentage(count, min_count, max_count)
+                scores = {
+                    hood: None if count is None else normalize_to_percentage(count, min_count, max_count)
                     for hood, count in venue_counts.items()
                 }
+                scores = fill_missing_scores(
+                    scores, neighborhoods, get_fallbacks(city, 'happening', get_fallback_happening_scores))
+                return checkpoints.Degraded(scores) if isinstance(venue_counts, checkpoints.Degraded) else scores
     
     # Fallback
     print("  ⚠️  Using fallback happening scores (curated data)")
-    return get_fallback_happening_scores()
\ No newline at end of file
+    return checkpoints.Degraded(get_fallbacks(city, 'happening', get_fallback_happening_scores))
\ No newline at end of file
@@ -1,9 +1,11 @@
-import requests
+import os
+import config
+from city_registry import get_city, get_fallbacks
 
 def fetch_rental_data():
     """
-    Fetch rental data from Zillow Observed Rent Index (free tier)
-    Alternative: Use RentCafe API or manual curated data
+    Curated 2024 average rents, used when no local ZORI file is configured
+    (see utils/zori.py for the Zillow Observed Rent Index ingestion)
     """
     # Using curated 2024 average rent data (1BR apartments)
     rent_data = {
@@ -36,7 +38,20 @@ def fetch_rental_data():
     
     return rent_data
 
-def process_property_rates(neighborhoods):
-    """Process average rent for each neighborhood"""
-    rent_data = fetch_rental_data()
-    return {hood: round(rent_data.get(hood, 3000.0), 0) for hood in neighborhoods}
\ No newline at end of file
+def process_property_rates(neighborhoods, city=None):
+    """
+    Process average rent for each neighborhood
+    Returns {hood: {'property_rates': rent}} plus 'rent_trend' (% change)
+    where ZORI data is available
+    """
+    city = city or get_city()
+    zori = {}
+    if config.ZORI_DATA_FILE and os.path.exists(config.ZORI_DATA_FILE):
+        from utils.zori import neighborhood_rents
+        zori = neighborhood_rents(config.ZORI_DATA_FILE, city, config.ZORI_MONTHS)
+
+    rent_data = get_fallbacks(city, 'rent', fetch_rental_data)
+    return {
+        hood: zori.get(hood) or {'property_rates': round(rent_data.get(hood, 3000.0), 0)}
+        for hood in neighborhoods
+    }
\ No newline at end of file
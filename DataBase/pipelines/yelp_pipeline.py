@@ -1,12 +1,27 @@
-import requests
-import time
-from config import YELP_API_KEY, YELP_SEARCH_URL, NEIGHBORHOOD_COORDS
+import config
+import query_planner
+from utils import checkpoints, http_client, quota
+from config import YELP_API_KEY, YELP_SEARCH_URL
+from city_registry import get_city
+from neighborhood_table import NeighborhoodTable
 from utils.normalizers import calculate_density_score, price_to_scale
 
+YELP_PAGE_LIMIT = 50        # max results per request
+YELP_CELL_PAGES = 10        # pages fetched for one planner cell before it is split instead
+YELP_MAX_RADIUS_M = 40000
+
+# (category key, Yelp categories, banner)
+YELP_CATEGORIES = [
+    ('bars', 'bars,nightlife', "🍺 Fetching Yelp data for bars..."),
+    ('restaurants', 'restaurants', "🍽️  Fetching Yelp data for restaurants..."),
+    ('cafes', 'cafes,coffee', "☕ Fetching Yelp data for cafes..."),
+]
+
 def search_yelp(latitude, longitude, category, radius=2000):
     """
     Search Yelp for businesses in a category
     Radius in meters (2000m = ~1.25 miles)
+    Returns None when the request failed
     """
     headers = {'Authorization': f'Bearer {YELP_API_KEY}'}
     params = {
@@ -14,71 +29,165 @@ def search_yelp(latitude, longitude, category, radius=2000):
         'longitude': longitude,
         'categories': category,
         'radius': radius,
-        'limit': 50  # Max results per request
+        'limit': YELP_PAGE_LIMIT
     }
     
     try:
-        response = requests.get(YELP_SEARCH_URL, headers=headers, params=params, timeout=10)
+        response = http_client.get(YELP_SEARCH_URL, headers=headers, params=params, timeout=10, hedge=True)
         if response.status_code == 200:
             return response.json().get('businesses', [])
         else:
             print(f"⚠️  Yelp API error {response.status_code} for {category}")
-            return []
+            return None
     except Exception as e:
         print(f"⚠️  Yelp request failed: {e}")
-        return []
+        return None
 
-def process_yelp_category(neighborhoods, category_key, yelp_category):
+def search_yelp_area(latitude, longitude, category, radius, max_pages=YELP_CELL_PAGES):
+    """
+    Every business in the circle, paging with offset up to max_pages
+    Returns (businesses, complete), or None when a request failed; complete
+    is False when Yelp reports more than the pages allow
+    """
+    headers = {'Authorization': f'Bearer {YELP_API_KEY}'}
+    params = {
+        'latitude': latitude,
+        'longitude': longitude,
+        'categories': category,
+        'radius': int(radius),
+        'limit': YELP_PAGE_LIMIT
+    }
+    
+    businesses = []
+    total = 0
+    for page in range(max_pages):
+        params['offset'] = page * YELP_PAGE_LIMIT
+        try:
+            response = http_client.get(YELP_SEARCH_URL, headers=headers, params=params, timeout=10, hedge=True)
+        except Exception as e:
+            print(f"⚠️  Yelp request failed: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"⚠️  Yelp API error {response.status_code} for {category}")
+            return None
+        data = response.json()
+        page_businesses = data.get('businesses', [])
+        businesses.extend(page_businesses)
+        total = data.get('total', len(businesses))
+        if page == 0 and total > YELP_PAGE_LIMIT * max_pages:
+            return businesses, False  # too dense to page through, split instead
+        if len(page_businesses) < YELP_PAGE_LIMIT or len(businesses) >= total:
+            break
+    return businesses, len(businesses) >= total
+
+def summarize_businesses(businesses):
+    """{avg_price, avg_rating, count} for a neighborhood's businesses"""
+    if not businesses:
+        return {'avg_price': 2.0, 'avg_rating': 3.5, 'count': 0}
+    prices = [price_to_scale(b.get('price', '$$')) for b in businesses]
+    ratings = [b.get('rating', 3.5) for b in businesses]
+    return {
+        'avg_price': round(sum(prices) / len(prices), 1),
+        'avg_rating': round(sum(ratings) / len(ratings), 1),
+        'count': len(businesses)  # Density is derived across neighborhoods in NeighborhoodTable
+    }
+
+def _coordinates(business):
+    coords = business.get('coordinates') or {}
+    if coords.get('latitude') is None or coords.get('longitude') is None:
+        return None
+    return coords['latitude'], coords['longitude']
+
+def process_yelp_category_planned(table, category_key, yelp_category, city):
+    """
+    Cover the city with query_planner cells instead of one query per
+    centroid; businesses are deduplicated by id and counted for their
+    nearest neighborhood. If the sweep is cut short, neighborhoods without
+    businesses so far map to None (stored values kept)
+    """
+    centroids = {hood: (lat, lon) for hood, lat, lon in table.located_items()}
+    plan = query_planner.load_plan(city['id'], f"yelp-{category_key}", centroids,
+                                   YELP_PAGE_LIMIT * YELP_CELL_PAGES, YELP_MAX_RADIUS_M)
+    # The sweep is one unit of work: run it whole or defer it whole
+    granted, _ = quota.schedule('yelp', city['id'], [category_key], cost=len(plan.leaves) or len(centroids))
+    if not granted:
+        return checkpoints.Degraded(dict.fromkeys(centroids))
+    spent = quota.calls('yelp')
+    businesses, stats = query_planner.sweep(
+        plan,
+        lambda lat, lon, radius: search_yelp_area(lat, lon, yelp_category, radius),
+        key=lambda b: b.get('id') or (b.get('name'), _coordinates(b)),
+        stop=lambda: http_client.circuit_open(YELP_SEARCH_URL),
+    )
+    plan.save()
+    print(f"  🗺️  {len(businesses)} businesses from {query_planner.describe(stats, plan)}")
+
+    by_hood = query_planner.assign(businesses.values(), plan, _coordinates)
+    if not stats['complete']:
+        # Only part of the city was covered, so a zero count means nothing
+        print(f"  ⚠️  Yelp sweep incomplete, keeping {len(by_hood)} neighborhoods fetched so far")
+        results = {hood: summarize_businesses(by_hood[hood]) if hood in by_hood else None
+                   for hood in centroids}
+        return checkpoints.Degraded(results)
+    quota.done('yelp', city['id'], [category_key], quota.calls('yelp') - spent)
+    return {hood: summarize_businesses(by_hood.get(hood)) for hood in centroids}
+
+def process_yelp_category(neighborhoods, category_key, yelp_category, city=None):
     """
     Process a single Yelp category (bars, restaurants, cafes)
     Returns: {neighborhood: {avg_price, avg_rating, count}}
+    Requests are spaced by the shared per-host rate limiter in http_client
+    Neighborhoods whose request failed, that the circuit breaker or the
+    daily quota left unfetched map to None (stored values kept)
     """
-    results = {}
-    all_counts = []
-    
-    for hood, coords in NEIGHBORHOOD_COORDS.items():
-        if hood not in neighborhoods:
-            continue
-        
-        businesses = search_yelp(coords[0], coords[1], yelp_category)
-        time.sleep(0.5)  # Rate limiting
+    city = city or get_city()
+    table = NeighborhoodTable(city, neighborhoods)
+    if config.COVERAGE_PLANNER:
+        return process_yelp_category_planned(table, category_key, yelp_category, city)
+
+    # Oldest data first; what the day's budget doesn't cover waits for the next window
+    scope = f"{city['id']}/{category_key}"
+    centroids = {hood: (lat, lon) for hood, lat, lon in table.located_items()}
+    granted, deferred = quota.schedule('yelp', scope, centroids)
+    results = dict.fromkeys(deferred)
+    spent = quota.calls('yelp')
+    for i, hood in enumerate(granted):
+        businesses = search_yelp(*centroids[hood], yelp_category)
         
-        if not businesses:
-            results[hood] = {
-                'avg_price': 2.0,
-                'avg_rating': 3.5,
-                'count': 0
-            }
-            all_counts.append(0)
+        if businesses is None:
+            # Failed neighborhoods keep their stored values; once the
+            # circuit opens, keep what was fetched and stop
+            results[hood] = None
+            if http_client.circuit_open(YELP_SEARCH_URL):
+                fetched = sum(stats is not None for stats in results.values())
+                print(f"  🔌 Yelp unavailable, keeping {fetched} neighborhoods fetched so far")
+                results.update(dict.fromkeys(granted[i:]))
+                break
+            if quota.exhausted('yelp'):
+                print(f"  ⏳ Yelp quota spent, deferring {len(granted) - i} neighborhoods to the next window")
+                results.update(dict.fromkeys(granted[i:]))
+                break
             continue
         
-        # Calculate averages
-        prices = [price_to_scale(b.get('price', '$$')) for b in businesses]
-        ratings = [b.get('rating', 3.5) for b in businesses]
-        count = len(businesses)
-        all_counts.append(count)
-        
-        results[hood] = {
-            'avg_price': round(sum(prices) / len(prices), 1),
-            'avg_rating': round(sum(ratings) / len(ratings), 1),
-            'count': count  # Will normalize after loop
-        }
+        results[hood] = summarize_businesses(businesses)
     
+    quota.done('yelp', scope, [hood for hood, stats in results.items() if stats is not None])
+    if None in results.values():
+        return checkpoints.Degraded(results)
+    quota.done('yelp', city['id'], [category_key], quota.calls('yelp') - spent)
     return results
 
-def process_all_yelp_data(neighborhoods):
-    """Process bars, restaurants, and cafes"""
-    print("🍺 Fetching Yelp data for bars...")
-    bars = process_yelp_category(neighborhoods, 'bars', 'bars,nightlife')
-    
-    print("🍽️  Fetching Yelp data for restaurants...")
-    restaurants = process_yelp_category(neighborhoods, 'restaurants', 'restaurants')
-    
-    print("☕ Fetching Yelp data for cafes...")
-    cafes = process_yelp_category(neighborhoods, 'cafes', 'cafes,coffee')
+def process_all_yelp_data(neighborhoods, city=None):
+    """Process bars, restaurants, and cafes, the least recently fetched first"""
+    city = city or get_city()
+    categories = {key: (yelp_category, banner) for key, yelp_category, banner in YELP_CATEGORIES}
+    results = {}
+    for key in quota.oldest_first('yelp', city['id'], categories):
+        yelp_category, banner = categories[key]
+        print(banner)
+        results[key] = process_yelp_category(neighborhoods, key, yelp_category, city)
     
-    return {
-        'bars': bars,
-        'restaurants': restaurants,
-        'cafes': cafes
-    }
\ No newline at end of file
+    ordered = {key: results[key] for key, _, _ in YELP_CATEGORIES}
+    if any(isinstance(result, checkpoints.Degraded) for result in results.values()):
+        return checkpoints.Degraded(ordered)
+    return ordered
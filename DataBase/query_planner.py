@@ -0,0 +1,217 @@
+"""
+Adaptive query coverage for radius-search APIs (Yelp, Google Places)
+
+Instead of one fixed-radius query per neighborhood centroid, the city is
+covered by a quadtree of square cells, each searched with its
+circumscribed circle. A neighborhood's footprint is the disc of
+COVERAGE_FOOTPRINT_KM around its centroid; cells that touch no footprint
+are never queried. A cell whose search comes back incomplete (more venues
+than the API returns for one area, e.g. a full last page) is saturated and
+split into its four quadrants; sparse areas stay as one big query.
+
+The leaf cells are the plan. It is saved per city, source and set of
+neighborhoods under COVERAGE_PLAN_DIR and reused next run, so steady-state
+runs only query the leaves: leaves that saturate are split again, and
+sibling leaves that together returned under half of cap (the most
+results one cell's search can return) are merged back into their parent,
+unless that parent was ever saturated.
+Changing the neighborhoods, footprint or cap starts a separate plan.
+
+Results are deduplicated by id across overlapping circles, then assigned
+to the nearest centroid within the footprint (assign()).
+"""
+import hashlib
+import json
+import math
+import os
+import numpy as np
+from config import COVERAGE_FOOTPRINT_KM
+from utils.geocoding import nearest_centroids
+
+COVERAGE_PLAN_DIR = os.getenv('COVERAGE_PLAN_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.plans'))
+MIN_QUERY_RADIUS_M = 100    # never split below this; such cells stay saturated
+METERS_PER_DEGREE = 111320.0
+RADIUS_SLACK = 1.01         # circumscribed circle plus 1% for projection error
+
+
+class CoveragePlan:
+    """Quadtree of query cells over the neighborhoods' footprints"""
+
+    def __init__(self, centroids, cap, max_radius_m, footprint_km=COVERAGE_FOOTPRINT_KM, path=None):
+        self.names = list(centroids)
+        self.points = np.array([centroids[name] for name in self.names], dtype=float).reshape(-1, 2)
+        self.cap = cap
+        self.max_radius_m = max_radius_m
+        self.footprint_km = footprint_km
+        self.path = path
+        self.leaves = {}  # (depth, i, j) -> results the last query returned (None if it failed)
+        self.saturated = set()  # cells that came back incomplete; never merged back into
+
+        # Local equirectangular projection in meters around the city
+        self.lat0 = float(self.points[:, 0].mean()) if len(self.points) else 0.0
+        self.lon0 = float(self.points[:, 1].mean()) if len(self.points) else 0.0
+        self.kx = METERS_PER_DEGREE * math.cos(math.radians(self.lat0))
+        self.xy = np.column_stack([(self.points[:, 1] - self.lon0) * self.kx,
+                                   (self.points[:, 0] - self.lat0) * METERS_PER_DEGREE])
+        pad = footprint_km * 1000.0
+        low = self.xy.min(axis=0) - pad if len(self.xy) else np.zeros(2)
+        high = self.xy.max(axis=0) + pad if len(self.xy) else np.zeros(2)
+        self.origin = low
+        self.side = float(max((high - low).max(), 1.0))
+
+    @property
+    def signature(self):
+        key = json.dumps([[round(v, 5) for v in p] for p in self.points.tolist()]
+                         + [self.footprint_km, self.cap, self.max_radius_m])
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def circle(self, cell):
+        """(lat, lon, radius_m) of the circle around a cell"""
+        depth, i, j = cell
+        size = self.side / (1 << depth)
+        x = self.origin[0] + (i + 0.5) * size
+        y = self.origin[1] + (j + 0.5) * size
+        return (self.lat0 + y / METERS_PER_DEGREE, self.lon0 + x / self.kx,
+                size * math.sqrt(0.5) * RADIUS_SLACK)
+
+    def touches_footprint(self, cell):
+        depth, i, j = cell
+        size = self.side / (1 << depth)
+        x0, y0 = self.origin[0] + i * size, self.origin[1] + j * size
+        dx = np.maximum(np.maximum(x0 - self.xy[:, 0], self.xy[:, 0] - (x0 + size)), 0.0)
+        dy = np.maximum(np.maximum(y0 - self.xy[:, 1], self.xy[:, 1] - (y0 + size)), 0.0)
+        return bool(((dx * dx + dy * dy) <= (self.footprint_km * 1000.0) ** 2).any())
+
+    def children(self, cell):
+        depth, i, j = cell
+        quadrants = [(depth + 1, 2 * i + di, 2 * j + dj) for di in (0, 1) for dj in (0, 1)]
+        return [c for c in quadrants if self.touches_footprint(c)]
+
+    def cells(self):
+        """Cells to query this run: the saved leaves, or the root for a new plan"""
+        if self.leaves:
+            return sorted(self.leaves)
+        return [(0, 0, 0)] if len(self.points) else []
+
+    def coarsen(self):
+        """Merge sibling leaves that together returned under half a page; returns merges"""
+        parents = {}
+        for (depth, i, j), count in self.leaves.items():
+            if depth:
+                parents.setdefault((depth - 1, i // 2, j // 2), []).append(count)
+        merged = 0
+        for parent, counts in parents.items():
+            kids = self.children(parent)
+            if (parent in self.saturated or len(counts) != len(kids) or None in counts
+                    or not all(kid in self.leaves for kid in kids) or sum(counts) >= self.cap // 2):
+                continue
+            for kid in kids:
+                del self.leaves[kid]
+            self.leaves[parent] = sum(counts)
+            merged += 1
+        return merged
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'signature': self.signature,
+                'leaves': [[d, i, j, count] for (d, i, j), count in sorted(self.leaves.items())],
+                'saturated': sorted(self.saturated),
+            }, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Reuse a saved plan's leaves if it was built for the same inputs"""
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return self
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('signature') == self.signature:
+            self.leaves = {(d, i, j): count for d, i, j, count in saved['leaves']}
+            self.saturated = {tuple(cell) for cell in saved.get('saturated', ())}
+        return self
+
+
+def load_plan(city_id, name, centroids, cap, max_radius_m):
+    """The saved plan for this city, source (e.g. 'yelp-bars') and neighborhoods, or a fresh one"""
+    plan = CoveragePlan(centroids, cap, max_radius_m)
+    plan.path = os.path.join(COVERAGE_PLAN_DIR, f"{city_id}_{name}_{plan.signature[:10]}.json")
+    return plan.load()
+
+
+def sweep(plan, search, key, stop=None):
+    """
+    Query every cell of the plan with search(lat, lon, radius_m), which
+    returns (results, complete) or None on failure; complete=False means
+    the area holds more than was returned, so the cell is split and its
+    quadrants queried in the same run. stop() is checked after a failure
+    (e.g. an open circuit) to give up early.
+    Returns ({key(result): result}, stats) and updates plan.leaves
+    """
+    found = {}
+    leaves = {}
+    stats = {'searches': 0, 'split': 0, 'saturated': 0, 'failed': 0, 'complete': True}
+    queue = plan.cells()[::-1]
+    while queue:
+        cell = queue.pop()
+        lat, lon, radius = plan.circle(cell)
+        if radius > plan.max_radius_m:  # too big for one query, go straight to the quadrants
+            queue.extend(plan.children(cell)[::-1])
+            continue
+
+        response = search(lat, lon, radius)
+        stats['searches'] += 1
+        if response is None:
+            stats['failed'] += 1
+            stats['complete'] = False
+            leaves[cell] = plan.leaves.get(cell)
+            if stop and stop():
+                leaves.update((c, plan.leaves.get(c)) for c in queue)
+                break
+            continue
+
+        results, complete = response
+        for result in results:
+            found[key(result)] = result
+        if not complete:
+            plan.saturated.add(cell)
+            if radius / 2 >= MIN_QUERY_RADIUS_M:
+                stats['split'] += 1
+                queue.extend(plan.children(cell)[::-1])
+                continue
+            stats['saturated'] += 1
+        leaves[cell] = len(results)
+
+    plan.leaves = leaves
+    if stats['complete']:
+        stats['merged'] = plan.coarsen()
+    return found, stats
+
+
+def assign(results, plan, coordinates):
+    """
+    Group results by nearest neighborhood centroid within the footprint;
+    coordinates(result) gives (lat, lon) or None. Returns {name: [results]}
+    """
+    located = []
+    points = []
+    for result in results:
+        point = coordinates(result)
+        if point is not None:
+            located.append(result)
+            points.append(point)
+    indices, _ = nearest_centroids(points, plan.points, max_km=plan.footprint_km)
+    grouped = {}
+    for result, index in zip(located, indices.tolist()):
+        if index >= 0:
+            grouped.setdefault(plan.names[index], []).append(result)
+    return grouped
+
+
+def describe(stats, plan):
+    return (f"{stats['searches']} searches, {len(plan.leaves)} cells "
+            f"({stats['split']} split, {stats.get('merged', 0)} merged, {stats['saturated']} saturated)")
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Read/query service over neighborhood scores
+
+Loads the combined records once (Firestore via firebase_client, or a
+local SQLite/JSONL snapshot written by sinks.py), keeps a sorted index per
+numeric field and answers range filters, sorting and pagination from
+memory. A filter is driven by the most selective indexed range (two
+bisects, O(log n)), so a query costs O(log n + k) for k candidates in that
+range instead of scanning every document.
+
+    GET /neighborhoods?property_rates__lt=3000&safety__gt=60&sort=-safety&limit=10&offset=0
+    GET /neighborhoods/<name>
+    GET /rank?safety=0.4&happening=0.3&rent=0.3&k=10   weighted top-k (ranking.py)
+    GET /similar/<name>?k=5&metric=cosine              neighborhoods like <name> (similarity.py)
+    GET /similar?safety=80&property_rates=2500&k=5     nearest to raw feature values
+    GET /safety?lat=37.7599&lon=-122.4148              block-level safety (crime_tiles.py)
+    GET /safety/<z>/<x>/<y>                            one crime tile
+    GET /fields          indexed numeric fields
+    GET /healthz
+
+Operators: __gt, __gte, __lt, __lte, __eq. Nested fields use dots
+(bars.avg_rating__gte=4). The index is rebuilt off to the side and swapped
+in atomically whenever the source changes (hot reload).
+
+Usage:
+    python query_service.py --source sqlite:neighborhoods.db [--city sf] [--port 8081]
+    python query_service.py --source jsonl:neighborhoods.jsonl
+    python query_service.py --source firestore --reload-interval 300
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+from utils.normalizers import numeric_fields
+
+OPERATORS = ('gt', 'gte', 'lt', 'lte', 'eq')
+MAX_LIMIT = 500
+
+
+class NeighborhoodIndex:
+    """Immutable snapshot of records plus one sorted (value, position) index per numeric field"""
+
+    def __init__(self, records, version=None):
+        self.records = list(records)
+        self.version = version
+        self.loaded_at = time.time()
+        self.by_name = {r.get('neighborhood'): r for r in self.records}
+
+        columns = {}
+        for pos, record in enumerate(self.records):
+            for field, value in numeric_fields(record):
+                columns.setdefault(field, []).append((value, pos))
+        self.values = {}
+        self.positions = {}
+        for field, pairs in columns.items():
+            pairs.sort()
+            self.values[field] = [v for v, _ in pairs]
+            self.positions[field] = [p for _, p in pairs]
+        self._ranking = None
+        self._similarity = None
+        self._lazy_lock = threading.Lock()
+
+    @property
+    def ranking(self):
+        """RankingIndex over the same records, built on first use"""
+        if self._ranking is None:
+            with self._lazy_lock:
+                if self._ranking is None:
+                    from ranking import RankingIndex
+                    self._ranking = RankingIndex(self.records)
+        return self._ranking
+
+    @property
+    def similarity(self):
+        """SimilarityIndex over the same records, built on first use"""
+        if self._similarity is None:
+            with self._lazy_lock:
+                if self._similarity is None:
+                    from similarity import SimilarityIndex
+                    self._similarity = SimilarityIndex(self.records)
+        return self._similarity
+
+    def fields(self):
+        return sorted(self.values)
+
+    def _range(self, field, op, value):
+        """Index slice [lo, hi) of records satisfying one predicate"""
+        values = self.values[field]
+        if op == 'gt':
+            return bisect_right(values, value), len(values)
+        if op == 'gte':
+            return bisect_left(values, value), len(values)
+        if op == 'lt':
+            return 0, bisect_left(values, value)
+        if op == 'lte':
+            return 0, bisect_right(values, value)
+        return bisect_left(values, value), bisect_right(values, value)
+
+    def query(self, filters=(), sort=None, descending=False, limit=20, offset=0):
+        """
+        filters: [(field, op, value)] combined with AND
+        Returns (records, has_more)
+        """
+        for field, op, _ in filters:
+            if field not in self.values or op not in OPERATORS:
+                raise ValueError(f"unsupported filter {field}__{op}")
+        if sort is not None and sort not in self.values:
+            raise ValueError(f"cannot sort by {sort}")
+
+        # Per-filter index ranges; the narrowest one drives the scan
+        ranges = [(self._range(f, op, v), f) for f, op, v in filters]
+        bounds = {}
+        for (lo, hi), field in ranges:
+            cur_lo, cur_hi = bounds.get(field, (0, len(self.values[field])))
+            bounds[field] = (max(lo, cur_lo), min(hi, cur_hi))
+
+        if sort is not None:
+            driver = sort
+        elif bounds:
+            driver = min(bounds, key=lambda f: bounds[f][1] - bounds[f][0])
+        else:
+            driver = None
+
+        others = [(f, op, v) for f, op, v in filters if f != driver]
+        needed = offset + limit + 1
+
+        if driver is None:
+            candidates = range(len(self.records))
+        else:
+            lo, hi = bounds.get(driver, (0, len(self.values[driver])))
+            positions = self.positions[driver]
+            candidates = (positions[i] for i in (range(hi - 1, lo - 1, -1) if descending else range(lo, hi)))
+
+        matches = []
+        for pos in candidates:
+            if others and not self._matches(self.records[pos], others):
+                continue
+            matches.append(pos)
+            if len(matches) >= needed:
+                break
+
+        page = matches[offset:offset + limit]
+        return [self.records[pos] for pos in page], len(matches) > offset + limit
+
+    def _matches(self, record, filters):
+        for field, op, value in filters:
+            actual = _lookup(record, field)
+            if actual is None:
+                return False
+            if op == 'gt' and not actual > value:
+                return False
+            if op == 'gte' and not actual >= value:
+                return False
+            if op == 'lt' and not actual < value:
+                return False
+            if op == 'lte' and not actual <= value:
+                return False
+            if op == 'eq' and not actual == value:
+                return False
+        return True
+
+
+def _lookup(record, field):
+    value = record
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+# Sources ---------------------------------------------------------------
+
+def source_version(source):
+    """Cheap change marker for hot reload (None means: poll on the interval)"""
+    kind, _, path = source.partition(':')
+    if kind == 'jsonl':
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    if kind == 'sqlite':
+        import sqlite3
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute("SELECT COUNT(*), MAX(updated_at) FROM neighborhoods").fetchone()
+        finally:
+            conn.close()
+    return None
+
+
+def load_records(source, city_id=None):
+    """Combined records from 'firestore', 'sqlite:<path>' or 'jsonl:<path>'"""
+    from city_registry import DEFAULT_CITY
+
+    kind, _, path = source.partition(':')
+    city_id = city_id or DEFAULT_CITY
+    if kind == 'firestore':
+        from firebase_client import initialize_firebase, get_all_neighborhoods
+        return list(get_all_neighborhoods(initialize_firebase(), city_id).values())
+    if kind == 'sqlite':
+        from sinks import SQLiteSink
+        sink = SQLiteSink(path)
+        try:
+            return list(sink.get_all_neighborhoods(city_id).values())
+        finally:
+            sink.close()
+    if kind == 'jsonl':
+        # Later lines are newer runs: merge them in order, like the sinks do
+        from sinks import merge_fields
+        docs = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record.get('city', city_id) != city_id:
+                    continue
+                merge_fields(docs.setdefault(record['doc_id'], {}), record)
+        return list(docs.values())
+    raise ValueError(f"Unknown source '{source}' (use firestore, sqlite:<path> or jsonl:<path>)")
+
+
+class QueryService:
+    """Holds the current index and swaps in a rebuilt one when the source changes"""
+
+    def __init__(self, source, city_id=None, reload_interval=5.0, firestore_reload_interval=300.0):
+        self.source = source
+        self.city_id = city_id
+        self.reload_interval = reload_interval
+        self.firestore_reload_interval = firestore_reload_interval
+        self.index = None
+        self.tiles = None
+        self._tiles_version = None
+        self._stop = threading.Event()
+        self.reload()
+
+    def reload(self):
+        version = source_version(self.source)
+        self.index = NeighborhoodIndex(load_records(self.source, self.city_id), version)
+        print(f"📚 Indexed {len(self.index.records)} neighborhoods ({len(self.index.values)} fields)")
+        self.reload_tiles()
+
+    def reload_tiles(self):
+        """Swap in the city's crime tiles when the crime stage has rebuilt them"""
+        from city_registry import get_city
+        from crime_tiles import CrimeTiles, tiles_path
+        from utils.checkpoints import file_signature
+
+        path = tiles_path(get_city(self.city_id)['id'])
+        version = file_signature(path)
+        if version != self._tiles_version:
+            self.tiles = CrimeTiles.load(path) if version else None
+            self._tiles_version = version
+
+    def watch(self):
+        """Poll the source and hot-swap the index when a new run lands"""
+        def loop():
+            while not self._stop.wait(self.reload_interval):
+                try:
+                    version = source_version(self.source)
+                    stale = (version is None
+                             and time.time() - self.index.loaded_at >= self.firestore_reload_interval)
+                    if stale or (version is not None and version != self.index.version):
+                        self.reload()
+                    else:
+                        self.reload_tiles()
+                except Exception as e:
+                    print(f"⚠️  Reload failed, keeping current index: {e}")
+        threading.Thread(target=loop, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def parse_query(params):
+    """Split query-string pairs into (filters, sort, descending, limit, offset)"""
+    filters = []
+    sort, descending, limit, offset = None, False, 20, 0
+    for key, value in params:
+        if key == 'sort':
+            descending = value.startswith('-')
+            sort = value.lstrip('-')
+        elif key == 'limit':
+            limit = max(0, min(MAX_LIMIT, int(value)))
+        elif key == 'offset':
+            offset = max(0, int(value))
+        else:
+            field, _, op = key.rpartition('__')
+            if not field:
+                field, op = key, 'eq'
+            filters.append((field, op, float(value)))
+    return filters, sort, descending, limit, offset
+
+
+def make_server(service, host='0.0.0.0', port=8081):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive for clients issuing many queries
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            index = service.index  # one consistent snapshot per request
+            try:
+                if parts.path == '/healthz':
+                    return self._send(200, {'status': 'ok', 'records': len(index.records)})
+                if parts.path == '/fields':
+                    return self._send(200, {'fields': index.fields()})
+                if parts.path == '/neighborhoods':
+                    filters, sort, descending, limit, offset = parse_query(parse_qsl(parts.query))
+                    records, has_more = index.query(filters, sort, descending, limit, offset)
+                    payload = {'results': records, 'offset': offset, 'limit': limit}
+                    if has_more:
+                        payload['next_offset'] = offset + limit
+                    return self._send(200, payload)
+                if parts.path == '/rank':
+                    params = dict(parse_qsl(parts.query))
+                    k = max(0, min(MAX_LIMIT, int(params.pop('k', 10))))
+                    weights = {name: float(w) for name, w in params.items()}
+                    ranked = index.ranking.top_k(weights, k)
+                    return self._send(200, {'results': [dict(r, vibe_score=score) for r, score in ranked]})
+                if parts.path == '/similar' or parts.path.startswith('/similar/'):
+                    params = dict(parse_qsl(parts.query))
+                    k = max(0, min(MAX_LIMIT, int(params.pop('k', 5))))
+                    metric = params.pop('metric', 'cosine')
+                    if parts.path == '/similar':
+                        sim = index.similarity
+                        vector = sim.vector({name: float(v) for name, v in params.items()})
+                        similar = sim.query(vector, k, metric)
+                    else:
+                        name = unquote(parts.path[len('/similar/'):])
+                        if name not in index.by_name:
+                            return self._send(404, {'error': 'not found'})
+                        similar = index.similarity.similar_to(name, k, metric)
+                    return self._send(200, {'results': [
+                        {'neighborhood': r['neighborhood'], 'score': round(score, 4)} for r, score in similar
+                    ]})
+                if parts.path == '/safety' or parts.path.startswith('/safety/'):
+                    tiles = service.tiles
+                    if tiles is None:
+                        return self._send(404, {'error': 'no crime tiles for this city'})
+                    if parts.path == '/safety':
+                        params = dict(parse_qsl(parts.query))
+                        if 'lat' not in params or 'lon' not in params:
+                            raise ValueError("lat and lon are required")
+                        tile = tiles.lookup(float(params['lat']), float(params['lon']))
+                    else:
+                        tile = tiles.cell(parts.path[len('/safety/'):])
+                    if tile is None:
+                        return self._send(404, {'error': 'no incidents there'})
+                    return self._send(200, tile)
+                if parts.path.startswith('/neighborhoods/'):
+                    record = index.by_name.get(unquote(parts.path[len('/neighborhoods/'):]))
+                    if record is None:
+                        return self._send(404, {'error': 'not found'})
+                    return self._send(200, record)
+                return self._send(404, {'error': 'not found'})
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="vibeStreet neighborhood query service")
+    parser.add_argument('--source', default='sqlite:neighborhoods.db',
+                        help="firestore, sqlite:<path> or jsonl:<path>")
+    parser.add_argument('--city', help="City id (default: the default city)")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--reload-interval', type=float, default=5.0,
+                        help="Seconds between checks for a new local snapshot")
+    args = parser.parse_args(argv)
+
+    service = QueryService(args.source, args.city, args.reload_interval)
+    service.watch()
+    server = make_server(service, args.host, args.port)
+    print(f"🔎 Query service on http://{args.host}:{server.server_address[1]}/neighborhoods")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
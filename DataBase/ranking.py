@@ -0,0 +1,152 @@
+"""
+Weighted top-k "vibe" ranking
+
+Ranks neighborhoods by a user's weights over normalized attributes, e.g.
+    top_k({'safety': 0.4, 'happening': 0.3, 'rent': 0.3}, k=10)
+
+Each attribute is min-max normalized to [0, 1] across the indexed records
+(rent is inverted so cheaper scores higher) and kept as a list of record
+positions sorted by value. Large indexes are answered with the Threshold
+Algorithm: walk the sorted lists of the weighted attributes in parallel,
+score each newly seen record exactly, and stop once the k-th best score
+beats the best score any unseen record could still have. Small indexes
+use a NumPy matrix-vector product instead. Both give exact results.
+"""
+import numpy as np
+
+# attribute -> (document field, lower is better)
+ATTRIBUTES = {
+    'safety': ('safety', False),
+    'happening': ('happening', False),
+    'rent': ('property_rates', True),
+    'density': ('population_density', False),
+    'bars': ('bars.density', False),
+    'restaurants': ('restaurants.density', False),
+    'cafes': ('cafes.density', False),
+    'bars_rating': ('bars.avg_rating', False),
+    'restaurants_rating': ('restaurants.avg_rating', False),
+    'cafes_rating': ('cafes.avg_rating', False),
+}
+
+# Below this many records a full matrix-vector product beats list walking
+MATVEC_THRESHOLD = 20000
+
+def field_value(record, field):
+    value = record
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def _top(positions, scores, k):
+    """The k best (positions, scores), best first; ties break by lower position"""
+    if len(scores) > k:
+        # Everything tied with the k-th score stays a candidate
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        keep = scores >= kth
+        positions, scores = positions[keep], scores[keep]
+    order = np.lexsort((positions, -scores))[:k]
+    return positions[order], scores[order]
+
+
+class RankingIndex:
+    """Normalized attribute matrix plus per-attribute sorted lists"""
+
+    def __init__(self, records, attributes=None):
+        self.records = list(records)
+        self.attributes = attributes or ATTRIBUTES
+        self.names = list(self.attributes)
+        n = len(self.records)
+
+        matrix = np.zeros((n, len(self.names)))
+        for j, name in enumerate(self.names):
+            field, lower_is_better = self.attributes[name]
+            column = np.array([field_value(r, field) for r in self.records], dtype=float)
+            missing = np.isnan(column)
+            if missing.all():
+                continue
+            # Missing values sit at the column mean, like the stage defaults do
+            column[missing] = np.nanmean(column)
+            lo, hi = column.min(), column.max()
+            column = (column - lo) / (hi - lo) if hi > lo else np.full(n, 0.5)
+            matrix[:, j] = 1.0 - column if lower_is_better else column
+
+        self.matrix = matrix
+        order = np.argsort(-matrix, axis=0, kind='stable')
+        self.sorted_positions = {name: order[:, j] for j, name in enumerate(self.names)}
+        self.sorted_values = {name: matrix[order[:, j], j] for j, name in enumerate(self.names)}
+
+    def _weight_vector(self, weights):
+        unknown = set(weights) - set(self.names)
+        if unknown:
+            raise ValueError(f"Unknown attributes: {', '.join(sorted(unknown))} "
+                             f"(choose from {', '.join(self.names)})")
+        return [(self.names.index(name), name, float(w)) for name, w in weights.items() if w]
+
+    def rank_matvec(self, weights, k=10):
+        """Exact top-k by scoring every record: [(position, score)]"""
+        active = self._weight_vector(weights)
+        n = len(self.records)
+        k = min(k, n)
+        if k <= 0:
+            return []
+        w = np.zeros(len(self.names))
+        for j, _, weight in active:
+            w[j] = weight
+        scores = self.matrix @ w
+        top, top_scores = _top(np.arange(n), scores, k)
+        return [(int(p), float(sc)) for p, sc in zip(top, top_scores)]
+
+    def rank_threshold(self, weights, k=10):
+        """
+        Exact top-k with the Threshold Algorithm, walking the sorted lists in
+        blocks so each block of newly seen records is scored in one product
+        Returns ([(position, score)], records scored)
+        """
+        active = self._weight_vector(weights)
+        n = len(self.records)
+        k = min(k, n)
+        if k <= 0:
+            return [], 0
+        if not active:
+            return [(pos, 0.0) for pos in range(k)], 0
+
+        w = np.zeros(len(self.names))
+        for j, _, weight in active:
+            w[j] = weight
+        # Negative weights walk their list from the bottom
+        walks = [(self.sorted_positions[name], self.sorted_values[name], weight)
+                 if weight > 0 else
+                 (self.sorted_positions[name][::-1], self.sorted_values[name][::-1], weight)
+                 for _, name, weight in active]
+
+        seen = np.zeros(n, dtype=bool)
+        best_pos = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0)
+        depth, block = 0, max(2 * k, 64)
+        while depth < n:
+            stop = min(n, depth + block)
+            new = np.unique(np.concatenate([positions[depth:stop] for positions, _, _ in walks]))
+            new = new[~seen[new]]
+            seen[new] = True
+            best_pos = np.concatenate([best_pos, new])
+            best_scores = np.concatenate([best_scores, self.matrix[new] @ w])
+            best_pos, best_scores = _top(best_pos, best_scores, k)
+
+            # Best score any record below this depth in every list could have
+            threshold = sum(weight * values[stop - 1] for _, values, weight in walks)
+            if len(best_pos) == k and best_scores[-1] > threshold:
+                break
+            depth, block = stop, block * 2
+
+        return [(int(p), float(sc)) for p, sc in zip(best_pos, best_scores)], int(seen.sum())
+
+    def top_k(self, weights, k=10):
+        """[(record, score)] best first, picking the cheaper exact method for the index size"""
+        if len(self.records) <= MATVEC_THRESHOLD:
+            ranked = self.rank_matvec(weights, k)
+        else:
+            ranked, _ = self.rank_threshold(weights, k)
+        return [(self.records[pos], round(score, 6)) for pos, score in ranked]
@@ -0,0 +1,173 @@
+"""
+"Neighborhoods like X" similarity search
+
+Builds a standardized feature matrix (z-scores, missing values at the
+column mean) from the combined documents main.py assembles, then:
+  - precomputes each neighborhood's k nearest neighbors at pipeline time,
+    stored in the document as `similar`
+  - answers ad-hoc queries (a neighborhood name or raw feature values)
+    with one vectorized cosine or Euclidean search
+
+The precompute works in row blocks, so memory stays at block x n instead
+of n x n and tens of thousands of neighborhoods fit comfortably.
+"""
+import numpy as np
+
+FEATURES = (
+    'safety',
+    'happening',
+    'property_rates',
+    'population_density',
+    'age_demographic',
+    'bars.avg_rating', 'bars.avg_price', 'bars.density',
+    'restaurants.avg_rating', 'restaurants.avg_price', 'restaurants.density',
+    'cafes.avg_rating', 'cafes.avg_price', 'cafes.density',
+)
+METRICS = ('cosine', 'euclidean')
+SIMILAR_NEIGHBORS = 5
+BLOCK_SIZE = 1024
+PRUNE_CHUNKS = 256
+
+def _value(record, field):
+    value = record
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return np.nan
+        value = value.get(part)
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+
+def feature_matrix(records, features=FEATURES):
+    """Returns (standardized float32 matrix, column means, column stds)"""
+    raw = np.array([[_value(r, f) for f in features] for r in records], dtype=float)
+    raw = raw.reshape(len(records), len(features))
+    present = ~np.isnan(raw)
+    mean = np.where(present, raw, 0).sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+    raw = np.where(present, raw, mean)
+    std = raw.std(axis=0) if len(raw) else np.ones(len(features))
+    std[std == 0] = 1.0
+    return ((raw - mean) / std).astype(np.float32), mean, std
+
+
+def _prepare(matrix, metric):
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+    if metric == 'cosine':
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+    return matrix
+
+
+def _search(queries, base, base_sq, metric, k, exclude=None):
+    """
+    Top-k rows of base for each query row: (indices, scores), best first
+    Cosine scores are similarities (higher is closer), Euclidean scores distances
+    """
+    dots = queries @ base.T
+    if metric == 'cosine':
+        scores = dots
+    else:
+        # Rank by negated squared distance; the square root is only taken for the k kept
+        q_sq = np.einsum('ij,ij->i', queries, queries)
+        scores = dots
+        scores *= 2
+        scores -= q_sq[:, None]
+        scores -= base_sq[None, :]
+    if exclude is not None:
+        scores[np.arange(len(exclude)), exclude] = -np.inf
+    k = min(k, base.shape[0] - (exclude is not None))
+    if k <= 0:
+        return np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0))
+    top, top_scores = _top_k_rows(scores, k)
+    if metric == 'euclidean':
+        top_scores = np.sqrt(np.maximum(-top_scores, 0))
+    return top, top_scores
+
+
+def _top_k_rows(scores, k):
+    """Per-row k largest (columns, values), best first, ties by lower column"""
+    rows, n = scores.shape
+    chunks = max(k, min(PRUNE_CHUNKS, n // 8))
+    if n < 4 * chunks:
+        top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return top, np.take_along_axis(scores, top, axis=1)
+
+    # The k-th largest chunk maximum is a lower bound on the k-th largest
+    # score, so only scores at or above it need sorting (a full partition of
+    # the block is several times slower)
+    chunk_max = np.maximum.reduceat(scores, np.linspace(0, n, chunks, endpoint=False).astype(np.int64), axis=1)
+    bound = np.partition(chunk_max, chunks - k, axis=1)[:, chunks - k]
+    row, col = np.nonzero(scores >= bound[:, None])
+    values = scores[row, col]
+    order = np.lexsort((col, -values, row))
+    row, col, values = row[order], col[order], values[order]
+    rank = np.arange(len(row)) - np.searchsorted(row, row)
+    keep = rank < k
+    return col[keep].reshape(rows, k), values[keep].reshape(rows, k)
+
+
+def nearest_neighbors(matrix, k=SIMILAR_NEIGHBORS, metric='cosine', block_size=BLOCK_SIZE):
+    """k nearest other rows for every row, computed block by block"""
+    base = _prepare(matrix, metric)
+    base_sq = np.einsum('ij,ij->i', base, base)
+    n = base.shape[0]
+    indices = np.empty((n, max(0, min(k, n - 1))), dtype=np.int64)
+    scores = np.empty(indices.shape, dtype=np.float32)
+    for start in range(0, n, block_size):
+        rows = np.arange(start, min(n, start + block_size))
+        indices[rows], scores[rows] = _search(base[rows], base, base_sq, metric, k, exclude=rows)
+    return indices, scores
+
+
+class SimilarityIndex:
+    """Feature matrix over a set of records for ad-hoc similarity queries"""
+
+    def __init__(self, records, features=FEATURES):
+        self.records = list(records)
+        self.features = features
+        self.matrix, self.mean, self.std = feature_matrix(self.records, features)
+        self.by_name = {r.get('neighborhood'): i for i, r in enumerate(self.records)}
+        self._prepared = {}
+
+    def _base(self, metric):
+        if metric not in self._prepared:
+            base = _prepare(self.matrix, metric)
+            self._prepared[metric] = (base, np.einsum('ij,ij->i', base, base))
+        return self._prepared[metric]
+
+    def vector(self, values):
+        """Standardize raw feature values; unspecified features sit at the mean"""
+        unknown = set(values) - set(self.features)
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(sorted(unknown))}")
+        raw = np.array([values.get(f, self.mean[i]) for i, f in enumerate(self.features)], dtype=float)
+        return ((raw - self.mean) / self.std).astype(np.float32)
+
+    def query(self, vector, k=SIMILAR_NEIGHBORS, metric='cosine', exclude=None):
+        """[(record, score)] nearest to a standardized vector, best first"""
+        base, base_sq = self._base(metric)
+        query = _prepare(vector.reshape(1, -1), metric)
+        top, scores = _search(query, base, base_sq, metric, k,
+                              exclude=None if exclude is None else np.array([exclude]))
+        return [(self.records[i], float(s)) for i, s in zip(top[0], scores[0])]
+
+    def similar_to(self, neighborhood, k=SIMILAR_NEIGHBORS, metric='cosine'):
+        if neighborhood not in self.by_name:
+            raise KeyError(neighborhood)
+        pos = self.by_name[neighborhood]
+        return self.query(self.matrix[pos], k, metric, exclude=pos)
+
+
+def attach_similar(docs, k=SIMILAR_NEIGHBORS, metric='cosine'):
+    """Store each document's k most similar neighborhoods under 'similar'"""
+    if len(docs) < 2:
+        return docs
+    matrix, _, _ = feature_matrix(docs)
+    indices, scores = nearest_neighbors(matrix, k, metric)
+    for doc, row, row_scores in zip(docs, indices, scores):
+        doc['similar'] = [
+            {'neighborhood': docs[j]['neighborhood'], 'score': round(float(s), 4)}
+            for j, s in zip(row, row_scores)
+        ]
+    return docs
@@ -0,0 +1,227 @@
+"""
+Output sinks for combined neighborhood records
+
+main.py and the refresh daemon write through a sink, so a run can target
+Firestore or stay entirely local:
+
+    firestore  firebase_client.save_neighborhoods (merge=True), in the
+               FIRESTORE_LAYOUT document layout
+    sqlite     bulk upsert of the whole run in one transaction, with indexed
+               safety / happening / property_rates columns for local queries
+    jsonl      one JSON record appended per neighborhood
+    stdout     jsonl to stdout (a dry run)
+
+Every sink takes records as (neighborhood, data, city_id) and merges data
+into what is already stored, like Firestore's merge=True. Only the
+Firestore sink loads the Firebase SDK, and only when it is created.
+"""
+import json
+import sqlite3
+import sys
+import time
+from firebase_client import merge_fields, sanitize_document_id
+
+SINK_NAMES = ('firestore', 'sqlite', 'jsonl', 'stdout')
+
+# Top-level numeric fields mirrored into indexed SQLite columns
+INDEXED_FIELDS = ('safety', 'happening', 'property_rates')
+
+
+class Sink:
+    """Base sink: subclasses implement write_many"""
+
+    def write(self, neighborhood, data, city_id=None):
+        self.write_many([(neighborhood, data, city_id)])
+
+    def write_many(self, records):
+        raise NotImplementedError
+
+    def get_all_neighborhoods(self, city_id=None):
+        """{doc_id: stored document}, or None when the sink can't read back (jsonl, stdout)"""
+        return None
+
+    def close(self):
+        pass
+
+
+class FirestoreSink(Sink):
+    """
+    Writes records with save_neighborhoods (merge=True); remembers the cold
+    documents it wrote so a long-lived sink (the daemon) skips unchanged ones
+    """
+
+    def __init__(self, db=None, layout=None):
+        if db is None:
+            from firebase_client import initialize_firebase
+            print("🔥 Connecting to Firebase...")
+            db = initialize_firebase()
+        self.db = db
+        self.layout = layout
+        self.cold_written = {}
+
+    def write_many(self, records):
+        from firebase_client import save_neighborhoods
+        save_neighborhoods(self.db, records, self.layout, self.cold_written)
+
+    def get_all_neighborhoods(self, city_id=None):
+        from firebase_client import get_all_neighborhoods
+        return get_all_neighborhoods(self.db, city_id, self.layout)
+
+
+class JsonlSink(Sink):
+    """Appends one JSON record per line; path '-' writes to stdout"""
+
+    def __init__(self, path='-'):
+        self.path = path
+        self._file = sys.stdout if path == '-' else open(path, 'a', encoding='utf-8')
+
+    def write_many(self, records):
+        lines = []
+        for neighborhood, data, city_id in records:
+            record = dict(data, neighborhood=neighborhood, doc_id=sanitize_document_id(neighborhood))
+            if city_id:
+                record['city'] = city_id
+            lines.append(json.dumps(record) + '\n')
+        # One write per batch keeps concurrent appenders from interleaving lines
+        self._file.write(''.join(lines))
+        self._file.flush()
+
+    def close(self):
+        if self._file is not sys.stdout:
+            self._file.close()
+
+
+class SQLiteSink(Sink):
+    """
+    Local store: one row per (city, doc_id) holding the merged document as
+    JSON, plus indexed columns for the fields clients filter and sort on
+    """
+
+    SCHEMA = f"""
+        CREATE TABLE IF NOT EXISTS neighborhoods (
+            city TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            neighborhood TEXT NOT NULL,
+            {', '.join(f'{field} REAL' for field in INDEXED_FIELDS)},
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (city, doc_id)
+        );
+        {' '.join(f'CREATE INDEX IF NOT EXISTS idx_neighborhoods_{field} ON neighborhoods (city, {field});' for field in INDEXED_FIELDS)}
+    """
+
+    def __init__(self, path='neighborhoods.db'):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(self.SCHEMA)
+
+    def write_many(self, records):
+        from city_registry import DEFAULT_CITY
+
+        now = time.time()
+        rows = {}
+        for neighborhood, data, city_id in records:
+            city = city_id or DEFAULT_CITY
+            doc_id = sanitize_document_id(neighborhood)
+            doc = rows.setdefault((city, doc_id), {})
+            merge_fields(doc, dict(data, neighborhood=neighborhood, doc_id=doc_id, city=city))
+
+        with self.conn:  # one transaction for the whole batch
+            existing = {}
+            for city in {city for city, _ in rows}:
+                doc_ids = [doc_id for c, doc_id in rows if c == city]
+                for start in range(0, len(doc_ids), 500):
+                    chunk = doc_ids[start:start + 500]
+                    cursor = self.conn.execute(
+                        f"SELECT doc_id, data FROM neighborhoods WHERE city = ? "
+                        f"AND doc_id IN ({', '.join('?' * len(chunk))})",
+                        [city] + chunk,
+                    )
+                    for row in cursor:
+                        existing[(city, row['doc_id'])] = json.loads(row['data'])
+
+            params = []
+            for key, doc in rows.items():
+                merged = merge_fields(existing.get(key, {}), doc)
+                params.append(
+                    (key[0], key[1], merged['neighborhood'])
+                    + tuple(_as_float(merged.get(field)) for field in INDEXED_FIELDS)
+                    + (json.dumps(merged), now)
+                )
+
+            columns = ('city', 'doc_id', 'neighborhood') + INDEXED_FIELDS + ('data', 'updated_at')
+            self.conn.executemany(
+                f"INSERT INTO neighborhoods ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT (city, doc_id) DO UPDATE SET "
+                + ', '.join(f"{col} = excluded.{col}" for col in columns[2:]),
+                params,
+            )
+        print(f"✅ Upserted {len(params)} neighborhoods into {self.path}")
+
+    # Local readers mirroring firebase_client -----------------------------
+
+    def get_all_neighborhoods(self, city_id=None):
+        from city_registry import DEFAULT_CITY
+
+        cursor = self.conn.execute(
+            "SELECT doc_id, data FROM neighborhoods WHERE city = ?", (city_id or DEFAULT_CITY,)
+        )
+        return {row['doc_id']: json.loads(row['data']) for row in cursor}
+
+    def get_neighborhood_by_name(self, neighborhood, city_id=None):
+        from city_registry import DEFAULT_CITY
+
+        row = self.conn.execute(
+            "SELECT data FROM neighborhoods WHERE city = ? AND doc_id = ?",
+            (city_id or DEFAULT_CITY, sanitize_document_id(neighborhood)),
+        ).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def query(self, city_id=None, min_safety=None, min_happening=None, max_property_rates=None,
+              order_by='safety', descending=True, limit=None, offset=0):
+        """
+        Indexed range query over the local store
+        e.g. query(min_safety=70, max_property_rates=3200, order_by='happening')
+        """
+        from city_registry import DEFAULT_CITY
+
+        if order_by not in INDEXED_FIELDS:
+            raise ValueError(f"order_by must be one of {', '.join(INDEXED_FIELDS)}")
+        clauses, params = ['city = ?'], [city_id or DEFAULT_CITY]
+        for column, op, value in (
+            ('safety', '>=', min_safety),
+            ('happening', '>=', min_happening),
+            ('property_rates', '<=', max_property_rates),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        sql = (f"SELECT data FROM neighborhoods WHERE {' AND '.join(clauses)} "
+               f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}")
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit, offset]
+        return [json.loads(row['data']) for row in self.conn.execute(sql, params)]
+
+    def close(self):
+        self.conn.close()
+
+
+def _as_float(value):
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def get_sink(name, path=None, db=None):
+    """Build a sink by name: firestore, sqlite, jsonl or stdout (a dry run)"""
+    if name == 'firestore':
+        return FirestoreSink(db)
+    if name == 'sqlite':
+        return SQLiteSink(path or 'neighborhoods.db')
+    if name == 'jsonl':
+        return JsonlSink(path or 'neighborhoods.jsonl')
+    if name == 'stdout':
+        return JsonlSink('-')
+    raise ValueError(f"Unknown sink '{name}' (choose from {', '.join(SINK_NAMES)})")
@@ -0,0 +1,70 @@
+import io
+import pytest
+import backfill
+from city_registry import DEFAULT_CRIME_FIELDS
+from utils import http_client
+
+FIELDS = DEFAULT_CRIME_FIELDS
+CITY = {'id': 'testcity', 'crime': {'url': 'http://feed.example/resource/x.json', 'fields': FIELDS}}
+
+
+class Response:
+    def __init__(self, text):
+        self.status_code = 200
+        self.raw = io.BytesIO(text.encode('utf-8'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def serve(monkeypatch, rows):
+    """A CSV export honoring $offset/$limit; rows are lists of cells"""
+    requests_made = []
+    header = ','.join([FIELDS['neighborhood'], FIELDS['category'], FIELDS['subcategory']])
+
+    def get(url, params=None, **kwargs):
+        requests_made.append(dict(params))
+        page = rows[params['$offset']:params['$offset'] + params['$limit']]
+        return Response('\n'.join([header] + [','.join(row) for row in page]) + '\n')
+
+    monkeypatch.setattr(http_client, 'get', get)
+    return requests_made
+
+
+def test_pages_by_rows_served_not_rows_kept(monkeypatch):
+    rows = [['Mission', 'Assault', 'Battery']] * 3 + [['Mission']] + [['SoMa', 'Robbery', 'Street']] * 5
+    made = serve(monkeypatch, rows)
+    table, kept = backfill.fetch_partition(CITY, backfill.date(2024, 1, 1), backfill.date(2024, 2, 1), page_size=4)
+    assert kept == 8
+    assert [params['$offset'] for params in made] == [0, 4, 8]
+    assert table.counts == {('Mission', 'Assault', 'Battery'): 3, ('SoMa', 'Robbery', 'Street'): 5}
+
+
+def test_exact_multiple_of_the_page_size_ends_on_an_empty_page(monkeypatch):
+    made = serve(monkeypatch, [['Mission', 'Assault', 'Battery']] * 8)
+    _, kept = backfill.fetch_partition(CITY, backfill.date(2024, 1, 1), backfill.date(2024, 2, 1), page_size=4)
+    assert kept == 8 and len(made) == 3
+
+
+def test_month_range_is_inclusive_and_crosses_years():
+    assert backfill.month_range('2023-11', '2024-02') == ['2023-11', '2023-12', '2024-01', '2024-02']
+    assert backfill.month_range('2024-05', '2024-01') == []
+
+
+def test_month_range_rejects_months_outside_1_to_12():
+    for since in ('2018-13', '2018-00'):
+        with pytest.raises(ValueError):
+            backfill.month_range(since, '2019-01')
+
+
+@pytest.mark.parametrize('argv', [['--since', '2024-05', '--until', '2024-01'], ['--since', '2024'],
+                                  ['--since', '2018-13', '--until', '2019-01'],
+                                  ['--since', '2018-00', '--until', '2019-01']])
+def test_bad_ranges_are_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        backfill.main(argv)
+    assert exit_info.value.code == 2
+    assert '--since' in capsys.readouterr().err
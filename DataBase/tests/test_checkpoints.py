@@ -0,0 +1,38 @@
+import contextlib
+import io
+import main
+from utils import checkpoints
+
+CITY = {'id': 'testcity', 'neighborhoods': ['Mission', 'Castro']}
+
+
+def run(stage, func):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return main._run_stage(stage, func, CITY, use_checkpoints=True)
+
+
+def test_fresh_output_is_checkpointed_and_reused(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, 'CHECKPOINT_DIR', str(tmp_path))
+    calls = []
+
+    def stage(neighborhoods, city):
+        calls.append(city['id'])
+        return {hood: 50.0 for hood in neighborhoods}
+
+    assert run('crime', stage) == {'Mission': 50.0, 'Castro': 50.0}
+    assert run('crime', stage) == {'Mission': 50.0, 'Castro': 50.0}
+    assert calls == ['testcity']
+
+
+def test_degraded_output_is_returned_but_not_checkpointed(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, 'CHECKPOINT_DIR', str(tmp_path))
+    calls = []
+
+    def stage(neighborhoods, city):
+        calls.append(city['id'])
+        return checkpoints.Degraded(dict.fromkeys(neighborhoods))
+
+    assert run('happening', stage) == {'Mission': None, 'Castro': None}
+    assert run('happening', stage) == {'Mission': None, 'Castro': None}
+    assert calls == ['testcity', 'testcity']
+    assert not (tmp_path / 'testcity' / 'happening').exists()
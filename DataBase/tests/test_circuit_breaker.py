@@ -0,0 +1,154 @@
+import pytest
+import requests
+import config
+from pipelines import yelp_pipeline
+from utils import checkpoints, http_client, quota
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.rate_limit import HostRateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_opens_after_threshold_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=10, clock=clock)
+    breaker.record(False)
+    breaker.record(False)
+    breaker.record(True)             # a success resets the count
+    breaker.record(False)
+    breaker.record(False)
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record(False)
+    assert breaker.state == 'open' and breaker.is_open
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through_after_cooldown(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=10, clock=clock)
+    breaker.record(False)
+    clock.now = 9.9
+    assert not breaker.allow()
+    clock.now = 10
+    assert not breaker.is_open
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()       # only one probe at a time
+
+
+def test_probe_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker(failures=3, cooldown=10, clock=clock)
+    for _ in range(3):
+        breaker.record(False)
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record(False)            # one failed probe re-opens, regardless of threshold
+    assert breaker.state == 'open' and not breaker.allow()
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == 'closed' and breaker.failures == 0 and breaker.allow()
+
+
+def test_cancel_returns_an_unsent_probe(clock):
+    breaker = CircuitBreaker(failures=1, cooldown=10, clock=clock)
+    breaker.record(False)
+    clock.now = 10
+    assert breaker.allow()
+    breaker.cancel()
+    assert breaker.state == 'open'
+    assert breaker.allow()           # the next caller probes straight away
+    breaker.cancel()
+    breaker.record(True)
+    breaker.cancel()                 # no-op once closed
+    assert breaker.state == 'closed'
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.content = b''
+        self.headers = {}
+
+    def json(self):
+        return {'businesses': [{'id': 'b1', 'price': '$$', 'rating': 4.0}]}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.sent = 0
+
+    def get(self, url, **kwargs):
+        self.sent += 1
+        status = self.statuses.pop(0)
+        if status is None:
+            raise requests.ConnectionError("refused")
+        return FakeResponse(status)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    def install(statuses):
+        fake = FakeSession(statuses)
+        monkeypatch.setattr(http_client, 'get_session', lambda: fake)
+        return fake
+    monkeypatch.setattr(config, 'BREAKER_FAILURES', 2)
+    monkeypatch.setattr(config, 'BREAKER_COOLDOWN', 60)
+    http_client.reset_breakers()
+    yield install
+    http_client.reset_breakers()
+
+
+def test_client_short_circuits_after_failures(session):
+    fake = session([500, None, 200])
+    url = 'http://feed.example/data.json'
+    assert http_client.get(url).status_code == 500
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(url)
+    assert http_client.circuit_open(url)
+    with pytest.raises(CircuitOpenError):
+        http_client.get(url)
+    assert fake.sent == 2
+    assert not http_client.circuit_open('http://other.example/')
+
+
+def test_client_4xx_other_than_429_counts_as_success(session):
+    session([404, 404, 429, 429])
+    url = 'http://feed.example/data.json'
+    for _ in range(2):
+        http_client.get(url)
+    assert not http_client.circuit_open(url)
+    for _ in range(2):
+        http_client.get(url)
+    assert http_client.circuit_open(url)
+
+
+def test_yelp_keeps_stored_values_for_hoods_the_open_circuit_skipped(session, tmp_path, monkeypatch):
+    monkeypatch.setattr(quota, 'QUOTA_DIR', str(tmp_path))
+    monkeypatch.setitem(config.API_DAILY_QUOTAS, 'yelp', 0)
+    monkeypatch.setattr(config, 'COVERAGE_PLANNER', False)
+    monkeypatch.setattr(config, 'HEDGE_REQUESTS', False)
+    monkeypatch.setattr(http_client, '_rate_limiter', HostRateLimiter({}))
+    fake = session([200, 500, 500])
+    hoods = ['A', 'B', 'C', 'D', 'E']
+    city = {'id': 'testcity', 'neighborhoods': hoods, 'default_coords': (37.77, -122.42),
+            'centroids': {hood: (37.7 + i / 100, -122.4) for i, hood in enumerate(hoods)}}
+
+    results = yelp_pipeline.process_yelp_category(hoods, 'bars', 'bars', city)
+    assert fake.sent == 3
+    fetched = {hood for hood, stats in results.items() if stats is not None}
+    assert len(fetched) == 1 and results[fetched.pop()]['count'] == 1
+    assert set(results) == set(hoods)              # failed and skipped hoods map to None
+    assert isinstance(results, checkpoints.Degraded)
@@ -0,0 +1,69 @@
+import pytest
+import daemon
+
+
+def test_stage_list_defaults_to_every_stage():
+    assert daemon.parse_args([]).stage_list == [stage for stage, _, _ in daemon.STAGES]
+    assert daemon.parse_args(['--stages', ' yelp, crime ']).stage_list == ['yelp', 'crime']
+
+
+@pytest.mark.parametrize('stages,message', [('crim', 'unknown stage'), (',', 'at least one stage')])
+def test_bad_stage_lists_are_usage_errors(stages, message, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        daemon.parse_args(['--stages', stages])
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+
+
+def test_daemon_needs_a_known_stage():
+    with pytest.raises(ValueError):
+        daemon.RefreshDaemon({'id': 'sf', 'name': 'San Francisco'}, ['nope'])
+
+
+class FlakySink:
+    """Fails the first `failures` writes, then records what it was given"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.written = []
+
+    def write_many(self, records):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("firestore unavailable")
+        self.written.append(records)
+
+    def get_all_neighborhoods(self, city_id=None):
+        return None
+
+
+def test_failed_write_is_reported_and_retried_with_the_fetched_outputs(monkeypatch):
+    from city_registry import get_city
+
+    city = get_city('sf')
+    calls = []
+    monkeypatch.setattr(daemon, 'run_stage', lambda stage, func, city, refresh: calls.append(stage) or
+                        {hood: 50.0 for hood in city['neighborhoods']})
+    sink = FlakySink(failures=1)
+    refresher = daemon.RefreshDaemon(city, ['crime'], sink=sink)
+
+    refresher.refresh({'crime'})                   # fetch succeeds, the write fails
+    status = refresher.status()
+    assert status['write']['consecutive_failures'] == 1 and status['write']['unwritten'] == ['crime']
+    assert 'ConnectionError' in status['write']['last_error'] and not sink.written
+
+    refresher.refresh(set())                       # the retry writes what was fetched, no refetch
+    assert calls == ['crime'] and len(sink.written) == 1
+    status = refresher.status()
+    assert status['write']['unwritten'] == [] and status['write']['consecutive_failures'] == 0
+
+
+def test_repeated_write_failures_turn_unhealthy(monkeypatch):
+    from city_registry import get_city
+
+    monkeypatch.setattr(daemon, 'run_stage', lambda stage, func, city, refresh: {})
+    refresher = daemon.RefreshDaemon(get_city('sf'), ['crime'], sink=FlakySink(failures=99))
+    for _ in range(daemon.MAX_CONSECUTIVE_FAILURES):
+        assert refresher.healthy()
+        refresher.refresh({'crime'})
+    assert not refresher.healthy()
@@ -0,0 +1,28 @@
+import pytest
+from history import HistoryStore
+from utils.normalizers import numeric_fields
+
+JAN, FEB = 1767225600.0, 1769904000.0   # 2026-01-01 and 2026-02-01 UTC
+
+
+def test_numeric_fields_flattens_one_level_and_skips_booleans():
+    record = {'safety': 71, 'name': 'Mission', 'flag': True, 'bars': {'density': 12.5, 'deep': {'x': 1}}}
+    assert dict(numeric_fields(record)) == {'safety': 71.0, 'bars.density': 12.5}
+
+
+def test_snapshot_and_deltas_between_runs(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append([('Mission', {'safety': 60.0}, 'sf'), ('SoMa', {'safety': 40.0}, 'sf')], run_at=JAN)
+    store.append([('Mission', {'safety': 65.0}, 'sf'), ('SoMa', {'happening': 90.0}, 'sf')], run_at=FEB)
+
+    assert store.snapshot('safety', JAN, 'sf') == {'Mission': 60.0, 'SoMa': 40.0}
+    assert store.snapshot('safety', FEB, 'sf') == {'Mission': 65.0}
+    assert store.deltas('safety', 'sf') == {'Mission': (60.0, 65.0, 5.0)}
+    assert store.snapshot('rent', JAN, 'sf') == {}
+
+
+def test_snapshot_of_a_month_without_runs_names_it(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.append([('Mission', {'safety': 60.0}, 'sf')], run_at=JAN)
+    with pytest.raises(ValueError, match='2026-02'):
+        store.snapshot('safety', FEB, 'sf')
@@ -0,0 +1,133 @@
+import math
+import random
+import query_planner
+from query_planner import CoveragePlan, assign, load_plan, sweep
+
+CENTROIDS = {
+    'Mission': (37.7599, -122.4148),
+    'SoMa': (37.7785, -122.4056),
+    'Sunset': (37.7535, -122.4944),
+    'Marina': (37.8037, -122.4368),
+}
+FOOTPRINT_KM = 1.0
+
+
+def km_between(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def venues(per_hood, seed=0, spread_km=1.5):
+    """Venues scattered around each centroid, some outside every footprint"""
+    rng = random.Random(seed)
+    out = []
+    for name, (lat, lon) in CENTROIDS.items():
+        for n in range(per_hood):
+            dist, angle = spread_km * math.sqrt(rng.random()), rng.uniform(0, 2 * math.pi)
+            out.append({'id': f"{name}-{n}",
+                        'lat': lat + dist * math.sin(angle) / 111.32,
+                        'lon': lon + dist * math.cos(angle) / (111.32 * math.cos(math.radians(lat)))})
+    return out
+
+
+class Search:
+    """Radius search over a fixed venue world returning at most cap results"""
+
+    def __init__(self, world, cap, fail=()):
+        self.world = world
+        self.cap = cap
+        self.fail = set(fail)
+        self.radii = []
+
+    def __call__(self, lat, lon, radius_m):
+        self.radii.append(radius_m)
+        if len(self.radii) in self.fail:
+            return None
+        inside = [v for v in self.world if km_between((lat, lon), (v['lat'], v['lon'])) * 1000 <= radius_m]
+        return inside[:self.cap], len(inside) <= self.cap
+
+
+def in_footprint(venue):
+    return any(km_between(c, (venue['lat'], venue['lon'])) <= FOOTPRINT_KM for c in CENTROIDS.values())
+
+
+def plan(cap=50, max_radius_m=4000, path=None):
+    return CoveragePlan(CENTROIDS, cap, max_radius_m, footprint_km=FOOTPRINT_KM, path=path)
+
+
+def test_sweep_finds_every_venue_inside_a_footprint():
+    world = venues(120)
+    coverage = plan()
+    search = Search(world, coverage.cap)
+    found, stats = sweep(coverage, search, key=lambda v: v['id'])
+
+    assert stats['complete'] and stats['split'] > 0
+    assert {v['id'] for v in world if in_footprint(v)} <= set(found)
+    assert max(search.radii) <= coverage.max_radius_m
+    assert all(coverage.touches_footprint(cell) for cell in coverage.leaves)
+
+
+def test_saved_plan_is_reused_and_steady_state_needs_no_splits(tmp_path):
+    world = venues(120)
+    path = str(tmp_path / 'plan.json')
+    first = plan(path=path)
+    found, _ = sweep(first, Search(world, first.cap), key=lambda v: v['id'])
+    first.save()
+
+    again = plan(path=path).load()
+    assert again.cells() == first.cells()
+    search = Search(world, again.cap)
+    found_again, stats = sweep(again, search, key=lambda v: v['id'])
+    assert stats['split'] == 0 and stats['searches'] == len(first.leaves)
+    inside = {v['id'] for v in world if in_footprint(v)}
+    assert set(found_again) & inside == set(found) & inside == inside
+
+    # Different inputs start a separate plan
+    assert plan(cap=20, path=path).load().cells() == [(0, 0, 0)]
+
+
+def test_sparse_leaves_merge_back_unless_ever_saturated():
+    dense = plan()
+    sweep(dense, Search(venues(120), dense.cap), key=lambda v: v['id'])
+    cells = len(dense.leaves)
+    _, stats = sweep(dense, Search(venues(2), dense.cap), key=lambda v: v['id'])
+    assert stats['merged'] == 0 and len(dense.leaves) == cells  # every split parent had saturated
+
+    sparse = plan()
+    kids = sparse.children((1, 0, 0))
+    sparse.leaves = {kid: 1 for kid in kids}
+    assert sparse.coarsen() == 1 and sparse.leaves == {(1, 0, 0): len(kids)}
+
+    sparse.leaves = {kid: sparse.cap for kid in kids}  # busy siblings stay split
+    assert sparse.coarsen() == 0
+
+
+def test_failed_search_keeps_previous_leaves_and_stop_gives_up():
+    coverage = plan()
+    sweep(coverage, Search(venues(120), coverage.cap), key=lambda v: v['id'])
+    before = dict(coverage.leaves)
+
+    search = Search(venues(120), coverage.cap, fail={1})
+    _, stats = sweep(coverage, search, key=lambda v: v['id'], stop=lambda: True)
+    assert stats['failed'] == 1 and not stats['complete'] and stats['searches'] == 1
+    assert coverage.leaves == before  # nothing learned, nothing forgotten
+
+
+def test_assign_uses_nearest_centroid_within_the_footprint():
+    coverage = plan()
+    mission, sunset = CENTROIDS['Mission'], CENTROIDS['Sunset']
+    results = [{'id': 'a', 'at': (mission[0] + 0.001, mission[1])},
+               {'id': 'b', 'at': (sunset[0], sunset[1] + 0.002)},
+               {'id': 'c', 'at': (37.70, -122.30)},            # far from every footprint
+               {'id': 'd', 'at': None}]
+    grouped = assign(results, coverage, lambda r: r['at'])
+    assert {name: [r['id'] for r in rs] for name, rs in grouped.items()} == {'Mission': ['a'], 'Sunset': ['b']}
+
+
+def test_load_plan_is_keyed_by_city_source_and_inputs(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_planner, 'COVERAGE_PLAN_DIR', str(tmp_path))
+    first = load_plan('sf', 'yelp-bars', CENTROIDS, 50, 4000)
+    assert first.path.startswith(str(tmp_path)) and 'sf_yelp-bars_' in first.path
+    assert load_plan('sf', 'yelp-cafes', CENTROIDS, 50, 4000).path != first.path
+    assert load_plan('sf', 'yelp-bars', dict(CENTROIDS, Extra=(37.72, -122.44)), 50, 4000).path != first.path
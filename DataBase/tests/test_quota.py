@@ -0,0 +1,141 @@
+from urllib.parse import urlsplit
+import pytest
+import requests
+import config
+from utils import http_client, quota
+from utils.rate_limit import HostRateLimiter
+
+
+@pytest.fixture
+def ledger(tmp_path, monkeypatch):
+    """An empty ledger with a 10-call Yelp budget on a controllable day"""
+    day = {'window': '2026-01-01'}
+    monkeypatch.setattr(quota, 'QUOTA_DIR', str(tmp_path))
+    monkeypatch.setattr(quota, 'window', lambda: day['window'])
+    monkeypatch.setitem(config.API_DAILY_QUOTAS, 'yelp', 10)
+    monkeypatch.setitem(config.API_DAILY_QUOTAS, 'places', 0)
+    return day
+
+
+def test_spend_stops_at_the_budget_and_resets_next_window(ledger):
+    assert quota.remaining('yelp') == 10
+    assert quota.spend('yelp', 7)
+    assert not quota.spend('yelp', 4)      # would overshoot: nothing recorded
+    assert quota.remaining('yelp') == 3
+    assert quota.spend('yelp', 3) and quota.exhausted('yelp')
+    ledger['window'] = '2026-01-02'
+    assert quota.remaining('yelp') == 10
+
+
+def test_unlimited_apis_always_spend(ledger):
+    assert quota.remaining('places') is None
+    assert all(quota.spend('places') for _ in range(50))
+    assert not quota.exhausted('places')
+
+
+def test_schedule_grants_oldest_first_within_budget(ledger, monkeypatch):
+    clock = iter(range(100, 200))
+    monkeypatch.setattr(quota.time, 'time', lambda: next(clock))
+    quota.done('yelp', 'sf', ['Mission'])
+    quota.done('yelp', 'sf', ['SoMa'])
+
+    granted, deferred = quota.schedule('yelp', 'sf', ['SoMa', 'Mission', 'Castro'], cost=4)
+    assert granted == ['Castro', 'Mission']          # never fetched, then the oldest
+    assert deferred == ['SoMa']
+    assert quota.report()['yelp']['deferred'] == {'sf': ['SoMa']}
+
+    quota.done('yelp', 'sf', ['SoMa'])
+    assert quota.report()['yelp']['deferred'] == {}
+    assert quota.oldest_first('yelp', 'sf', ['SoMa', 'Castro', 'Mission']) == ['Castro', 'Mission', 'SoMa']
+
+
+def test_schedule_uses_each_items_last_cost(ledger):
+    quota.done('yelp', 'sf', ['sweep'], spent=8)
+    assert quota.schedule('yelp', 'sf', ['sweep'], cost=1) == (['sweep'], [])
+    quota.spend('yelp', 3)
+    assert quota.schedule('yelp', 'sf', ['sweep'], cost=1) == ([], ['sweep'])
+
+
+def test_schedule_everything_when_unlimited(ledger):
+    assert quota.schedule('places', 'sf', ['a', 'b'], cost=1000) == (['a', 'b'], [])
+
+
+def test_api_for_matches_only_metered_endpoints():
+    assert quota.api_for(config.YELP_SEARCH_URL + '?term=bars') == 'yelp'
+    assert quota.api_for(config.GOOGLE_PLACES_URL) == 'places'
+    assert quota.api_for('https://data.sfgov.org/resource/wg3w-h783.csv') is None
+
+
+class Response:
+    status_code = 200
+    content = b''
+    headers = {}
+
+
+def test_client_spends_only_on_requests_sent(ledger, monkeypatch):
+    class Session:
+        sent = 0
+
+        def get(self, url, **kwargs):
+            Session.sent += 1
+            return Response()
+
+    monkeypatch.setattr(http_client, 'get_session', lambda: Session())
+    monkeypatch.setattr(http_client, '_rate_limiter', HostRateLimiter({}))
+    monkeypatch.setattr(config, 'BREAKER_FAILURES', 1)
+    http_client.reset_breakers()
+    try:
+        for _ in range(10):
+            http_client.get(config.YELP_SEARCH_URL)
+        with pytest.raises(quota.QuotaExceededError):
+            http_client.get(config.YELP_SEARCH_URL)
+        assert Session.sent == 10
+        assert not http_client.circuit_open(config.YELP_SEARCH_URL)  # a spent quota isn't a host failure
+
+        ledger['window'] = '2026-01-02'
+        http_client.get_breaker(urlsplit(config.YELP_SEARCH_URL).hostname).record(False)      # open the circuit
+        with pytest.raises(requests.RequestException):
+            http_client.get(config.YELP_SEARCH_URL)
+        assert quota.remaining('yelp') == 10                       # refused calls cost nothing
+    finally:
+        http_client.reset_breakers()
+
+
+def test_eventbrite_sweep_cut_short_by_quota_keeps_stored_scores(ledger, monkeypatch):
+    from pipelines import events_pipeline
+    from utils import checkpoints
+
+    class Page:
+        status_code = 200
+        content = b''
+        headers = {}
+
+        def json(self):
+            return {'events': [{'id': str(Session.sent), 'venue': {'latitude': 37.7, 'longitude': -122.4}}],
+                    'pagination': {'has_more_items': True}}
+
+    class Session:
+        sent = 0
+
+        def get(self, url, **kwargs):
+            Session.sent += 1
+            return Page()
+
+    monkeypatch.setitem(config.API_DAILY_QUOTAS, 'eventbrite', 3)
+    monkeypatch.setattr(events_pipeline, 'EVENTBRITE_TOKEN', 'token')
+    monkeypatch.setattr(config, 'HEDGE_REQUESTS', False)
+    monkeypatch.setattr(http_client, 'get_session', lambda: Session())
+    monkeypatch.setattr(http_client, '_rate_limiter', HostRateLimiter({}))
+    hoods = ['A', 'B']
+    city = {'id': 'testcity', 'neighborhoods': hoods, 'default_coords': (37.77, -122.42),
+            'centroids': {'A': (37.7, -122.4), 'B': (37.8, -122.5)}}
+    http_client.reset_breakers()
+    try:
+        scores = events_pipeline.process_happening_index(hoods, city)
+        assert Session.sent == 3                   # the first sweep was granted the whole budget
+        assert scores == {'A': None, 'B': None} and isinstance(scores, checkpoints.Degraded)
+
+        assert events_pipeline.process_happening_index(hoods, city) == {'A': None, 'B': None}
+        assert Session.sent == 3                   # spent: nothing sent, no curated scores written
+    finally:
+        http_client.reset_breakers()
@@ -0,0 +1,93 @@
+import random
+import numpy as np
+import pytest
+from ranking import ATTRIBUTES, RankingIndex
+
+
+def make_records(n, seed=0, ties=False, missing=0.0):
+    rng = random.Random(seed)
+
+    def value(low, high):
+        if rng.random() < missing:
+            return None
+        return float(rng.randint(low, high)) if ties else rng.uniform(low, high)
+
+    records = []
+    for i in range(n):
+        record = {'neighborhood': f"hood{i}", 'safety': value(0, 100), 'happening': value(0, 100),
+                  'property_rates': value(1500, 6000), 'population_density': value(0, 100)}
+        for category in ('bars', 'restaurants', 'cafes'):
+            record[category] = {'density': value(0, 100), 'avg_rating': value(1, 5)}
+        records.append({key: v for key, v in record.items() if v is not None})
+    return records
+
+
+def brute_force(records, weights, k):
+    """Normalize every attribute from scratch and sort all scores"""
+    n = len(records)
+    scores = np.zeros(n)
+    for name, weight in weights.items():
+        field, lower_is_better = ATTRIBUTES[name]
+        column = []
+        for record in records:
+            value = record
+            for part in field.split('.'):
+                value = value.get(part) if isinstance(value, dict) else None
+            column.append(np.nan if value is None else value)
+        column = np.array(column, dtype=float)
+        if np.isnan(column).all():
+            continue
+        column[np.isnan(column)] = np.nanmean(column)
+        lo, hi = column.min(), column.max()
+        column = (column - lo) / (hi - lo) if hi > lo else np.full(n, 0.5)
+        scores += weight * (1.0 - column if lower_is_better else column)
+    order = sorted(range(n), key=lambda pos: (-scores[pos], pos))[:k]
+    return [(pos, scores[pos]) for pos in order]
+
+
+WEIGHTS = [
+    {'safety': 0.4, 'happening': 0.3, 'rent': 0.3},
+    {'rent': 1.0},
+    {'safety': 0.5, 'bars': 0.2, 'cafes_rating': 0.3, 'density': 0.1},
+    {'happening': 0.7, 'rent': -0.3},
+]
+
+
+@pytest.mark.parametrize('weights', WEIGHTS)
+@pytest.mark.parametrize('ties,missing', [(False, 0.0), (True, 0.0), (False, 0.2)])
+@pytest.mark.parametrize('k', [1, 10, 50])
+def test_both_methods_match_brute_force(weights, ties, missing, k):
+    records = make_records(500, seed=k, ties=ties, missing=missing)
+    index = RankingIndex(records)
+    expected = brute_force(records, weights, k)
+
+    for ranked in (index.rank_matvec(weights, k), index.rank_threshold(weights, k)[0]):
+        assert [pos for pos, _ in ranked] == [pos for pos, _ in expected]
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected])
+
+
+def test_threshold_stops_early_on_correlated_lists():
+    records = [{'neighborhood': f"hood{i}", 'safety': float(i), 'happening': float(i)} for i in range(5000)]
+    ranked, scored = RankingIndex(records).rank_threshold({'safety': 0.5, 'happening': 0.5}, k=10)
+    assert [pos for pos, _ in ranked] == list(range(4999, 4989, -1))
+    assert scored < len(records)
+
+
+def test_k_larger_than_index_and_empty_index():
+    records = make_records(5)
+    index = RankingIndex(records)
+    assert len(index.rank_matvec({'safety': 1}, k=50)) == 5
+    assert len(index.rank_threshold({'safety': 1}, k=50)[0]) == 5
+    assert RankingIndex([]).rank_threshold({'safety': 1}, k=3) == ([], 0)
+
+
+def test_unknown_attribute_is_rejected():
+    with pytest.raises(ValueError, match='walkability'):
+        RankingIndex(make_records(3)).top_k({'walkability': 1})
+
+
+def test_top_k_returns_records_best_first():
+    records = make_records(30, seed=3)
+    top = RankingIndex(records).top_k({'safety': 1}, k=3)
+    safeties = sorted((r['safety'] for r in records if 'safety' in r), reverse=True)[:3]
+    assert [record['safety'] for record, _ in top] == safeties
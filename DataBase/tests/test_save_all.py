@@ -0,0 +1,81 @@
+import contextlib
+import io
+import random
+import pytest
+from benchmarks.fake_firestore import FakeFirestore
+from firebase_client import FIRESTORE_LAYOUTS, get_all_neighborhoods
+from main import save_all
+from similarity import attach_similar
+from sinks import FirestoreSink, JsonlSink
+
+HOODS = [f"Hood {i}" for i in range(12)]
+CITY = {'id': 'testcity', 'neighborhoods': HOODS, 'default_coords': (37.77, -122.42),
+        'centroids': {hood: (37.70 + i / 100, -122.40 - i / 100) for i, hood in enumerate(HOODS)}}
+
+
+def yelp(rng, hoods=HOODS):
+    return {category: {hood: {'avg_price': rng.uniform(1, 4), 'avg_rating': rng.uniform(2.5, 5),
+                              'count': rng.randint(1, 200)} for hood in hoods}
+            for category in ('bars', 'restaurants', 'cafes')}
+
+
+def full_outputs(rng):
+    return {
+        'crime': {hood: rng.uniform(0, 100) for hood in HOODS},
+        'happening': {hood: rng.uniform(0, 100) for hood in HOODS},
+        'demographics': {hood: {'population_density': rng.uniform(0, 100), 'age_demographic': 35.0}
+                         for hood in HOODS},
+        'property': {hood: {'property_rates': rng.uniform(1500, 6000)} for hood in HOODS},
+        'yelp': yelp(rng),
+    }
+
+
+def write(sink, outputs, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        save_all(sink, CITY, outputs, **kwargs)
+
+
+@pytest.mark.parametrize('layout', FIRESTORE_LAYOUTS)
+def test_partial_yelp_refresh_rederives_densities_and_similar(layout):
+    rng = random.Random(1)
+    db = FakeFirestore()
+    sink = FirestoreSink(db, layout)
+    write(sink, full_outputs(rng))
+    fresh = yelp(rng)
+    write(sink, {'yelp': fresh}, fill_defaults=False)
+
+    stored = get_all_neighborhoods(db, CITY['id'], layout)
+    peak = max(row['count'] for row in fresh['bars'].values())
+    for hood, row in fresh['bars'].items():
+        doc = next(d for d in stored.values() if d['neighborhood'] == hood)
+        assert doc['bars']['density'] == round(row['count'] / peak * 100, 1)
+
+    expected = [dict(doc) for doc in stored.values()]
+    attach_similar(expected)
+    assert all(doc['similar'] == stored[doc['doc_id']]['similar'] for doc in expected)
+
+
+def test_partial_refresh_of_some_hoods_keeps_densities_and_updates_other_similar_lists():
+    rng = random.Random(2)
+    db = FakeFirestore()
+    sink = FirestoreSink(db, 'single')
+    write(sink, full_outputs(rng))
+    before = get_all_neighborhoods(db, CITY['id'], 'single')
+
+    write(sink, {'crime': {hood: 0.0 for hood in HOODS[:2]}}, neighborhoods=HOODS[:2], fill_defaults=False)
+    write(sink, {'yelp': yelp(rng, HOODS[:2])}, neighborhoods=HOODS[:2], fill_defaults=False)
+    after = get_all_neighborhoods(db, CITY['id'], 'single')
+
+    # Densities are relative to the whole city, so a subset can't re-derive them
+    assert all(after[d]['bars']['density'] == before[d]['bars']['density'] for d in before)
+    expected = [dict(doc) for doc in after.values()]
+    attach_similar(expected)
+    assert all(doc['similar'] == after[doc['doc_id']]['similar'] for doc in expected)
+
+
+def test_sinks_that_cannot_read_back_still_write(tmp_path):
+    path = tmp_path / 'out.jsonl'
+    sink = JsonlSink(str(path))
+    write(sink, {'crime': {hood: 1.0 for hood in HOODS}}, fill_defaults=False)
+    sink.close()
+    assert len(path.read_text().splitlines()) == len(HOODS)
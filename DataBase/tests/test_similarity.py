@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from similarity import FEATURES, SimilarityIndex, attach_similar, feature_matrix, nearest_neighbors
+
+
+def brute_force(matrix, k, metric):
+    """k nearest other rows by a full float64 distance matrix"""
+    x = matrix.astype(np.float64)
+    if metric == 'cosine':
+        x = x / np.maximum(np.linalg.norm(x, axis=1, keepdims=True), 1e-12)
+        scores = x @ x.T
+    else:
+        sq = (x * x).sum(axis=1)
+        scores = -np.sqrt(np.maximum(sq[:, None] + sq[None, :] - 2 * x @ x.T, 0))
+    np.fill_diagonal(scores, -np.inf)
+    top = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    values = np.take_along_axis(scores, top, axis=1)
+    return top, (values if metric == 'cosine' else -values)
+
+
+@pytest.mark.parametrize('metric', ['cosine', 'euclidean'])
+@pytest.mark.parametrize('n,block_size', [(40, 1024), (3000, 512)])  # full sort and pruned paths
+def test_nearest_neighbors_match_brute_force(metric, n, block_size):
+    matrix = np.random.default_rng(n).normal(size=(n, len(FEATURES))).astype(np.float32)
+    indices, scores = nearest_neighbors(matrix, k=5, metric=metric, block_size=block_size)
+    expected, expected_scores = brute_force(matrix, 5, metric)
+
+    assert indices.shape == (n, 5)
+    assert not (indices == np.arange(n)[:, None]).any()
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-4, atol=1e-4)
+    # float32 rounding may swap near-ties; anything else must agree exactly
+    gaps = np.abs(np.diff(expected_scores, axis=1)).min(axis=1) > 1e-4
+    np.testing.assert_array_equal(indices[gaps], expected[gaps])
+
+
+def test_duplicates_are_nearest_and_k_is_capped():
+    matrix = np.array([[1, 0], [1, 0], [0, 1], [-1, 0]], dtype=np.float32)
+    indices, scores = nearest_neighbors(matrix, k=10, metric='euclidean')
+    assert indices.shape == (4, 3)
+    assert indices[0, 0] == 1 and indices[1, 0] == 0
+    assert scores[0, 0] == pytest.approx(0.0)
+
+
+def test_feature_matrix_fills_missing_at_mean_and_keeps_constant_columns_finite():
+    records = [{'safety': 10.0, 'happening': 5.0}, {'safety': 30.0, 'happening': 5.0}, {'happening': 5.0}]
+    matrix, mean, _ = feature_matrix(records, features=('safety', 'happening'))
+    assert mean[0] == pytest.approx(20.0)
+    assert matrix[2, 0] == pytest.approx(0.0)       # missing safety sits at the mean
+    assert np.isfinite(matrix).all()
+    assert (matrix[:, 1] == 0).all()                # constant column, std treated as 1
+
+
+def test_index_queries_exclude_the_neighborhood_itself():
+    records = [{'neighborhood': f"hood{i}", 'safety': float(i), 'happening': float(i % 3)} for i in range(10)]
+    index = SimilarityIndex(records, features=('safety', 'happening'))
+    similar = index.similar_to('hood4', k=3, metric='euclidean')
+    assert 'hood4' not in [record['neighborhood'] for record, _ in similar]
+    assert [score for _, score in similar] == sorted(score for _, score in similar)
+    with pytest.raises(KeyError):
+        index.similar_to('nowhere')
+    with pytest.raises(ValueError):
+        index.vector({'walkability': 1.0})
+
+
+def test_attach_similar_stores_names_and_scores():
+    docs = [{'neighborhood': f"hood{i}", 'safety': float(i), 'happening': float(10 - i)} for i in range(6)]
+    attach_similar(docs, k=2)
+    for doc in docs:
+        assert len(doc['similar']) == 2
+        assert doc['neighborhood'] not in [entry['neighborhood'] for entry in doc['similar']]
+    assert attach_similar([{'neighborhood': 'alone'}]) == [{'neighborhood': 'alone'}]
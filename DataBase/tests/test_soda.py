@@ -0,0 +1,75 @@
+import csv
+import io
+import math
+import random
+import pytest
+from city_registry import DEFAULT_CRIME_FIELDS
+from pipelines.crime_pipeline import calculate_weighted_crime_score
+from utils.soda import Interner, read_incident_csv
+
+FIELDS = dict(DEFAULT_CRIME_FIELDS, latitude='latitude', longitude='longitude')
+
+
+def feed(rows, header=None):
+    header = header or [FIELDS['neighborhood'], FIELDS['category'], FIELDS['subcategory'], 'latitude', 'longitude']
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(header)
+    writer.writerows(rows)
+    return io.StringIO(out.getvalue(), newline='')
+
+
+def incidents(n, seed=0):
+    rng = random.Random(seed)
+    hoods = ['Mission', 'SoMa', 'Castro/Upper Market', '']
+    categories = [('Assault', 'Aggravated Assault'), ('Larceny Theft', 'Theft From Vehicle'),
+                  ('Robbery', ''), ('Vandalism', 'Vandalism, "Graffiti"')]
+    return [[rng.choice(hoods), *rng.choice(categories), f"{37.7 + rng.random() / 10:.5f}",
+             f"{-122.5 + rng.random() / 10:.5f}"] for _ in range(n)]
+
+
+def test_interner_gives_dense_stable_codes():
+    intern = Interner()
+    assert [intern(s) for s in ('a', 'b', 'a', 'c', 'b')] == [0, 1, 0, 2, 1]
+    assert intern.values == ['a', 'b', 'c'] and len(intern) == 3
+
+
+def test_columns_round_trip_the_rows():
+    rows = incidents(200)
+    columns = read_incident_csv(feed(rows), FIELDS)
+    views = columns.arrays()
+    assert len(columns) == 200 and columns.skipped == 0
+    for i, (hood, category, subcategory, lat, lon) in enumerate(rows):
+        assert columns.neighborhoods.values[views['neighborhood'][i]] == hood
+        assert columns.categories.values[views['category'][i]] == category
+        assert columns.subcategories.values[views['subcategory'][i]] == subcategory
+        assert views['latitude'][i] == pytest.approx(float(lat), abs=1e-4)
+        assert views['longitude'][i] == pytest.approx(float(lon), abs=1e-4)
+    assert len(columns.neighborhoods) == len({row[0] for row in rows})
+
+
+def test_short_rows_are_skipped_and_counted_and_bad_coordinates_are_nan():
+    rows = [['Mission', 'Assault', '', 'x', '-122.4'], ['SoMa'], ['Castro/Upper Market', 'Robbery', '', '37.76', '-122.43']]
+    columns = read_incident_csv(feed(rows), FIELDS)
+    assert len(columns) == 2 and columns.skipped == 1
+    assert math.isnan(columns.arrays()['latitude'][0])
+
+
+def test_missing_columns_read_as_empty_and_empty_feed_is_empty():
+    columns = read_incident_csv(feed([['Mission', 'Assault']], header=[FIELDS['neighborhood'], FIELDS['category']]),
+                                FIELDS)
+    assert len(columns) == 1 and not columns.has_coordinates
+    assert columns.subcategories.values == ['']
+    assert len(read_incident_csv(io.StringIO(''), FIELDS)) == 0
+
+
+def test_weighted_scores_match_the_json_path():
+    rows = incidents(2000, seed=1)
+    header = [FIELDS['neighborhood'], FIELDS['category'], FIELDS['subcategory'], 'latitude', 'longitude']
+    as_json = [dict(zip(header, row)) for row in rows]
+    columns = read_incident_csv(feed(rows), FIELDS)
+
+    json_scores, json_counts = calculate_weighted_crime_score(as_json, [], FIELDS)
+    csv_scores, csv_counts = calculate_weighted_crime_score(columns, [], FIELDS)
+    assert csv_counts == json_counts
+    assert csv_scores == pytest.approx(json_scores)
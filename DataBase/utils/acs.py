@@ -0,0 +1,166 @@
+"""
+American Community Survey (ACS 5-year) ingestion for demographics
+
+Streams a local ACS extract (one row per census tract, e.g. a
+data.census.gov / Census API CSV with B01003_001E total population and
+B01002_001E median age) and aggregates the tracts into neighborhoods
+through a tract -> neighborhood crosswalk:
+
+  - TRACT_CROSSWALK_FILE: CSV of tract GEOID, neighborhood, weight
+    (the share of the tract's population or area in that neighborhood)
+  - otherwise every tract in TRACT_GAZETTEER_FILE whose internal point lies
+    within CROSSWALK_MAX_KM of a centroid goes to the nearest neighborhood
+
+The crosswalk is built once per city and cached with the checkpoints,
+keyed by the input files and centroids. Only the crosswalk and a few
+per-neighborhood accumulators are held in memory while the extract streams.
+"""
+import csv
+import os
+import numpy as np
+import config
+from utils import checkpoints
+from utils.geocoding import nearest_centroids
+
+POPULATION_COLUMN = 'B01003_001E'
+MEDIAN_AGE_COLUMN = 'B01002_001E'
+GEOID_COLUMNS = ('GEO_ID', 'GEOID', 'geoid')
+GAZETTEER_CHUNK = 10000
+
+def tract_geoid(value):
+    """11-digit tract GEOID from '1400000US06075010100' or '06075010100'"""
+    value = value.strip()
+    if 'US' in value:
+        value = value.split('US', 1)[1]
+    return value if len(value) == 11 and value.isdigit() else None
+
+
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    # ACS annotates missing estimates with large negative sentinels
+    return number if number >= 0 else None
+
+
+def _column(header, names):
+    stripped = [h.strip() for h in header]
+    for name in names:
+        if name in stripped:
+            return stripped.index(name)
+    raise ValueError(f"None of {', '.join(names)} in header")
+
+
+def read_gazetteer(path, chunk_size=GAZETTEER_CHUNK):
+    """Yield lists of (geoid, lat, lon, land_sqmi) from a Census tract gazetteer file (tab-separated)"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f, delimiter='\t')
+        header = next(reader)
+        geoid = _column(header, ('GEOID',))
+        lat, lon = _column(header, ('INTPTLAT',)), _column(header, ('INTPTLONG',))
+        area = _column(header, ('ALAND_SQMI',))
+        chunk = []
+        for row in reader:
+            chunk.append((row[geoid].strip(), float(row[lat]), float(row[lon]), float(row[area])))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def build_crosswalk(city, gazetteer_path=None, crosswalk_path=None, max_km=None):
+    """
+    {'tracts': {geoid: [[hood_index, weight], ...]}, 'area': {geoid: land_sqmi}}
+    with hood_index into city['neighborhoods']
+    """
+    hoods = city['neighborhoods']
+    index = {hood: i for i, hood in enumerate(hoods)}
+    tracts, area = {}, {}
+
+    if crosswalk_path:
+        with open(crosswalk_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                geoid = tract_geoid(row.get('tract') or row.get('GEOID') or row.get('geoid') or '')
+                hood = (row.get('neighborhood') or '').strip()
+                if geoid and hood in index:
+                    tracts.setdefault(geoid, []).append([index[hood], float(row.get('weight') or 1.0)])
+
+    if gazetteer_path:
+        centroids = [city['centroids'].get(h, city['default_coords']) for h in hoods]
+        # Statewide gazetteers are read in chunks; only tracts near the city are kept
+        for chunk in read_gazetteer(gazetteer_path):
+            if crosswalk_path:
+                area.update((g, sqmi) for g, _, _, sqmi in chunk if g in tracts)
+                continue
+            nearest, _ = nearest_centroids([(lat, lon) for _, lat, lon, _ in chunk], centroids,
+                                           max_km or config.CROSSWALK_MAX_KM)
+            for (geoid, _, _, sqmi), hood_index in zip(chunk, nearest.tolist()):
+                if hood_index >= 0:
+                    tracts[geoid] = [[hood_index, 1.0]]
+                    area[geoid] = sqmi
+    return {'tracts': tracts, 'area': area}
+
+
+def load_crosswalk(city):
+    """The city's crosswalk from the cache, building it on first use"""
+    cache_stage = os.path.join(city['id'], 'crosswalk')
+    key = checkpoints.config_hash({
+        'neighborhoods': city['neighborhoods'],
+        'centroids': city['centroids'],
+        'gazetteer': checkpoints.file_signature(config.TRACT_GAZETTEER_FILE),
+        'crosswalk': checkpoints.file_signature(config.TRACT_CROSSWALK_FILE),
+        'max_km': config.CROSSWALK_MAX_KM,
+    })
+    crosswalk = checkpoints.load_checkpoint(cache_stage, key)
+    if crosswalk is None:
+        crosswalk = build_crosswalk(city, config.TRACT_GAZETTEER_FILE, config.TRACT_CROSSWALK_FILE)
+        checkpoints.save_checkpoint(cache_stage, key, crosswalk)
+        print(f"  🗺️  Built tract crosswalk: {len(crosswalk['tracts'])} tracts → "
+              f"{len(city['neighborhoods'])} neighborhoods")
+    return crosswalk
+
+
+def aggregate_acs(path, city, crosswalk=None):
+    """
+    Stream an ACS extract into per-neighborhood demographics
+    Returns ({hood: median_age}, {hood: people per sq mi}) for the
+    neighborhoods that received at least one tract. Median age is the
+    population-weighted mean of tract medians.
+    """
+    crosswalk = crosswalk or load_crosswalk(city)
+    tracts, area = crosswalk['tracts'], crosswalk['area']
+    n = len(city['neighborhoods'])
+    population = np.zeros(n)
+    age_weight = np.zeros(n)   # sum of weight * population over tracts with a median age
+    age_total = np.zeros(n)    # sum of weight * population * median age
+    land = np.zeros(n)
+
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        geoid_col = _column(header, GEOID_COLUMNS)
+        pop_col = _column(header, (POPULATION_COLUMN,))
+        age_col = _column(header, (MEDIAN_AGE_COLUMN,))
+        for row in reader:
+            # Extracts may carry a second, descriptive header row; tract_geoid skips it
+            geoid = tract_geoid(row[geoid_col])
+            if geoid is None or geoid not in tracts:
+                continue
+            pop = _number(row[pop_col])
+            if pop is None:
+                continue
+            age = _number(row[age_col])
+            for hood_index, weight in tracts[geoid]:
+                population[hood_index] += weight * pop
+                land[hood_index] += weight * area.get(geoid, 0.0)
+                if age is not None:
+                    age_weight[hood_index] += weight * pop
+                    age_total[hood_index] += weight * pop * age
+
+    hoods = city['neighborhoods']
+    ages = {hoods[i]: float(age_total[i] / age_weight[i]) for i in np.flatnonzero(age_weight > 0)}
+    densities = {hoods[i]: float(population[i] / land[i])
+                 for i in np.flatnonzero((land > 0) & (population > 0))}
+    return ages, densities
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import shutil
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # the DataBase directory, not the cwd
+CHECKPOINT_DIR = os.getenv('CHECKPOINT_DIR', os.path.join(BASE_DIR, '.checkpoints'))
+
+class Degraded(dict):
+    """
+    A stage output built from curated fallbacks or from a fetch that was cut
+    short (circuit open, quota spent, failed requests). It is written like
+    any other output but never checkpointed, so the next run fetches again
+    """
+
+def code_version(*paths):
+    """
+    Hash the source files a stage depends on
+    Any edit to a pipeline module invalidates its checkpoints
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+def file_signature(path):
+    """(path, mtime, size) of an input file, or None when it is not there"""
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_mtime_ns, stat.st_size]
+
+def config_hash(config_values):
+    """Stable hash of the config values a run depends on"""
+    payload = json.dumps(config_values, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+def checkpoint_key(stage, version, cfg_hash, input_date=None):
+    """
+    Content-addressed key for a stage output
+    Keyed by stage name, code version, config hash and input date
+    """
+    input_date = input_date or date.today().isoformat()
+    raw = f"{stage}|{version}|{cfg_hash}|{input_date}"
+    return f"{input_date}-{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+def _stage_dir(stage):
+    return os.path.join(CHECKPOINT_DIR, stage)
+
+def load_checkpoint(stage, key):
+    """Return the stored output for this key, or None if there is no valid checkpoint"""
+    path = os.path.join(_stage_dir(stage), f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+def save_checkpoint(stage, key, data):
+    """
+    Persist a stage output atomically
+    Older checkpoints for the same stage are removed
+    """
+    stage_dir = _stage_dir(stage)
+    os.makedirs(stage_dir, exist_ok=True)
+    path = os.path.join(stage_dir, f"{key}.json")
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+    for name in os.listdir(stage_dir):
+        if name != f"{key}.json":
+            os.remove(os.path.join(stage_dir, name))
+
+def invalidate(stage):
+    """Drop every checkpoint for a stage"""
+    shutil.rmtree(_stage_dir(stage), ignore_errors=True)
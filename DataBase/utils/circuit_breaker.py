@@ -0,0 +1,60 @@
+"""
+Per-host circuit breakers for the external APIs
+
+After BREAKER_FAILURES consecutive failures (exceptions, 429s and 5xx) a
+host's circuit opens and calls fail fast with CircuitOpenError instead of
+each waiting out its timeout. After BREAKER_COOLDOWN seconds one probe is
+let through (half-open): success closes the circuit, failure re-opens it.
+"""
+import threading
+import time
+import requests
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+class CircuitBreaker:
+    def __init__(self, failures=5, cooldown=30.0, clock=time.monotonic):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a request may be sent now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() - self.opened_at >= self.cooldown:
+                self.state = 'half_open'  # this caller is the probe
+                return True
+            return False
+
+    def cancel(self):
+        """The call allow() let through was never sent; a probe slot goes back"""
+        with self._lock:
+            if self.state == 'half_open':
+                self.state = 'open'  # cooldown already over: the next allow() probes
+
+    def record(self, ok):
+        with self._lock:
+            if ok:
+                self.state = 'closed'
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.threshold:
+                if self.state != 'open':
+                    print(f"  🔌 Circuit opened after {self.failures} failures")
+                self.state = 'open'
+                self.opened_at = self.clock()
+
+    @property
+    def is_open(self):
+        """True while requests are being refused (open and still cooling down)"""
+        with self._lock:
+            return self.state == 'open' and self.clock() - self.opened_at < self.cooldown
@@ -1,6 +1,34 @@
-from geopy.distance import geodesic
-
 def is_within_radius(center_coord, point_coord, radius_km=2.0):
     """Check if point is within radius of center"""
+    from geopy.distance import geodesic
+
     distance = geodesic(center_coord, point_coord).kilometers
-    return distance <= radius_km
\ No newline at end of file
+    return distance <= radius_km
+
+def nearest_centroids(points, centroids, max_km=None):
+    """
+    Index of the nearest centroid for each (lat, lon) point, vectorized
+    Points farther than max_km from every centroid get -1
+    Returns (indices, distances_km) as NumPy arrays
+    """
+    import numpy as np
+
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    centroids = np.asarray(centroids, dtype=float).reshape(-1, 2)
+    if not len(points) or not len(centroids):
+        return np.full(len(points), -1, dtype=np.int64), np.full(len(points), np.inf)
+
+    # Equirectangular distances are accurate to well under 1% at city scale
+    lat = np.radians(points[:, 0])[:, None]
+    lon = np.radians(points[:, 1])[:, None]
+    c_lat = np.radians(centroids[:, 0])[None, :]
+    c_lon = np.radians(centroids[:, 1])[None, :]
+    x = (lon - c_lon) * np.cos((lat + c_lat) / 2)
+    y = lat - c_lat
+    distances = 6371.0 * np.sqrt(x * x + y * y)
+
+    indices = distances.argmin(axis=1)
+    nearest = distances[np.arange(len(points)), indices]
+    if max_km is not None:
+        indices = np.where(nearest <= max_km, indices, -1)
+    return indices, nearest
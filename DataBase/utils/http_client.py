@@ -0,0 +1,166 @@
+"""
+Shared HTTP entry point for the pipelines
+All external API calls go through get() so they can be instrumented and
+rate limited in one place. Calls reuse one keep-alive session per process,
+so long-running processes (the refresh daemon) keep their connections warm.
+
+Each host has a circuit breaker (utils/circuit_breaker.py): once it opens,
+get() raises CircuitOpenError immediately and loops can stop early while
+keeping what they already fetched (circuit_open()). Idempotent callers may
+pass hedge=True: with HEDGE_REQUESTS on, a request still unanswered after
+the host's recent HEDGE_PERCENTILE latency gets a duplicate, and whichever
+answers first wins.
+
+Metered APIs (utils/quota.py) spend one call of the day's budget per
+request actually sent, hedges included (calls an open circuit refuses
+cost nothing); once it is gone get() raises QuotaExceededError without
+touching the network or counting against the host's breaker.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import requests
+import config
+from config import YELP_SEARCH_URL, GOOGLE_PLACES_URL, RATE_LIMIT_DELAY
+from utils import metrics, profiling, quota
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from utils.quota import QuotaExceededError
+from utils.rate_limit import HostRateLimiter
+
+HEDGE_MIN_SAMPLES = 20       # latencies seen before a host's percentile is trusted
+HEDGE_MIN_DELAY = 0.05       # seconds; never hedge sooner than this
+LATENCY_WINDOW = 200         # recent latencies kept per host
+
+def default_host_intervals():
+    """Minimum spacing between calls per rate-limited host"""
+    return {
+        urlsplit(YELP_SEARCH_URL).hostname: RATE_LIMIT_DELAY,
+        urlsplit(GOOGLE_PLACES_URL).hostname: RATE_LIMIT_DELAY,
+    }
+
+_rate_limiter = HostRateLimiter(default_host_intervals())
+
+_session = None
+_session_pid = None
+_breakers = {}
+_latencies = {}
+_hedge_pool = None
+_lock = threading.Lock()
+
+def get_session():
+    """The process's shared requests.Session (recreated after a fork)"""
+    global _session, _session_pid, _hedge_pool
+    if _session is None or _session_pid != os.getpid():
+        _session = requests.Session()
+        _session_pid = os.getpid()
+        _hedge_pool = None
+    return _session
+
+def set_rate_limiter(limiter):
+    """Install a limiter (e.g. one shared across a process pool)"""
+    global _rate_limiter
+    _rate_limiter = limiter
+
+def get_breaker(host):
+    with _lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker(config.BREAKER_FAILURES, config.BREAKER_COOLDOWN)
+        return _breakers[host]
+
+def circuit_open(url):
+    """Whether calls to url's host are currently being refused"""
+    return get_breaker(urlsplit(url).hostname or url).is_open
+
+def reset_breakers():
+    """Forget every host's failures and latencies (tests, benchmarks)"""
+    with _lock:
+        _breakers.clear()
+        _latencies.clear()
+
+def hedge_delay(host):
+    """Seconds to wait before hedging a request to host, or None without enough history"""
+    with _lock:
+        samples = list(_latencies.get(host, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_DELAY, metrics.percentile(samples, config.HEDGE_PERCENTILE))
+
+def _attempt(host, url, kwargs):
+    wait_start = time.perf_counter()
+    _rate_limiter.wait(host)
+    start = time.perf_counter()
+    profiling.record_wait(start - wait_start)
+    try:
+        response = get_session().get(url, **kwargs)
+    except Exception:
+        metrics.record_request(host, None, 0, time.perf_counter() - start)
+        profiling.record_http(time.perf_counter() - start)
+        raise
+    latency = time.perf_counter() - start
+    profiling.record_http(latency)
+    with _lock:
+        _latencies.setdefault(host, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    if metrics.is_enabled():
+        if kwargs.get('stream'):
+            nbytes = int(response.headers.get('Content-Length', 0) or 0)
+        else:
+            nbytes = len(response.content)
+        metrics.record_request(host, response.status_code, nbytes, latency)
+    return response
+
+def _close_loser(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+def _hedged(host, url, kwargs, delay, api=None):
+    global _hedge_pool
+    get_session()
+    with _lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+        pool = _hedge_pool
+
+    first = pool.submit(_attempt, host, url, kwargs)
+    done, _ = wait([first], timeout=delay)
+    if done or (api and not quota.spend(api)):
+        return first.result()
+    metrics.record_hedge(host)
+    pending = {first, pool.submit(_attempt, host, url, kwargs)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.add_done_callback(_close_loser)
+                return future.result()
+            error = future.exception()
+    raise error
+
+def get(url, hedge=False, **kwargs):
+    """
+    requests.get with per-host rate limiting, circuit breaking and metrics
+    hedge=True marks the call as safe to duplicate (idempotent GET)
+    """
+    host = urlsplit(url).hostname or url
+    breaker = get_breaker(host)
+    if not breaker.allow():
+        metrics.record_short_circuit(host)
+        raise CircuitOpenError(f"Circuit open for {host}")
+    api = quota.api_for(url)
+    if api and not quota.spend(api):
+        breaker.cancel()
+        raise QuotaExceededError(f"Daily {api} quota spent")
+
+    delay = hedge_delay(host) if hedge and config.HEDGE_REQUESTS and not kwargs.get('stream') else None
+    try:
+        response = _attempt(host, url, kwargs) if delay is None else _hedged(host, url, kwargs, delay, api)
+    except Exception:
+        breaker.record(False)
+        raise
+    breaker.record(response.status_code < 500 and response.status_code != 429)
+    return response
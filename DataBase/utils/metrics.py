@@ -0,0 +1,206 @@
+"""
+Opt-in instrumentation for the data pipeline
+
+Records per-stage wall/CPU time, per-host HTTP counters and latencies,
+row throughput and Firestore write latency. Everything is a no-op until
+enable() is called, so normal runs pay nothing beyond a flag check.
+"""
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+_enabled = False
+_stages = {}
+_hosts = defaultdict(lambda: {
+    'requests': 0,
+    'errors': 0,
+    'hedges': 0,
+    'short_circuits': 0,
+    'bytes': 0,
+    'latencies': [],
+})
+_throughput = defaultdict(lambda: {'rows': 0, 'seconds': 0.0})
+_latencies = defaultdict(list)
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    """Clear everything recorded so far"""
+    _stages.clear()
+    _hosts.clear()
+    _throughput.clear()
+    _latencies.clear()
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage (wall and CPU)"""
+    if not _enabled:
+        yield
+        return
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        _stages[name] = {
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_seconds': time.process_time() - cpu_start,
+        }
+
+def record_request(host, status, nbytes, latency):
+    """Record one HTTP request; status is None when the request raised"""
+    if not _enabled:
+        return
+    stats = _hosts[host]
+    stats['requests'] += 1
+    stats['bytes'] += nbytes
+    stats['latencies'].append(latency)
+    if status is None or status >= 400:
+        stats['errors'] += 1
+
+def record_hedge(host):
+    """A duplicate request sent because the first was slow"""
+    if _enabled:
+        _hosts[host]['hedges'] += 1
+
+def record_short_circuit(host):
+    """A request refused because the host's circuit was open"""
+    if _enabled:
+        _hosts[host]['short_circuits'] += 1
+
+def record_rows(name, rows, seconds):
+    """Record rows processed by a hot loop, for rows/second reporting"""
+    if not _enabled:
+        return
+    _throughput[name]['rows'] += rows
+    _throughput[name]['seconds'] += seconds
+
+def record_latency(name, seconds):
+    """Record a latency sample for a named operation (e.g. firestore_write)"""
+    if _enabled:
+        _latencies[name].append(seconds)
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def _summary(values):
+    return {
+        'count': len(values),
+        'sum': sum(values),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
+
+def build_report():
+    """Assemble everything recorded into a JSON-serializable run report"""
+    return {
+        'generated_at': time.time(),
+        'stages': dict(_stages),
+        'hosts': {
+            host: {
+                'requests': stats['requests'],
+                'errors': stats['errors'],
+                'hedges': stats['hedges'],
+                'short_circuits': stats['short_circuits'],
+                'bytes': stats['bytes'],
+                'latency_seconds': _summary(stats['latencies']),
+            }
+            for host, stats in _hosts.items()
+        },
+        'throughput': {
+            name: {
+                'rows': t['rows'],
+                'seconds': t['seconds'],
+                'rows_per_second': t['rows'] / t['seconds'] if t['seconds'] else 0.0,
+            }
+            for name, t in _throughput.items()
+        },
+        'latencies': {name: _summary(values) for name, values in _latencies.items()},
+    }
+
+def _prometheus_lines(report):
+    lines = [
+        '# HELP vibestreet_stage_wall_seconds Wall time per pipeline stage',
+        '# TYPE vibestreet_stage_wall_seconds gauge',
+    ]
+    for name, s in report['stages'].items():
+        lines.append(f'vibestreet_stage_wall_seconds{{stage="{name}"}} {s["wall_seconds"]:.6f}')
+    lines += [
+        '# HELP vibestreet_stage_cpu_seconds CPU time per pipeline stage',
+        '# TYPE vibestreet_stage_cpu_seconds gauge',
+    ]
+    for name, s in report['stages'].items():
+        lines.append(f'vibestreet_stage_cpu_seconds{{stage="{name}"}} {s["cpu_seconds"]:.6f}')
+
+    counters = [
+        ('requests', 'vibestreet_http_requests_total', 'HTTP requests per host'),
+        ('errors', 'vibestreet_http_errors_total', 'Failed HTTP requests per host'),
+        ('hedges', 'vibestreet_http_hedges_total', 'Hedged duplicate HTTP requests per host'),
+        ('short_circuits', 'vibestreet_http_short_circuits_total', 'HTTP requests refused by an open circuit per host'),
+        ('bytes', 'vibestreet_http_response_bytes_total', 'HTTP response bytes per host'),
+    ]
+    for key, metric, help_text in counters:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} counter']
+        for host, h in report['hosts'].items():
+            lines.append(f'{metric}{{host="{host}"}} {h[key]}')
+
+    lines += [
+        '# HELP vibestreet_http_latency_seconds HTTP latency per host',
+        '# TYPE vibestreet_http_latency_seconds summary',
+    ]
+    for host, h in report['hosts'].items():
+        lines += _summary_lines('vibestreet_http_latency_seconds', f'host="{host}"', h['latency_seconds'])
+
+    lines += [
+        '# HELP vibestreet_rows_per_second Rows processed per second in hot loops',
+        '# TYPE vibestreet_rows_per_second gauge',
+    ]
+    for name, t in report['throughput'].items():
+        lines.append(f'vibestreet_rows_per_second{{loop="{name}"}} {t["rows_per_second"]:.1f}')
+
+    lines += [
+        '# HELP vibestreet_operation_latency_seconds Latency of named operations',
+        '# TYPE vibestreet_operation_latency_seconds summary',
+    ]
+    for name, summary in report['latencies'].items():
+        lines += _summary_lines('vibestreet_operation_latency_seconds', f'operation="{name}"', summary)
+    return lines
+
+def _summary_lines(metric, labels, summary):
+    return [
+        f'{metric}{{{labels},quantile="0.5"}} {summary["p50"]:.6f}',
+        f'{metric}{{{labels},quantile="0.95"}} {summary["p95"]:.6f}',
+        f'{metric}{{{labels},quantile="0.99"}} {summary["p99"]:.6f}',
+        f'{metric}_sum{{{labels}}} {summary["sum"]:.6f}',
+        f'{metric}_count{{{labels}}} {summary["count"]}',
+    ]
+
+def _atomic_write(path, text):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_report(directory):
+    """
+    Write run_report.json and a Prometheus textfile (vibestreet.prom)
+    Files are replaced atomically so a textfile collector never reads half a file
+    """
+    os.makedirs(directory, exist_ok=True)
+    report = build_report()
+    _atomic_write(os.path.join(directory, 'run_report.json'), json.dumps(report, indent=2))
+    _atomic_write(os.path.join(directory, 'vibestreet.prom'), '\n'.join(_prometheus_lines(report)) + '\n')
+    return report
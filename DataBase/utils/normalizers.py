@@ -21,4 +21,15 @@ def calculate_density_score(count, max_count):
 def price_to_scale(price_str):
     """Convert Yelp price string to numeric scale"""
     price_map = {'$': 1, '$$': 2, '$$$': 3, '$$$$': 4}
-    return price_map.get(price_str, 2)
\ No newline at end of file
+    return price_map.get(price_str, 2)
+
+def numeric_fields(record, prefix=''):
+    """Yield (dotted_field, value) for a document's numeric leaves, one level of nesting deep"""
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            yield name, float(value)
+        elif isinstance(value, dict) and not prefix:
+            yield from numeric_fields(value, prefix=f"{name}.")
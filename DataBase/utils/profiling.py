@@ -0,0 +1,185 @@
+"""
+Opt-in per-stage profiling (main.py --profile DIR)
+
+For each pipeline stage (crime, demographics, property, yelp, happening,
+firebase_save) this records:
+
+  - a cProfile dump (<stage>.prof, loadable with pstats/snakeviz) and the
+    top functions by own time (<stage>.txt)
+  - tracemalloc peak and the allocation sites that grew the most
+  - wall vs CPU time, time blocked (wall - CPU), and how much of it was
+    spent inside HTTP requests or waiting on the rate limiter
+
+summary.json collects the numbers. Two run directories compare with:
+
+    python -m utils.profiling diff runs/before runs/after
+
+Like metrics, everything is a no-op until enable() is called. Only the
+stage's own thread is profiled (hedged requests run on a pool).
+"""
+import argparse
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+TOP_N = 25
+
+_directory = None
+_stages = {}
+_http = {'seconds': 0.0, 'requests': 0, 'wait_seconds': 0.0}
+
+def enable(directory):
+    global _directory
+    _directory = directory
+    _stages.clear()
+    os.makedirs(directory, exist_ok=True)
+
+def is_enabled():
+    return _directory is not None
+
+def record_http(seconds):
+    """Time spent inside one HTTP request (called by utils.http_client)"""
+    if _directory is not None:
+        _http['seconds'] += seconds
+        _http['requests'] += 1
+
+def record_wait(seconds):
+    """Time spent sleeping on the rate limiter"""
+    if _directory is not None:
+        _http['wait_seconds'] += seconds
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    ])
+
+def _short(filename):
+    """Path relative to the sys.path entry it was imported from (e.g. numpy/core/...)"""
+    for root in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(root + os.sep):
+            return filename[len(root) + 1:]
+    return filename
+
+def _top_functions(profile):
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            'function': f"{_short(filename)}:{line}({name})",
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        })
+    rows.sort(key=lambda r: r['tottime'], reverse=True)
+    return rows[:TOP_N]
+
+@contextmanager
+def stage(name):
+    """Profile one stage; nothing happens unless profiling is enabled"""
+    if _directory is None:
+        yield
+        return
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = _snapshot()
+    http_before = dict(_http)
+    profile = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+        growth = _snapshot().compare_to(before, 'lineno')
+        if started_tracing:
+            tracemalloc.stop()
+
+        profile.dump_stats(os.path.join(_directory, f"{name}.prof"))
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats('tottime').print_stats(TOP_N)
+        with open(os.path.join(_directory, f"{name}.txt"), 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+
+        _stages[name] = {
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'blocked_seconds': round(max(wall - cpu, 0.0), 6),
+            'http_seconds': round(_http['seconds'] - http_before['seconds'], 6),
+            'http_requests': _http['requests'] - http_before['requests'],
+            'rate_limit_wait_seconds': round(_http['wait_seconds'] - http_before['wait_seconds'], 6),
+            'tracemalloc_peak_bytes': peak,
+            'top_allocations': [
+                {'site': f"{_short(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                 'size_bytes': stat.size_diff, 'count': stat.count_diff}
+                for stat in sorted(growth, key=lambda s: s.size_diff, reverse=True)[:TOP_N // 2]
+            ],
+            'top_functions': _top_functions(profile),
+        }
+        print(f"  🔬 {name}: wall {wall:.2f}s, CPU {cpu:.2f}s, "
+              f"HTTP {_stages[name]['http_seconds']:.2f}s, peak {peak / 1e6:.1f} MB")
+
+def write_report(run_info=None):
+    """Write summary.json next to the per-stage dumps"""
+    summary = {'run': run_info or {}, 'stages': _stages}
+    path = os.path.join(_directory, 'summary.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+    return summary
+
+def _load(directory):
+    with open(os.path.join(directory, 'summary.json'), 'r', encoding='utf-8') as f:
+        return json.load(f)['stages']
+
+def _change(a, b):
+    if not a:
+        return 'new' if b else '='
+    return f"{(b - a) / a:+.0%}"
+
+def diff(before_dir, after_dir, out=sys.stdout):
+    """Print per-stage time/memory changes and the functions whose own time moved most"""
+    before, after = _load(before_dir), _load(after_dir)
+    for name in list(before) + [n for n in after if n not in before]:
+        a, b = before.get(name), after.get(name)
+        if a is None or b is None:
+            print(f"{name}: only in {'after' if a is None else 'before'}", file=out)
+            continue
+        print(f"{name}:", file=out)
+        for key, unit, scale in (('wall_seconds', 's', 1), ('cpu_seconds', 's', 1), ('blocked_seconds', 's', 1),
+                                 ('http_seconds', 's', 1), ('tracemalloc_peak_bytes', ' MB', 1e-6)):
+            print(f"  {key:24} {a[key] * scale:10.2f}{unit} -> {b[key] * scale:10.2f}{unit}  "
+                  f"({_change(a[key], b[key])})", file=out)
+        times_a = {f['function']: f['tottime'] for f in a['top_functions']}
+        times_b = {f['function']: f['tottime'] for f in b['top_functions']}
+        moved = sorted(set(times_a) | set(times_b),
+                       key=lambda fn: abs(times_b.get(fn, 0.0) - times_a.get(fn, 0.0)), reverse=True)
+        for fn in moved[:5]:
+            delta = times_b.get(fn, 0.0) - times_a.get(fn, 0.0)
+            if abs(delta) >= 0.001:
+                print(f"    {delta:+8.3f}s  {fn}", file=out)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two --profile run directories")
+    sub = parser.add_subparsers(dest='command', required=True)
+    compare = sub.add_parser('diff')
+    compare.add_argument('before')
+    compare.add_argument('after')
+    args = parser.parse_args(argv)
+    diff(args.before, args.after)
+
+if __name__ == '__main__':
+    main()
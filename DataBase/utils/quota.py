@@ -0,0 +1,222 @@
+"""
+Persistent per-API request ledger and staleness-first scheduling
+
+Yelp, Google Places and Eventbrite budgets (config.API_DAILY_QUOTAS, 0 =
+unlimited) are counted per UTC day across runs and processes:
+
+    QUOTA_DIR/usage.json     {api: {"window": "YYYY-MM-DD", "used": n}}
+    QUOTA_DIR/<api>.json     {"items": {scope: {item: {"fetched": ts, "calls": n}}},
+                              "deferred": {scope: [item, ...]}}
+
+http_client.get() spends one call per request (hedged duplicates too) and
+raises QuotaExceededError once the day's budget is gone. Pipelines ask
+schedule() first: it orders their work items (neighborhoods, or whole
+sweeps) oldest-fetched first and defers whatever the remaining budget
+doesn't cover to the next window, so a rerun or multi-city run spends
+what is left on the stalest data instead of failing halfway through.
+Deferred neighborhoods come back from the stage as None, which keeps
+their stored values (see NeighborhoodTable.load_stage).
+
+Usage:
+    python -m utils.quota            # today's usage and deferred work
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process runs only
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # the DataBase directory, not the cwd
+QUOTA_DIR = os.getenv('QUOTA_DIR', os.path.join(BASE_DIR, '.quota'))
+
+_lock = threading.Lock()
+_calls = Counter()   # calls spent by this process, per API
+
+
+class QuotaExceededError(Exception):
+    """The API's budget for the current window is spent"""
+
+
+def api_for(url):
+    """Ledger name of the API behind url, or None for unmetered endpoints"""
+    url = url.split('?', 1)[0]
+    for api, base in (('yelp', config.YELP_SEARCH_URL), ('places', config.GOOGLE_PLACES_URL),
+                      ('eventbrite', config.EVENTBRITE_SEARCH_URL)):
+        if url == base:
+            return api
+    return None
+
+
+def window():
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+@contextmanager
+def _locked(name):
+    """Exclusive access to QUOTA_DIR/<name> across threads and processes"""
+    os.makedirs(QUOTA_DIR, exist_ok=True)
+    path = os.path.join(QUOTA_DIR, name)
+    with _lock, open(f"{path}.lock", 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield path
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"  ⚠️  Ignoring unreadable quota ledger {path}: {e}")
+        return {}
+
+
+def _write(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def _usage(usage, api):
+    entry = usage.get(api)
+    if not entry or entry.get('window') != window():
+        entry = {'window': window(), 'used': 0}
+    return entry
+
+
+def budget(api):
+    return config.API_DAILY_QUOTAS.get(api) or 0
+
+
+def remaining(api):
+    """Calls left in the current window, or None when the API is unlimited"""
+    if not budget(api):
+        return None
+    with _locked('usage.json') as path:
+        used = _usage(_read(path), api)['used']
+    return max(budget(api) - used, 0)
+
+
+def exhausted(api):
+    return remaining(api) == 0
+
+
+def spend(api, n=1):
+    """Record n calls; False (and nothing recorded) when they would exceed the budget"""
+    with _locked('usage.json') as path:
+        usage = _read(path)
+        entry = _usage(usage, api)
+        if budget(api) and entry['used'] + n > budget(api):
+            return False
+        entry['used'] += n
+        usage[api] = entry
+        _write(path, usage)
+    _calls[api] += n
+    return True
+
+
+def calls(api):
+    """Calls this process has spent on api (for measuring what a sweep cost)"""
+    return _calls[api]
+
+
+def _fetched(seen, item):
+    return (seen.get(item) or {}).get('fetched', 0)
+
+
+def oldest_first(api, scope, items):
+    """items ordered by when they were last done(), never-fetched first"""
+    with _locked(f"{api}.json") as path:
+        seen = _read(path).get('items', {}).get(scope, {})
+    return sorted(items, key=lambda item: _fetched(seen, item))
+
+
+def schedule(api, scope, items, cost=1):
+    """
+    Split items into (granted, deferred) for this window: oldest-fetched
+    first (never fetched counts as oldest), as many as the remaining budget
+    covers. An item's cost is what it took last time, else cost calls.
+    Deferred items are recorded in the ledger until they are done()
+    """
+    items = list(items)
+    left = remaining(api)
+    with _locked(f"{api}.json") as path:
+        state = _read(path)
+        seen = state.get('items', {}).get(scope, {})
+        order = sorted(items, key=lambda item: _fetched(seen, item))
+        granted, deferred = [], []
+        for item in order:
+            estimate = (seen.get(item) or {}).get('calls') or cost
+            if left is None or estimate <= left:
+                granted.append(item)
+                left = None if left is None else left - estimate
+            else:
+                deferred.append(item)
+        pending = state.setdefault('deferred', {})
+        if deferred:
+            pending[scope] = deferred
+        else:
+            pending.pop(scope, None)
+        _write(path, state)
+    if deferred:
+        print(f"  ⏳ {api} budget covers {len(granted)} of {len(items)} {scope} item(s), "
+              f"deferring {len(deferred)} to the next window")
+    return granted, deferred
+
+
+def done(api, scope, items, spent=None):
+    """Mark items fetched now; spent is what one item cost (its next estimate)"""
+    with _locked(f"{api}.json") as path:
+        state = _read(path)
+        entry = {'fetched': time.time()}
+        if spent:
+            entry['calls'] = spent
+        items = set(items)
+        state.setdefault('items', {}).setdefault(scope, {}).update((item, dict(entry)) for item in items)
+        pending = state.get('deferred', {})
+        if scope in pending:
+            pending[scope] = [item for item in pending[scope] if item not in items]
+            if not pending[scope]:
+                del pending[scope]
+        _write(path, state)
+
+
+def report():
+    """{api: {window, used, budget, deferred: {scope: [items]}}}"""
+    with _locked('usage.json') as path:
+        usage = _read(path)
+    out = {}
+    for api in config.API_DAILY_QUOTAS:
+        with _locked(f"{api}.json") as path:
+            deferred = _read(path).get('deferred', {})
+        out[api] = dict(_usage(usage, api), budget=budget(api), deferred=deferred)
+    return out
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description="Show today's API usage and deferred work").parse_args(argv)
+    for api, entry in report().items():
+        limit = f"{entry['budget']:,}" if entry['budget'] else 'unlimited'
+        print(f"{api:11} {entry['used']:7,} of {limit} calls on {entry['window']}")
+        for scope, items in entry['deferred'].items():
+            print(f"    deferred {scope}: {', '.join(items)}")
+
+
+if __name__ == '__main__':
+    main()
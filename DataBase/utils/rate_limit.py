@@ -0,0 +1,32 @@
+"""
+Per-host rate limiting shared by every pipeline (and every process of a multi-city run)
+
+Each caller atomically reserves the next free slot for a host, then sleeps
+outside the lock until that slot, so concurrent callers are spaced by the
+host's minimum interval without serializing on the sleep itself.
+"""
+import threading
+import time
+
+class HostRateLimiter:
+    def __init__(self, intervals, state=None, lock=None):
+        """
+        intervals: {host: minimum seconds between request starts}
+        state/lock: optionally a multiprocessing.Manager dict and Lock so the
+        limiter is shared across processes; defaults to in-process
+        """
+        self.intervals = dict(intervals)
+        self._state = state if state is not None else {}
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def wait(self, host):
+        interval = self.intervals.get(host, 0)
+        if interval <= 0:
+            return
+        with self._lock:
+            now = time.time()
+            slot = max(self._state.get(host, 0.0), now)
+            self._state[host] = slot + interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,83 @@
+"""
+Zillow Observed Rent Index (ZORI) ingestion for property rates
+
+Reads the ZIP-level ZORI CSV (wide: RegionID, SizeRank, RegionName (the
+ZIP), ..., then one column per month) line by line, keeping only the ZIPs
+the city maps to neighborhoods (cities/<id>.json "zips") and only the last
+ZORI_MONTHS month columns. Memory is one small float32 array per kept ZIP,
+however many months or regions the file holds.
+
+Each neighborhood's series is the mean of its ZIPs' series. From it come
+the latest value and the trend: the percent change from the oldest to the
+latest kept month.
+"""
+import csv
+import re
+import numpy as np
+
+MONTH_COLUMN = re.compile(r'^\d{4}-\d{2}(-\d{2})?$')
+REGION_COLUMN = 'RegionName'
+
+def read_zori(path, zips, months):
+    """
+    ([month labels], {zip: float32 array of the last `months` values, NaN where missing})
+    Only rows whose ZIP is in `zips` are kept
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader)]
+        region = header.index(REGION_COLUMN)
+        month_columns = [i for i, name in enumerate(header) if MONTH_COLUMN.match(name)][-months:]
+        labels = [header[i][:7] for i in month_columns]
+
+        series = {}
+        for line in f:
+            # The ZIP sits behind plain numeric id columns, so a bounded split
+            # finds it without parsing the hundreds of month columns
+            prefix = line.split(',', region + 1)
+            if '"' in ''.join(prefix[:region + 1]):
+                row = next(csv.reader([line]))
+                zip_code = row[region].strip().strip('"').zfill(5)
+            else:
+                zip_code = prefix[region].strip().zfill(5)
+                row = None
+            if zip_code not in zips:
+                continue
+            row = row or next(csv.reader([line]))
+            series[zip_code] = np.array(
+                [float(row[i]) if row[i].strip() else np.nan for i in month_columns],
+                dtype=np.float32,
+            )
+    return labels, series
+
+
+def neighborhood_rents(path, city, months):
+    """{hood: {'property_rates': latest, 'rent_trend': percent change}} for hoods with ZORI data"""
+    known = set(city['neighborhoods'])
+    hood_zips = {}
+    for zip_code, hoods in city['zips'].items():
+        for hood in hoods:
+            if hood in known:
+                hood_zips.setdefault(hood, []).append(zip_code)
+
+    labels, series = read_zori(path, {z for zips in hood_zips.values() for z in zips}, months)
+    results = {}
+    for hood, zips in hood_zips.items():
+        rows = [series[z] for z in zips if z in series]
+        if not rows:
+            continue
+        stacked = np.vstack(rows)
+        observed = ~np.isnan(stacked)
+        counts = observed.sum(axis=0)
+        if not counts.any():
+            continue
+        hood_series = np.where(observed, stacked, 0).sum(axis=0) / np.maximum(counts, 1)
+        present = np.flatnonzero(counts)
+        first, last = hood_series[present[0]], hood_series[present[-1]]
+        results[hood] = {
+            'property_rates': round(float(last), 0),
+            'rent_trend': round(float((last / first - 1) * 100), 1) if len(present) > 1 and first else 0.0,
+        }
+    if labels:
+        print(f"  ✅ ZORI rents for {len(results)} neighborhoods ({labels[0]} to {labels[-1]})")
+    return results